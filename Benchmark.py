@@ -0,0 +1,436 @@
+import argparse
+import bisect
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+import Sol
+import Utility.DBConnector as Connector
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+from Business.Studio import Studio
+from Utility import Instrumentation
+from Utility.ReturnValue import ReturnValue
+
+# benchmark harness for the CRUD, BASIC and ADVANCED APIs of Sol.py:
+#     python Benchmark.py --scale 10k --output results.json
+#     python Benchmark.py --scale 10k --compare results.json
+# it DROPS AND RECREATES THE TABLES of the database DBConnector is configured for (database.ini or
+# DATABASE_URL), loads a synthetic catalog of the requested size and times every API call it makes,
+# reporting throughput and latency percentiles as JSON; --compare checks the run against an earlier result
+# and exits with 1 if an operation got slower than --threshold allows
+# the catalog is generated from --seed, so two runs (e.g. of two branches) with the same arguments see the
+# same data and the same sequence of calls
+
+# named catalog sizes, in ratings (CriticsMovie rows)
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+GENRES = ("Drama", "Action", "Comedy", "Horror")
+
+REPORTS = ("franchiseRevenue", "studioRevenueByYear", "getFanCritics", "averageAgeByGenre", "getExclusiveActors")
+
+
+# ---------------------------------- catalog: ----------------------------------
+
+class Catalog:
+    # sizes of a synthetic catalog with the given number of ratings; movie (and actor) popularity is Zipf
+    # distributed with exponent skew: the k-th most popular movie gets ratings in proportion to 1 / k ** skew
+    def __init__(self, ratings: int, skew: float, seed: int):
+        self.ratings = ratings
+        self.skew = skew
+        self.seed = seed
+        self.critics = max(10, ratings // 25)
+        self.movies = max(10, ratings // 50)
+        self.actors = max(10, ratings // 40)
+        self.studios = max(5, ratings // 2000)
+        self.movie_weights = zipfWeights(self.movies, skew)
+        self.actor_weights = zipfWeights(self.actors, skew)
+
+    def sizes(self) -> dict:
+        return {"ratings": self.ratings, "critics": self.critics, "movies": self.movies, "actors": self.actors,
+                "studios": self.studios, "skew": self.skew, "seed": self.seed}
+
+    # movie number i -> (name, year), numbers start at 0
+    @staticmethod
+    def movie(i: int) -> Tuple[str, int]:
+        return "Movie %d" % i, 1900 + i % 120
+
+    # a movie number drawn by popularity
+    def popularMovie(self, rng: random.Random) -> int:
+        return drawWeighted(rng, self.movie_weights)
+
+    def popularActor(self, rng: random.Random) -> int:
+        return drawWeighted(rng, self.actor_weights) + 1
+
+
+# cumulative Zipf weights of n items
+def zipfWeights(n: int, skew: float) -> List[float]:
+    return list(itertools.accumulate(1.0 / (k ** skew) for k in range(1, n + 1)))
+
+
+# the index of an item drawn in proportion to its weight
+def drawWeighted(rng: random.Random, cumulative: List[float]) -> int:
+    return min(bisect.bisect_right(cumulative, rng.random() * cumulative[-1]), len(cumulative) - 1)
+
+
+# (critic id, movie name, movie year, rating) rows, generated lazily so 10M ratings never sit in memory
+# each critic rates a different number of movies, no movie twice
+def ratingRows(catalog: Catalog, rng: random.Random):
+    average = catalog.ratings / catalog.critics
+    remaining = catalog.ratings
+    for critic_id in range(1, catalog.critics + 1):
+        if remaining <= 0:
+            return
+        count = remaining if critic_id == catalog.critics else min(remaining, rng.randint(1, int(2 * average)))
+        count = min(count, catalog.movies)
+        rated = set()
+        while len(rated) < count:
+            rated.add(catalog.popularMovie(rng))
+        for i in rated:
+            yield (critic_id,) + Catalog.movie(i) + (rng.randint(1, 5),)
+        remaining -= count
+
+
+# (actor id, movie name, movie year, salary) rows, 1 to 7 popularity-drawn actors per movie
+def castRows(catalog: Catalog, rng: random.Random):
+    for i in range(catalog.movies):
+        cast = set()
+        for _ in range(rng.randint(1, 7)):
+            cast.add(catalog.popularActor(rng))
+        for actor_id in cast:
+            yield (actor_id,) + Catalog.movie(i) + (rng.randint(1, 1000),)
+
+
+# (studio id, movie name, movie year, budget, revenue) rows, nine in ten movies have a studio
+def productionRows(catalog: Catalog, rng: random.Random):
+    for i in range(catalog.movies):
+        if rng.random() < 0.9:
+            yield (rng.randint(1, catalog.studios),) + Catalog.movie(i) + \
+                (rng.randint(1, 1000), rng.randint(0, 5000))
+
+
+# recreates the tables and loads the catalog with the batch APIs and the COPY loaders
+# returns the seconds each phase took
+def loadCatalog(catalog: Catalog, compact: bool, revenue_views: str) -> dict:
+    rng = random.Random(catalog.seed)
+    phases = {}
+
+    def timed(name, call):
+        start = time.perf_counter()
+        result = call()
+        phases[name] = time.perf_counter() - start
+        return result
+
+    Sol.dropTables()
+    timed("createTables", lambda: Sol.createTables(compact, revenue_views))
+    timed("addCritics", lambda: Sol.addCritics([Critic(i, "Critic %d" % i) for i in range(1, catalog.critics + 1)]))
+    timed("addActors", lambda: Sol.addActors([Actor(i, "Actor %d" % i, rng.randint(10, 90), rng.randint(100, 210))
+                                              for i in range(1, catalog.actors + 1)]))
+    timed("addStudios", lambda: Sol.addStudios([Studio(i, "Studio %d" % i) for i in range(1, catalog.studios + 1)]))
+    timed("addMovies", lambda: Sol.addMovies([Movie(*Catalog.movie(i), GENRES[i % len(GENRES)])
+                                              for i in range(catalog.movies)]))
+    for name, loader, rows in (("loadCriticsMovie", Sol.loadCriticsMovie, ratingRows),
+                               ("loadActorsMovie", Sol.loadActorsMovie, castRows),
+                               ("loadStudiosMovie", Sol.loadStudiosMovie, productionRows)):
+        status, loaded, rejected = timed(name, lambda: loader(rows(catalog, rng)))
+        if status != ReturnValue.OK or rejected:
+            raise RuntimeError("%s failed: %s, %d rows rejected" % (name, status, len(rejected)))
+    if revenue_views:
+        timed("refreshRevenueViews", Sol.refreshRevenueViews)
+    timed("analyze", analyze)
+    return phases
+
+
+# fresh planner statistics, so every run plans the benchmark queries on the same data
+def analyze():
+    conn = Connector.DBConnector()
+    try:
+        conn.connection.autocommit = True
+        conn.execute("ANALYZE", commit=False)
+    finally:
+        conn.connection.autocommit = False
+        conn.close()
+
+
+# ---------------------------------- measurement: ----------------------------------
+
+# latencies of one operation and how many of its calls did not succeed
+class Measurement:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    # calls call() count times, args(i) gives the arguments of call number i (generated before the clock
+    # starts); ok(result) tells whether the call succeeded; before(), if given, runs ahead of every call and is
+    # not timed
+    def run(self, count: int, call, args, ok, before=None):
+        arguments = [args(i) for i in range(count)]
+        for argument in arguments:
+            if before is not None:
+                before()
+            start = time.perf_counter()
+            result = call(*argument)
+            latency = time.perf_counter() - start
+            self.latencies.append(latency)
+            self.elapsed += latency
+            if not ok(result):
+                self.errors += 1
+        return self
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        calls = len(latencies)
+        return {"calls": calls, "errors": self.errors, "seconds": self.elapsed,
+                "throughput": calls / self.elapsed if self.elapsed else None,
+                "mean": sum(latencies) / calls if calls else None,
+                "min": latencies[0] if calls else None, "max": latencies[-1] if calls else None,
+                "p50": percentile(latencies, 0.50), "p90": percentile(latencies, 0.90),
+                "p99": percentile(latencies, 0.99)}
+
+
+# nearest-rank percentile of sorted values
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, int(q * len(values) + 0.5) - 1))]
+
+
+# the write functions return OK even when they fail (see Sol.catchException), so the writes are also counted in
+# their table, see runBenchmarks
+def isOk(result) -> bool:
+    return result == ReturnValue.OK
+
+
+def tableRows(table: str) -> int:
+    conn = Connector.DBConnector()
+    try:
+        _, result = conn.execute(sql.SQL("SELECT count(*) AS n FROM {}").format(sql.Identifier(table.lower())))
+        return result[0]['n']
+    finally:
+        conn.close()
+
+
+# averages are 0 for movies/actors without ratings, None only on errors
+def isAverage(result) -> bool:
+    return result is not None
+
+
+# a profile getter returns None on errors and the bad entity for a missing id, which should not happen here
+def isProfile(entity):
+    return lambda result: isinstance(result, entity) and not result.is_bad()
+
+
+def isReport(rows) -> bool:
+    return rows is not None
+
+
+# runs every benchmark against the loaded catalog, operations calls each (reports: report_runs runs)
+# returns operation name -> Measurement summary
+def runBenchmarks(catalog: Catalog, operations: int, report_runs: int, warmup: int, only: List[str]) -> dict:
+    rng = random.Random(catalog.seed + 1)
+    critic_base = catalog.critics + 1
+    actor_base = catalog.actors + 1
+    movie_base = catalog.movies
+
+    def newCritic(i):
+        return Critic(critic_base + i, "New critic %d" % i),
+
+    def newActor(i):
+        return Actor(actor_base + i, "New actor %d" % i, rng.randint(10, 90), rng.randint(100, 210)),
+
+    def newMovie(i):
+        return Movie(*Catalog.movie(movie_base + i), GENRES[i % len(GENRES)]),
+
+    def newRating(i):
+        # the critics added by addCritic have not rated anything, so every pair is new
+        return Catalog.movie(catalog.popularMovie(rng)) + (critic_base + i, rng.randint(1, 5))
+
+    def someMovie(_):
+        return Catalog.movie(catalog.popularMovie(rng))
+
+    def someCritic(_):
+        return rng.randint(1, catalog.critics),
+
+    def someActor(_):
+        return catalog.popularActor(rng),
+
+    def someStudio(_):
+        return rng.randint(1, catalog.studios),
+
+    # the changes ahead of the incremental report runs, each one touches what its reports depend on
+    def rateRandomly():
+        movie = Catalog.movie(catalog.popularMovie(rng))
+        critic_id = rng.randint(1, catalog.critics)
+        Sol.criticDidntRateMovie(*movie, critic_id)
+        Sol.criticRatedMovie(*movie, critic_id, rng.randint(1, 5))
+
+    def produceRandomly():
+        movie = Catalog.movie(catalog.popularMovie(rng))
+        studio_id = rng.randint(1, catalog.studios)
+        Sol.studioDidntProduceMovie(studio_id, *movie)
+        Sol.studioProducedMovie(studio_id, *movie, rng.randint(1, 1000), rng.randint(0, 5000))
+
+    def castRandomly():
+        movie = Catalog.movie(catalog.popularMovie(rng))
+        actor_id = catalog.popularActor(rng)
+        Sol.actorDidntPlayeInMovie(*movie, actor_id)
+        Sol.actorPlayedInMovie(*movie, actor_id, rng.randint(1, 1000), ["Extra"])
+
+    changes = {"franchiseRevenue": produceRandomly, "studioRevenueByYear": produceRandomly,
+               "getFanCritics": rateRandomly, "averageAgeByGenre": castRandomly, "getExclusiveActors": castRandomly}
+
+    # name -> (call, arguments of call i, success check, number of calls, untimed step before each call)
+    benchmarks = {
+        "addCritic": (Sol.addCritic, newCritic, isOk, operations, None),
+        "addActor": (Sol.addActor, newActor, isOk, operations, None),
+        "addMovie": (Sol.addMovie, newMovie, isOk, operations, None),
+        "criticRatedMovie": (Sol.criticRatedMovie, newRating, isOk, operations, None),
+        "averageRating": (Sol.averageRating, someMovie, isAverage, operations, None),
+        "averageActorRating": (Sol.averageActorRating, someActor, isAverage, operations, None),
+        "getCriticProfile": (Sol.getCriticProfile, someCritic, isProfile(Critic), operations, None),
+        "getActorProfile": (Sol.getActorProfile, someActor, isProfile(Actor), operations, None),
+        "getMovieProfile": (Sol.getMovieProfile, someMovie, isProfile(Movie), operations, None),
+        "getStudioProfile": (Sol.getStudioProfile, someStudio, isProfile(Studio), operations, None),
+    }
+    # the table every call of a write benchmark adds a row to
+    written = {"addCritic": "Critics", "addActor": "Actors", "addMovie": "Movies", "criticRatedMovie": "CriticsMovie"}
+    for report in REPORTS:
+        call = getattr(Sol, report)
+        benchmarks[report] = (call, lambda i: (False,), isReport, report_runs, None)
+        # each incremental run follows one change the report depends on, made outside the clock
+        benchmarks[report + ".incremental"] = (call, lambda i: (True,), isReport, report_runs, changes[report])
+
+    results = {}
+    for name, (call, args, ok, count, before) in benchmarks.items():
+        if only and name not in only and name.split(".")[0] not in only:
+            continue
+        # warm up the connection pool, prepared statements and caches of the operation; added rows stay
+        if warmup and args not in (newCritic, newActor, newMovie, newRating):
+            Measurement().run(min(warmup, count), call, args, ok, before)
+        table = written.get(name)
+        rows = None if table is None else tableRows(table)
+        measurement = Measurement().run(count, call, args, ok, before)
+        if table is not None:
+            # a call that did not add its row failed, whatever it returned
+            measurement.errors = max(measurement.errors, count - (tableRows(table) - rows))
+        results[name] = measurement.summary()
+    return results
+
+
+# ---------------------------------- results: ----------------------------------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    conn = Connector.DBConnector()
+    try:
+        server = conn.connection.server_version
+    finally:
+        conn.close()
+    return {"commit": commit, "python": platform.python_version(), "psycopg2": psycopg2.__version__,
+            "server_version": server, "platform": platform.platform(), "time": time.time()}
+
+
+# operation -> (old, new, ratio) for every p50/p99 that grew by more than threshold (1.2 = 20% slower)
+def regressions(baseline: dict, results: dict, threshold: float) -> List[Tuple[str, float, float, float]]:
+    found = []
+    for name, new in results["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if old is None:
+            continue
+        for stat in ("p50", "p99"):
+            if old.get(stat) and new.get(stat) and new[stat] / old[stat] > threshold:
+                found.append((name + "." + stat, old[stat], new[stat], new[stat] / old[stat]))
+    return found
+
+
+def printSummary(results: dict, stream):
+    stream.write("%-32s %8s %7s %12s %10s %10s %10s\n" % ("operation", "calls", "errors", "ops/s", "p50 ms",
+                                                           "p90 ms", "p99 ms"))
+    for name, summary in results["benchmarks"].items():
+        stream.write("%-32s %8d %7d %12.1f %10.3f %10.3f %10.3f\n" % (
+            name, summary["calls"], summary["errors"], summary["throughput"] or 0.0, summary["p50"] * 1000,
+            summary["p90"] * 1000, summary["p99"] * 1000))
+
+
+def parseScale(scale: str) -> int:
+    if scale.lower() in SCALES:
+        return SCALES[scale.lower()]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(scale[-1:].lower(), 1)
+    return int(scale[:-1] if multiplier > 1 else scale) * multiplier
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Sol.py APIs on a synthetic catalog "
+                                                 "(drops and recreates the tables of the configured database)")
+    parser.add_argument("--scale", default="10k", help="ratings in the catalog: 10k, 100k, 1m, 10m or a number")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of movie and actor popularity")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--operations", type=int, default=1000, help="calls per CRUD/BASIC operation")
+    parser.add_argument("--report-runs", type=int, default=5, help="runs per ADVANCED report")
+    parser.add_argument("--warmup", type=int, default=50, help="untimed calls before each read operation")
+    parser.add_argument("--compact", action="store_true", help="use the compact (movie_id) schema")
+    parser.add_argument("--revenue-views", choices=Sol.REVENUE_VIEW_MODES, help="create the revenue summaries")
+    parser.add_argument("--no-cache", action="store_true", help="disable the profile caches")
+    parser.add_argument("--only", nargs="*", default=[], help="operations to run, all by default")
+    parser.add_argument("--stats", action="store_true",
+                        help="turn on the DBConnector instrumentation (which slows every statement down) and include "
+                             "its snapshot")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p50/p99 ratio over the --compare run that counts as a regression")
+    args = parser.parse_args(argv)
+
+    catalog = Catalog(parseScale(args.scale), args.skew, args.seed)
+    Sol.configureProfileCache(enabled=not args.no_cache)
+    Sol.clearCaches()
+    load = loadCatalog(catalog, args.compact, args.revenue_views)
+    Instrumentation.configureInstrumentation(enabled=args.stats)
+    Instrumentation.resetStats()
+    results = {"environment": environment(),
+               "config": dict(catalog.sizes(), operations=args.operations, report_runs=args.report_runs,
+                              warmup=args.warmup, compact=args.compact, revenue_views=args.revenue_views,
+                              profile_cache=not args.no_cache),
+               "load": load,
+               "benchmarks": runBenchmarks(catalog, args.operations, args.report_runs, args.warmup, args.only)}
+    if args.stats:
+        snapshot = Instrumentation.statsSnapshot()
+        results["stats"] = {"statements": {"%s %s" % key: value for key, value in snapshot["statements"].items()},
+                            "callers": snapshot["callers"]}
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+        printSummary(results, sys.stdout)
+    else:
+        sys.stdout.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline.get("config") != results["config"]:
+            sys.stderr.write("warning: %s was run with a different configuration\n" % args.compare)
+        found = regressions(baseline, results, args.threshold)
+        for name, old, new, ratio in found:
+            sys.stderr.write("regression %s: %.3f ms -> %.3f ms (x%.2f)\n" % (name, old * 1000, new * 1000, ratio))
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
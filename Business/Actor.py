@@ -1,43 +1,29 @@
-class Actor:
+from Business.Entity import Entity
+
+
+class Actor(Entity):
+    __slots__ = ()
+    FIELDS = ('actor_id', 'actor_name', 'age', 'height')
+
     def __init__(self, actor_id=None, actor_name=None, age=None, height=None):
-        self.__id = actor_id
-        self.__name = actor_name
-        self.__age = age
-        self.__height = height
+        super().__init__(actor_id, actor_name, age, height)
 
     def getActorID(self):
-        return self.__id
-
-    def setActorID(self, id):
-        self.__id = id
+        return self._values[0]
 
     def getActorName(self):
-        return self.__name
-
-    def setActorName(self, name):
-        self.__name = name
+        return self._values[1]
 
     def getAge(self):
-        return self.__age
-
-    def setAge(self, age):
-        self.__age = age
+        return self._values[2]
 
     def getHeight(self):
-        return self.__height
-
-    def setHeight(self, height):
-        self.__height = height
+        return self._values[3]
 
     @staticmethod
     def badActor():
         return Actor()
 
-    def __eq__(self, other):
-        return self.__id == other.__id and self.__name == other.__name and self.__age == other.__age and\
-               self.__height == other.__height
-
     def __str__(self):
-        return str("ActorID=" + str(self.__id) + ", ActorName=" + str(self.__name) + ", Age=" + str(self.__age) + ", Height=" +
-              str(self.__height))
-
+        return "ActorID=" + str(self._values[0]) + ", ActorName=" + str(self._values[1]) + ", Age=" + \
+            str(self._values[2]) + ", Height=" + str(self._values[3])
@@ -1,26 +1,22 @@
-class Critic:
+from Business.Entity import Entity
+
+
+class Critic(Entity):
+    __slots__ = ()
+    FIELDS = ('critic_id', 'critic_name')
+
     def __init__(self, critic_id=None, critic_name=None):
-        self.__id = critic_id
-        self.__name = critic_name
+        super().__init__(critic_id, critic_name)
 
     def getName(self):
-        return self.__name
-
-    def setName(self, name):
-        self.__name = name
+        return self._values[1]
 
     def getCriticID(self):
-        return self.__id
-
-    def setCriticID(self, id):
-        self.__id = id
+        return self._values[0]
 
     @staticmethod
     def badCritic():
         return Critic()
 
-    def __eq__(self, other):
-        return self.__name == other.__name and self.__id == other.__id
-
     def __str__(self):
-        print("CriticName=" + str(self.__name) + ", CriticID=" + str(self.__id))
+        return "CriticName=" + str(self._values[1]) + ", CriticID=" + str(self._values[0])
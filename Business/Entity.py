@@ -0,0 +1,47 @@
+class Entity:
+    # immutable value object over a tuple of its fields (FIELDS, in constructor order): no per-instance
+    # __dict__, equality and hashing compare the tuples, and from_row wraps a row tuple without copying it
+    __slots__ = ('_values',)
+    FIELDS = ()
+
+    def __init__(self, *values):
+        object.__setattr__(self, '_values', values)
+
+    # an entity over row, a tuple (used as is), ResultSetRow (its row tuple is used as is) or other sequence,
+    # holding the fields in constructor order; extra trailing columns are dropped
+    @classmethod
+    def from_row(cls, row):
+        values = getattr(row, '_values', row)
+        if type(values) is not tuple or len(values) != len(cls.FIELDS):
+            values = tuple(values[:len(cls.FIELDS)])
+        entity = cls.__new__(cls)
+        object.__setattr__(entity, '_values', values)
+        return entity
+
+    # the fields as a tuple, in constructor order
+    def astuple(self):
+        return self._values
+
+    def is_bad(self):
+        return all(value is None for value in self._values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values == other._values
+
+    def __hash__(self):
+        return hash((type(self).__name__, self._values))
+
+    def __reduce__(self):
+        return type(self), self._values
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + ", ".join(field + "=" + repr(value)
+                                                     for field, value in zip(self.FIELDS, self._values)) + ")"
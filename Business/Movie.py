@@ -1,37 +1,26 @@
-class Movie:
+from Business.Entity import Entity
+
+
+class Movie(Entity):
+    __slots__ = ()
+    FIELDS = ('movie_name', 'year', 'genre')
+
     def __init__(self, movie_name=None, year=None, genre=None):
-        self.__name = movie_name
-        self.__year = year
-        self.__genre = genre
+        super().__init__(movie_name, year, genre)
 
     def getMovieName(self):
-        return self.__name
-
-    def setMovieName(self, name):
-        self.__name = name
+        return self._values[0]
 
     def getYear(self):
-        return self.__year
-
-    def setYear(self, year):
-        self.__year = year
+        return self._values[1]
 
     def getGenre(self):
-        return self.__genre
-
-    def setGenre(self, genre):
-        self.__genre = genre
+        return self._values[2]
 
     @staticmethod
     def badMovie():
         return Movie()
 
-    def is_bad(self):
-        return self.__name is None and self.__year is None and self.__genre is None
-
-    def __eq__(self, other):
-        return self.__name == other.__name and self.__year == other.__year and self.__genre == other.__genre
-
     def __str__(self):
-        print("MovieName=" + str(self.__name) + ", Year=" + str(self.__year) + ", Genre=" + str(
-            self.__genre))
+        return "MovieName=" + str(self._values[0]) + ", Year=" + str(self._values[1]) + ", Genre=" + \
+            str(self._values[2])
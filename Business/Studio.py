@@ -1,28 +1,22 @@
-class Studio():
-    def __init__(self,studio_id=None, studio_name=None):
-        self.__id = studio_id
-        self.__name = studio_name
+from Business.Entity import Entity
 
 
-    def getStudioName(self):
-        return self.__name
-
-    def setStudioName(self, name):
-        self.__name = name
+class Studio(Entity):
+    __slots__ = ()
+    FIELDS = ('studio_id', 'studio_name')
 
-    def getStudioID(self):
-        return self.__id
+    def __init__(self, studio_id=None, studio_name=None):
+        super().__init__(studio_id, studio_name)
 
-    def setStudioID(self, id):
-        self.__id = id
+    def getStudioName(self):
+        return self._values[1]
 
+    def getStudioID(self):
+        return self._values[0]
 
     @staticmethod
     def badStudio():
         return Studio()
 
-    def __eq__(self, other):
-        return self.__name == other.__name and self.__id == other.__id
-
     def __str__(self):
-        print("StudioName=" + str(self.__name) + ", StudioID=" + str(self.__id))
\ No newline at end of file
+        return "StudioName=" + str(self._values[1]) + ", StudioID=" + str(self._values[0])
@@ -1,8 +1,17 @@
-from typing import List, Tuple, Any
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Any, Optional
 
 from psycopg2 import sql
 
 import Utility.DBConnector as Connector
+from Utility.Cache import Cache
+from Utility.CopyStream import CopyStream
+from Utility.Instrumentation import dispatcher
+from Utility.ResultSetFormatter import ResultSetFormatter
 from Business.Actor import Actor
 from Business.Critic import Critic
 from Business.Movie import Movie
@@ -13,7 +22,14 @@ from Utility.ReturnValue import ReturnValue
 
 # ---------------------------------- CRUD API: ----------------------------------
 
-def createTables():
+# with compact=True Movies gets a movie_id identity column and the relationship tables reference it
+# instead of repeating (movie_name, movie_year), which makes their rows, indexes and joins much smaller;
+# the API still takes (movieName, movieYear) and resolves the id, see movieId
+# revenue_views creates the revenue summaries franchiseRevenue and studioRevenueByYear read from, see
+# revenueViewQueries
+def createTables(compact: bool = False, revenue_views: str = None):
+    if revenue_views is not None and revenue_views not in REVENUE_VIEW_MODES:
+        raise ValueError("revenue_views must be one of " + ", ".join(REVENUE_VIEW_MODES))
     conn = None
     try:
         conn = Connector.DBConnector()
@@ -24,7 +40,8 @@ def createTables():
         conn.execute("CREATE TABLE Movies("
                      "name TEXT,"
                      "year INTEGER CHECK(year >= 1895),"
-                     "genere TEXT CHECK(genere IN ('Drama', 'Action', 'Comedy', 'Horror')) NOT NULL,"
+                     "genere TEXT CHECK(genere IN ('Drama', 'Action', 'Comedy', 'Horror')) NOT NULL," +
+                     ("movie_id INTEGER GENERATED ALWAYS AS IDENTITY UNIQUE," if compact else "") +
                      "PRIMARY KEY (name, year))"
                      )
         conn.execute("CREATE TABLE Actors("
@@ -37,43 +54,477 @@ def createTables():
                      "id INTEGER PRIMARY KEY,"
                      "name TEXT NOT NULL)"
                      )
-        conn.execute(
-            "CREATE TABLE CriticsMovie("
-            "critic_id INTEGER ,"
-            "movie_name TEXT NOT NULL,"
-            "movie_year INTEGER,"
-            "rating INTEGER NOT NULL,"
-            "FOREIGN KEY (critic_id) REFERENCES Critics(id) ON DELETE CASCADE,"
-            "FOREIGN KEY (movie_name, movie_year) REFERENCES Movies(name, year) ON DELETE CASCADE)"
-        )
-        conn.execute(
-            "CREATE TABLE StudiosMovie("
-            "studio_id INTEGER,"
-            "movie_name TEXT NOT NULL,"
-            "movie_year INTEGER,"
-            "budget INTEGER NOT NULL,"
-            "revenue INTEGER NOT NULL,"
-            "FOREIGN KEY (studio_id) REFERENCES Studios(id) ON DELETE CASCADE,"
-            "FOREIGN KEY (movie_name, movie_year) REFERENCES Movies(name, year) ON DELETE CASCADE )"
-        )
-        conn.execute(
-            "CREATE TABLE ActorsMovie("
-            "actor_id INTEGER,"
-            "movie_name TEXT NOT NULL,"
-            "movie_year INTEGER,"
-            "salary INTEGER NOT NULL,"
-            "FOREIGN KEY (actor_id) REFERENCES Actors(id) ON DELETE CASCADE,"
-            "FOREIGN KEY (movie_name, movie_year) REFERENCES Movies(name, year) ON DELETE CASCADE)"
-        )
+        for table, (entity, parent, values) in RELATIONS.items():
+            conn.execute(relationTableQuery(table, entity, parent, values, compact))
+        for index in relationIndexes(compact):
+            conn.execute(index)
+        for query in movieRatingStatsQueries(compact):
+            conn.execute(query)
+        if revenue_views is not None:
+            for query in revenueViewQueries(compact, revenue_views):
+                conn.execute(query)
+        setCompactSchema(compact)
+        setRevenueViews(revenue_views or "")
     except Exception as e:
         catchException(e, conn)
     if conn is not None:
         conn.close()
 
 
+# relationship table -> (entity id column, the table it references, the other columns)
+RELATIONS = {
+    "CriticsMovie": ("critic_id", "Critics", ("rating",)),
+    "StudiosMovie": ("studio_id", "Studios", ("budget", "revenue")),
+    "ActorsMovie": ("actor_id", "Actors", ("salary",)),
+}
+
+
+def relationTableQuery(table: str, entity: str, parent: str, values: Tuple[str, ...], compact: bool) -> str:
+    movie_columns = "movie_id INTEGER," if compact else "movie_name TEXT NOT NULL, movie_year INTEGER,"
+    movie_key = "movie_id" if compact else "movie_name, movie_year"
+    movie_reference = "Movies(movie_id)" if compact else "Movies(name, year)"
+    return ("CREATE TABLE " + table + "(" +
+            entity + " INTEGER," +
+            movie_columns +
+            "".join(value + " INTEGER NOT NULL," for value in values) +
+            "PRIMARY KEY (" + entity + ", " + movie_key + ")," +
+            "FOREIGN KEY (" + entity + ") REFERENCES " + parent + "(id) ON DELETE CASCADE," +
+            "FOREIGN KEY (" + movie_key + ") REFERENCES " + movie_reference + " ON DELETE CASCADE)")
+
+
+# the primary keys of the relationship tables lead with the critic/actor/studio id, so lookups by that id and the
+# ON DELETE CASCADE from Critics/Actors/Studios use them; these indexes serve the lookups by movie and the
+# cascade from Movies, and include the columns the BASIC API aggregates so it can answer from the index alone
+def relationIndexes(compact: bool) -> List[str]:
+    movie_key = "(movie_id)" if compact else "(movie_name, movie_year)"
+    return [
+        "CREATE INDEX IF NOT EXISTS criticsmovie_movie_idx ON CriticsMovie" + movie_key + " INCLUDE (rating)",
+        "CREATE INDEX IF NOT EXISTS actorsmovie_movie_idx ON ActorsMovie" + movie_key + " INCLUDE (actor_id)",
+        "CREATE INDEX IF NOT EXISTS studiosmovie_movie_idx ON StudiosMovie" + movie_key + " INCLUDE (studio_id)",
+    ]
+
+
+# MovieRatingStats holds the sum and count of the ratings of every rated movie, so averageRating is a primary key
+# lookup instead of an aggregate over CriticsMovie; statement-level triggers on CriticsMovie keep it up to date
+# for every kind of write (the API, the bulk loader, cascades from Critics/Movies) with one upsert per
+# statement; rebuildMovieRatingStats recomputes it from scratch
+def movieRatingStatsQueries(compact: bool) -> List[str]:
+    key = "movie_id" if compact else "movie_name, movie_year"
+    key_columns = "movie_id INTEGER," if compact else "movie_name TEXT, movie_year INTEGER,"
+    movie_reference = "Movies(movie_id)" if compact else "Movies(name, year)"
+    queries = [
+        "CREATE TABLE IF NOT EXISTS MovieRatingStats(" +
+        key_columns +
+        "rating_sum BIGINT NOT NULL,"
+        "rating_count BIGINT NOT NULL,"
+        "PRIMARY KEY (" + key + "),"
+        "FOREIGN KEY (" + key + ") REFERENCES " + movie_reference + " ON DELETE CASCADE)",
+        "CREATE OR REPLACE FUNCTION movie_rating_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN "
+        "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+        "UPDATE MovieRatingStats s SET rating_sum = s.rating_sum - d.rating_sum, "
+        "rating_count = s.rating_count - d.rating_count "
+        "FROM (SELECT " + key + ", sum(rating) AS rating_sum, count(*) AS rating_count "
+        "FROM old_rows GROUP BY " + key + ") d "
+        "WHERE (" + ", ".join("s." + column for column in key.split(", ")) + ") = "
+        "(" + ", ".join("d." + column for column in key.split(", ")) + "); "
+        "END IF; "
+        "IF TG_OP IN ('UPDATE', 'INSERT') THEN "
+        "INSERT INTO MovieRatingStats(" + key + ", rating_sum, rating_count) "
+        "SELECT " + key + ", sum(rating), count(*) FROM new_rows GROUP BY " + key + " "
+        "ON CONFLICT (" + key + ") DO UPDATE SET rating_sum = MovieRatingStats.rating_sum + EXCLUDED.rating_sum, "
+        "rating_count = MovieRatingStats.rating_count + EXCLUDED.rating_count; "
+        "END IF; "
+        "RETURN NULL; "
+        "END $$",
+    ]
+    for operation, transition_tables in (("INSERT", "NEW TABLE AS new_rows"),
+                                         ("DELETE", "OLD TABLE AS old_rows"),
+                                         ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows")):
+        trigger = "movie_rating_stats_" + operation.lower()
+        queries.append("DROP TRIGGER IF EXISTS " + trigger + " ON CriticsMovie")
+        queries.append("CREATE TRIGGER " + trigger + " AFTER " + operation + " ON CriticsMovie "
+                       "REFERENCING " + transition_tables + " FOR EACH STATEMENT "
+                       "EXECUTE FUNCTION movie_rating_stats_apply()")
+    return queries
+
+
+# recomputes MovieRatingStats from CriticsMovie, e.g. after creating it on an existing database;
+# writers of CriticsMovie wait until it is done so nothing is counted twice or missed
+def rebuildMovieRatingStats() -> ReturnValue:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        key = "movie_id" if isCompactSchema(conn) else "movie_name, movie_year"
+        conn.execute("LOCK TABLE CriticsMovie IN SHARE MODE", commit=False)
+        conn.execute("DELETE FROM MovieRatingStats", commit=False)
+        conn.execute("INSERT INTO MovieRatingStats(" + key + ", rating_sum, rating_count) "
+                     "SELECT " + key + ", sum(rating), count(*) FROM CriticsMovie GROUP BY " + key, commit=False)
+        conn.commit()
+    except Exception as e:
+        catchException(e, conn)
+        return ReturnValue.ERROR
+    conn.close()
+    return ReturnValue.OK
+
+
+# FranchiseRevenue(name, movies, revenue) and StudioRevenueByYear(studio_id, year, movies, revenue) hold the
+# revenue reports precomputed, so reading them does not depend on the size of StudiosMovie; movies counts the
+# movies of the franchise / the studio's movies of that year
+# "materialized": materialized views, they only change when refreshRevenueViews runs
+# "delta": tables kept up to date in the writing transaction: statement-level triggers on StudiosMovie apply the
+# revenue of the inserted/deleted rows (studioProducedMovie, studioDidntProduceMovie, the bulk loader, the
+# cascade from Studios) and triggers on Movies add new franchises and take out deleted movies before their
+# StudiosMovie rows cascade; renaming movies is not tracked, refreshRevenueViews recomputes the tables
+REVENUE_VIEW_MODES = ("materialized", "delta")
+
+
+# the queries that compute the revenue summaries from scratch
+def revenueViewSelects(compact: bool) -> Tuple[str, str]:
+    join = movieKeyCondition(compact, "m", "sm")
+    return ("SELECT m.name, count(DISTINCT m.year) AS movies, COALESCE(sum(sm.revenue), 0) AS revenue "
+            "FROM Movies m LEFT JOIN StudiosMovie sm ON " + join + " GROUP BY m.name",
+            "SELECT sm.studio_id, m.year, count(*) AS movies, sum(sm.revenue) AS revenue "
+            "FROM StudiosMovie sm JOIN Movies m ON " + join + " GROUP BY sm.studio_id, m.year")
+
+
+def revenueViewQueries(compact: bool, mode: str) -> List[str]:
+    join = movieKeyCondition(compact, "m", "sm")
+    franchise, by_year = revenueViewSelects(compact)
+    if mode == "materialized":
+        return [
+            "CREATE MATERIALIZED VIEW FranchiseRevenue AS " + franchise,
+            "CREATE UNIQUE INDEX franchiserevenue_name_idx ON FranchiseRevenue(name)",
+            "CREATE MATERIALIZED VIEW StudioRevenueByYear AS " + by_year,
+            "CREATE UNIQUE INDEX studiorevenuebyyear_key_idx ON StudioRevenueByYear(studio_id, year)",
+        ]
+    # sign is "-" to take the rows out
+    delta = ("WITH d AS (SELECT m.name, sm.studio_id, m.year, "
+             "{sign}count(*) AS movies, {sign}sum(sm.revenue) AS revenue "
+             "FROM {rows} sm JOIN Movies m ON " + join + " {where} GROUP BY m.name, sm.studio_id, m.year) ")
+    apply = ("{delta}INSERT INTO FranchiseRevenue AS f(name, movies, revenue) "
+             "SELECT name, 0, sum(revenue) FROM d GROUP BY name "
+             "ON CONFLICT (name) DO UPDATE SET revenue = f.revenue + EXCLUDED.revenue; "
+             "{delta}INSERT INTO StudioRevenueByYear AS s(studio_id, year, movies, revenue) "
+             "SELECT studio_id, year, sum(movies), sum(revenue) FROM d GROUP BY studio_id, year "
+             "ON CONFLICT (studio_id, year) DO UPDATE SET movies = s.movies + EXCLUDED.movies, "
+             "revenue = s.revenue + EXCLUDED.revenue; "
+             "DELETE FROM StudioRevenueByYear WHERE movies = 0; ")
+    queries = [
+        "CREATE TABLE FranchiseRevenue("
+        "name TEXT PRIMARY KEY,"
+        "movies BIGINT NOT NULL,"
+        "revenue BIGINT NOT NULL)",
+        "CREATE TABLE StudioRevenueByYear("
+        "studio_id INTEGER,"
+        "year INTEGER,"
+        "movies BIGINT NOT NULL,"
+        "revenue BIGINT NOT NULL,"
+        "PRIMARY KEY (studio_id, year))",
+        "CREATE INDEX studiorevenuebyyear_empty_idx ON StudioRevenueByYear(studio_id) WHERE movies = 0",
+        "CREATE OR REPLACE FUNCTION revenue_studios_movie_apply() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN "
+        "IF TG_OP IN ('UPDATE', 'DELETE') THEN " +
+        apply.format(delta=delta.format(sign="-", rows="old_rows", where="")) +
+        "END IF; "
+        "IF TG_OP IN ('UPDATE', 'INSERT') THEN " +
+        apply.format(delta=delta.format(sign="", rows="new_rows", where="")) +
+        "END IF; "
+        "RETURN NULL; "
+        "END $$",
+        "CREATE OR REPLACE FUNCTION revenue_movies_insert() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN "
+        "INSERT INTO FranchiseRevenue AS f(name, movies, revenue) "
+        "SELECT name, count(*), 0 FROM new_rows GROUP BY name "
+        "ON CONFLICT (name) DO UPDATE SET movies = f.movies + EXCLUDED.movies; "
+        "RETURN NULL; "
+        "END $$",
+        # runs before the row is gone, while its StudiosMovie rows still join to it; the cascade that deletes
+        # them afterwards no longer finds the movie, so they are not taken out twice
+        "CREATE OR REPLACE FUNCTION revenue_movies_delete() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN " +
+        apply.format(delta=delta.format(sign="-", rows="StudiosMovie",
+                                        where="WHERE m.name = OLD.name AND m.year = OLD.year")) +
+        "UPDATE FranchiseRevenue SET movies = movies - 1 WHERE name = OLD.name; "
+        "DELETE FROM FranchiseRevenue WHERE name = OLD.name AND movies = 0; "
+        "RETURN OLD; "
+        "END $$",
+        "CREATE TRIGGER revenue_movies_insert AFTER INSERT ON Movies "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION revenue_movies_insert()",
+        "CREATE TRIGGER revenue_movies_delete BEFORE DELETE ON Movies "
+        "FOR EACH ROW EXECUTE FUNCTION revenue_movies_delete()",
+    ]
+    for operation, transition_tables in (("INSERT", "NEW TABLE AS new_rows"),
+                                         ("DELETE", "OLD TABLE AS old_rows"),
+                                         ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows")):
+        queries.append("CREATE TRIGGER revenue_studios_movie_" + operation.lower() + " AFTER " + operation +
+                       " ON StudiosMovie REFERENCING " + transition_tables + " FOR EACH STATEMENT "
+                       "EXECUTE FUNCTION revenue_studios_movie_apply()")
+    queries.append("INSERT INTO FranchiseRevenue " + franchise)
+    queries.append("INSERT INTO StudioRevenueByYear " + by_year)
+    return queries
+
+
+# brings the revenue summaries up to date: refreshes the materialized views (CONCURRENTLY keeps them readable
+# meanwhile) or recomputes the delta tables, with writers of Movies and StudiosMovie waiting until it is done
+def refreshRevenueViews(concurrently: bool = True) -> ReturnValue:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        mode = revenueViews(conn)
+        if mode == "materialized":
+            for view in ("FranchiseRevenue", "StudioRevenueByYear"):
+                conn.execute("REFRESH MATERIALIZED VIEW " + ("CONCURRENTLY " if concurrently else "") + view,
+                             commit=False)
+        elif mode == "delta":
+            conn.execute("LOCK TABLE Movies, StudiosMovie IN SHARE MODE", commit=False)
+            for view, query in zip(("FranchiseRevenue", "StudioRevenueByYear"),
+                                   revenueViewSelects(isCompactSchema(conn))):
+                conn.execute("DELETE FROM " + view, commit=False)
+                conn.execute("INSERT INTO " + view + " " + query, commit=False)
+        else:
+            conn.close()
+            return ReturnValue.NOT_EXISTS
+        conn.commit()
+    except Exception as e:
+        catchException(e, conn)
+        return ReturnValue.ERROR
+    conn.close()
+    resetReports()
+    return ReturnValue.OK
+
+
+# relationship table -> its primary key in the classic schema, see createTables
+RELATION_KEYS = {table: (entity, "movie_name", "movie_year") for table, (entity, _, _) in RELATIONS.items()}
+
+
+# whether the relationship tables reference Movies by movie_id, None until createTables sets it or
+# isCompactSchema looks it up in the database
+compact_schema = None
+
+# the kind of revenue summaries the database has (see revenueViewQueries): "materialized", "delta" or "" for
+# none, None until createTables sets it or revenueViews looks it up in the database
+revenue_views = None
+
+# (movie name, year) -> movie_id for the compact schema
+MOVIE_ID_CACHE_SIZE = 100000
+movie_ids = Cache(MOVIE_ID_CACHE_SIZE)
+
+# read-through caches of the profile getters, id (or (name, year)) -> the profile's fields, None for a missing one
+# entries are invalidated by the add*/delete* functions of this process and expire after PROFILE_CACHE_TTL
+# seconds, which bounds how long a change made by another process can go unseen
+PROFILE_CACHE_SIZE = 10000
+PROFILE_CACHE_TTL = 60.0
+critic_profiles = Cache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+actor_profiles = Cache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+movie_profiles = Cache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+studio_profiles = Cache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+profile_caches = {"critic": critic_profiles, "actor": actor_profiles, "movie": movie_profiles,
+                  "studio": studio_profiles}
+
+
+# turn the profile caches on/off (e.g. off for tests) or resize them, clears them either way
+def configureProfileCache(enabled: bool = True, maxsize: int = None, ttl: float = None):
+    for cache in profile_caches.values():
+        cache.enabled = enabled
+        if maxsize is not None:
+            cache.maxsize = maxsize
+        if ttl is not None:
+            cache.ttl = ttl
+        cache.clear()
+
+
+# hits, misses, evictions, expirations and size of every profile cache
+def profileCacheStats() -> dict:
+    return {name: cache.stats() for name, cache in profile_caches.items()}
+
+
+# stores a value read from the database in cache, unless it was read in a transaction(): other threads would see
+# its rows there before they are committed, or after they are rolled back
+# generation is cache.generation() taken before the read, see Cache
+def cachePut(cache: Cache, key, value, generation: int):
+    if Connector.Transaction.current() is None:
+        cache.put(key, value, generation)
+
+
+def clearCaches():
+    resetReports()
+    movie_ids.clear()
+    for cache in profile_caches.values():
+        cache.clear()
+
+
+def setCompactSchema(compact: Optional[bool]):
+    global compact_schema
+    compact_schema = compact
+    clearCaches()
+
+
+# run the API on the tables of schema name, None for the default schema, see Connector.setSchema
+def useSchema(name: Optional[str]):
+    Connector.setSchema(name)
+    setCompactSchema(None)
+    setRevenueViews(None)
+
+
+def isCompactSchema(conn: Connector.DBConnector) -> bool:
+    global compact_schema
+    if compact_schema is None:
+        _, result = conn.execute("SELECT EXISTS (SELECT 1 FROM pg_attribute "
+                                 "WHERE attrelid = to_regclass('criticsmovie') AND attname = 'movie_id' "
+                                 "AND NOT attisdropped) AS compact", commit=False)
+        compact_schema = result[0]['compact']
+    return compact_schema
+
+
+def setRevenueViews(mode: Optional[str]):
+    global revenue_views
+    revenue_views = mode
+    resetReports()
+
+
+def revenueViews(conn: Connector.DBConnector) -> str:
+    global revenue_views
+    if revenue_views is None:
+        _, result = conn.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('franchiserevenue')",
+                                 commit=False)
+        relkind = None if result.isEmpty() else result[0]['relkind']
+        revenue_views = {"m": "materialized", "r": "delta"}.get(relkind, "")
+    return revenue_views
+
+
+# the movie_id of the movie in the compact schema, or None if there is no such movie
+# ids are cached: an identity is never reused, so a cached id can only be stale if the movie was deleted
+# (in another process), and then the foreign key rejects it; writes that hit that call forgetMovieId
+def movieId(conn: Connector.DBConnector, movieName: str, movieYear: int) -> Optional[int]:
+    key = batchKey((movieName, movieYear))
+    movie_id = movie_ids.lookup(key)
+    if movie_id is not Cache.MISSING:
+        return movie_id
+    generation = movie_ids.generation()
+    _, result = conn.execute_prepared("SELECT movie_id FROM Movies WHERE name = $1 AND year = $2",
+                                      (movieName, movieYear), commit=False)
+    if result.isEmpty():
+        return None
+    movie_id = result[0]['movie_id']
+    cachePut(movie_ids, key, movie_id, generation)
+    return movie_id
+
+
+def forgetMovieId(movieName: str, movieYear: int):
+    movie_ids.invalidate(batchKey((movieName, movieYear)))
+
+
+# join condition between two tables that reference a movie, by movie_id or by (movie_name, movie_year)
+def movieJoinCondition(compact: bool, left: str, right: str) -> str:
+    if compact:
+        return left + ".movie_id = " + right + ".movie_id"
+    return "(" + left + ".movie_name, " + left + ".movie_year) = (" + right + ".movie_name, " + right + ".movie_year)"
+
+
+# inserts a row of a relationship table in the compact schema, params_before/params_after are the values of
+# the columns before/after movie_id; a missing movie is a FOREIGN_KEY_VIOLATION, like in the classic schema
+def insertWithMovieId(conn: Connector.DBConnector, query: str, movieName: str, movieYear: int,
+                      params_before: tuple, params_after: tuple) -> int:
+    movie_id = movieId(conn, movieName, movieYear)
+    if movie_id is None:
+        raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
+    try:
+        row_effected, _ = conn.execute_prepared(query, params_before + (movie_id,) + params_after)
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        forgetMovieId(movieName, movieYear)
+        raise
+    return row_effected
+
+
+# brings a database created by an older createTables up to date: adds the primary keys and relationIndexes
+# to the relationship tables and the MovieRatingStats table and triggers (filled by rebuildMovieRatingStats
+# when it is new), in one transaction; safe to run more than once
+# a relationship table with rows that cannot satisfy its new primary key (a NULL key column, or a key repeated
+# by several rows) stops the migration: nothing is changed, the offending rows are counted per table and
+# ERROR is returned; with deduplicate=True those rows are deleted instead (for a repeated key all rows but
+# one, which one is arbitrary) and the number of deleted rows is printed per table
+def migrateSchema(deduplicate: bool = False) -> ReturnValue:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        compact = isCompactSchema(conn)
+        offending = {}
+        for table, key in RELATION_KEYS.items():
+            _, result = conn.execute_prepared("SELECT 1 FROM pg_constraint "
+                                              "WHERE conrelid = to_regclass($1) AND contype = 'p'",
+                                              (table.lower(),), commit=False)
+            if not result.isEmpty():
+                continue
+            columns = sql.SQL(", ").join(map(sql.Identifier, key))
+            _, result = conn.execute(sql.SQL("SELECT coalesce(sum(n) FILTER (WHERE NOT ({columns}) IS NOT NULL), 0) "
+                                             "AS nulls, coalesce(sum(n - 1) FILTER (WHERE ({columns}) IS NOT NULL), "
+                                             "0) AS duplicates "
+                                             "FROM (SELECT {columns}, count(*) AS n FROM {table} "
+                                             "GROUP BY {columns}) keys").format(
+                table=sql.Identifier(table.lower()), columns=columns), commit=False)
+            if result[0]['nulls'] or result[0]['duplicates']:
+                offending[table] = (result[0]['nulls'], result[0]['duplicates'])
+            if offending and not deduplicate:
+                continue
+            if table in offending:
+                nulls, _ = conn.execute(sql.SQL("DELETE FROM {table} WHERE NOT ({columns}) IS NOT NULL").format(
+                    table=sql.Identifier(table.lower()), columns=columns), commit=False)
+                duplicates, _ = conn.execute(sql.SQL("DELETE FROM {table} t USING {table} d "
+                                                     "WHERE ({t_columns}) = ({d_columns}) AND t.ctid > d.ctid").format(
+                    table=sql.Identifier(table.lower()),
+                    t_columns=sql.SQL(", ").join(sql.SQL("t.{}").format(sql.Identifier(column)) for column in key),
+                    d_columns=sql.SQL(", ").join(sql.SQL("d.{}").format(sql.Identifier(column)) for column in key)),
+                    commit=False)
+                print("migrateSchema: deleted %d rows of %s with a NULL key and %d rows repeating a key"
+                      % (nulls, table, duplicates))
+            conn.execute(sql.SQL("ALTER TABLE {table} ADD PRIMARY KEY ({columns})").format(
+                table=sql.Identifier(table.lower()), columns=columns), commit=False)
+        if offending and not deduplicate:
+            for table, (nulls, duplicates) in offending.items():
+                print("migrateSchema: %s has %d rows with a NULL key and %d rows repeating a key"
+                      % (table, nulls, duplicates))
+            print("migrateSchema: nothing was changed, migrateSchema(deduplicate=True) deletes these rows")
+            conn.rollback()
+            conn.close()
+            return ReturnValue.ERROR
+        for index in relationIndexes(compact):
+            conn.execute(index, commit=False)
+        _, result = conn.execute("SELECT to_regclass('movieratingstats') IS NULL AS missing", commit=False)
+        for query in movieRatingStatsQueries(compact):
+            conn.execute(query, commit=False)
+        conn.commit()
+    except Exception as e:
+        catchException(e, conn)
+        return ReturnValue.ERROR
+    conn.close()
+    resetReports()
+    if result[0]['missing']:
+        return rebuildMovieRatingStats()
+    return ReturnValue.OK
+
+
+# empties every table in one TRUNCATE, resetting the movie_id identity of the compact schema; the rating and
+# delta revenue summaries are truncated with their tables, materialized revenue views are refreshed
 def clearTables():
-    # TODO: implement
-    pass
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        mode = revenueViews(conn)
+        tables = ["Critics", "Movies", "Actors", "Studios"] + list(RELATIONS) + ["MovieRatingStats"]
+        if mode == "delta":
+            tables += ["FranchiseRevenue", "StudioRevenueByYear"]
+        conn.execute("TRUNCATE " + ", ".join(tables) + " RESTART IDENTITY CASCADE", commit=False)
+        if mode == "materialized":
+            conn.execute("REFRESH MATERIALIZED VIEW FranchiseRevenue", commit=False)
+            conn.execute("REFRESH MATERIALIZED VIEW StudioRevenueByYear", commit=False)
+        conn.commit()
+    except Exception as e:
+        catchException(e, conn)
+    finally:
+        clearCaches()
+    if conn is not None:
+        conn.close()
 
 
 def dropCritics():
@@ -153,7 +604,40 @@ def dropStudiosMovie():
         conn.close()
 
 
+def dropMovieRatingStats():
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        conn.execute("DROP TABLE IF EXISTS MovieRatingStats CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS movie_rating_stats_apply() CASCADE")
+    except Exception as e:
+        catchException(e, conn)
+    if conn is not None:
+        conn.close()
+
+
+def dropRevenueViews():
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        mode = revenueViews(conn)
+        if mode:
+            kind = "MATERIALIZED VIEW" if mode == "materialized" else "TABLE"
+            conn.execute("DROP " + kind + " IF EXISTS FranchiseRevenue, StudioRevenueByYear CASCADE")
+        for function in ("revenue_studios_movie_apply", "revenue_movies_insert", "revenue_movies_delete"):
+            conn.execute("DROP FUNCTION IF EXISTS " + function + "() CASCADE")
+    except Exception as e:
+        catchException(e, conn)
+    finally:
+        setRevenueViews(None)
+    if conn is not None:
+        conn.close()
+
+
 def dropTables():
+    setCompactSchema(None)
+    dropRevenueViews()
+    dropMovieRatingStats()
     dropCritics()
     dropMovies()
     dropActors()
@@ -167,11 +651,12 @@ def addCritic(critic: Critic) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO Critics(id, name) VALUES({id}, {username})").format(
-            id=sql.Literal(critic.getCriticID()), username=sql.Literal(critic.getName())))
+        conn.execute_prepared("INSERT INTO Critics(id, name) VALUES($1, $2)",
+                              (critic.getCriticID(), critic.getName()))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        critic_profiles.invalidate(batchKey((critic.getCriticID(),)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -181,15 +666,12 @@ def addActor(actor: Actor) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO Actors(id, name, age, height) VALUES("
-                    "{id}, {name}, {age}, {height})").format(
-            id=sql.Literal(actor.getActorID()),
-            name=sql.Literal(actor.getActorName()),
-            age=sql.Literal(actor.getAge()),
-            height=sql.Literal(actor.getHeight())))
+        conn.execute_prepared("INSERT INTO Actors(id, name, age, height) VALUES($1, $2, $3, $4)",
+                              (actor.getActorID(), actor.getActorName(), actor.getAge(), actor.getHeight()))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        actor_profiles.invalidate(batchKey((actor.getActorID(),)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -199,12 +681,12 @@ def addStudio(studio: Studio) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO Studios(id, name) VALUES({id}, {name})").format(
-            id=sql.Literal(studio.getStudioID()),
-            name=sql.Literal(studio.getStudioName())))
+        conn.execute_prepared("INSERT INTO Studios(id, name) VALUES($1, $2)",
+                              (studio.getStudioID(), studio.getStudioName()))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        studio_profiles.invalidate(batchKey((studio.getStudioID(),)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -214,63 +696,204 @@ def deleteCritic(critic_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(sql.SQL("DELETE FROM Critics WHERE id={c_id}".format(c_id=critic_id)))
+        conn.execute_prepared("DELETE FROM Critics WHERE id = $1", (critic_id,))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        touchReports(critics=[critic_id])
+        critic_profiles.invalidate(batchKey((critic_id,)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
 
 def getCriticProfile(critic_id: int) -> Critic:
+    key = batchKey((critic_id,))
+    profile = critic_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Critic.badCritic() if profile is None else Critic.from_row(profile)
+    generation = critic_profiles.generation()
     conn = None
     try:
         conn = Connector.DBConnector()
-        _, (name) = conn.execute(sql.SQL(f"SELECT name FROM Critics WHERE id={critic_id}"))
-        return Critic(critic_id, name)
+        _, result = conn.execute_prepared("SELECT name FROM Critics WHERE id = $1", (critic_id,))
     except Exception as e:
         catchException(e, conn)
         return None
+    conn.close()
+    if result.isEmpty():
+        cachePut(critic_profiles, key, None, generation)
+        return Critic.badCritic()
+    profile = (critic_id, result[0]['name'])
+    cachePut(critic_profiles, key, profile, generation)
+    return Critic.from_row(profile)
 
 
 def deleteActor(actor_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(sql.SQL(f"DELETE FROM Actors WHERE id={sql.Literal(actor_id)}"))
+        conn.execute_prepared("DELETE FROM Actors WHERE id = $1", (actor_id,))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        resetReports()
+        actor_profiles.invalidate(batchKey((actor_id,)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
 
 def getActorProfile(actor_id: int) -> Actor:
+    key = batchKey((actor_id,))
+    profile = actor_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Actor.badActor() if profile is None else Actor.from_row(profile)
+    generation = actor_profiles.generation()
     conn = None
     try:
         conn = Connector.DBConnector()
-        _, (name, age, height) = conn.execute(sql.SQL(f"SELECT name, age, height FROM Critics WHERE id={actor_id}"))
-        return Actor(actor_id, name, age, height)
+        _, result = conn.execute_prepared("SELECT name, age, height FROM Actors WHERE id = $1", (actor_id,))
     except Exception as e:
         catchException(e, conn)
         return None
+    conn.close()
+    if result.isEmpty():
+        cachePut(actor_profiles, key, None, generation)
+        return Actor.badActor()
+    profile = (actor_id, result[0]['name'], result[0]['age'], result[0]['height'])
+    cachePut(actor_profiles, key, profile, generation)
+    return Actor.from_row(profile)
 
 
 def addMovie(movie: Movie) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO Movies(name, year, genere) VALUES({name}, {year}, {genere})").format(
-            name=sql.Literal(movie.getMovieName()), year=sql.Literal(movie.getYear()),
-            genere=sql.Literal(movie.getGenre())))
+        conn.execute_prepared("INSERT INTO Movies(name, year, genere) VALUES($1, $2, $3)",
+                              (movie.getMovieName(), movie.getYear(), movie.getGenre()))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        touchReports(movies=[(movie.getMovieName(), movie.getYear())])
+        movie_profiles.invalidate(batchKey((movie.getMovieName(), movie.getYear())))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
 
+# rows per INSERT statement in the batch insert functions
+BATCH_CHUNK_SIZE = 1000
+
+
+def addCritics(critics: List[Critic], chunk_size: int = BATCH_CHUNK_SIZE) -> List[ReturnValue]:
+    return insertBatch("Critics", ("id", "name"), 1,
+                       [(critic.getCriticID(), critic.getName()) for critic in critics], chunk_size,
+                       critic_profiles)
+
+
+def addActors(actors: List[Actor], chunk_size: int = BATCH_CHUNK_SIZE) -> List[ReturnValue]:
+    return insertBatch("Actors", ("id", "name", "age", "height"), 1,
+                       [(actor.getActorID(), actor.getActorName(), actor.getAge(), actor.getHeight())
+                        for actor in actors], chunk_size, actor_profiles)
+
+
+def addMovies(movies: List[Movie], chunk_size: int = BATCH_CHUNK_SIZE) -> List[ReturnValue]:
+    rows = [(movie.getMovieName(), movie.getYear(), movie.getGenre()) for movie in movies]
+    try:
+        return insertBatch("Movies", ("name", "year", "genere"), 2, rows, chunk_size, movie_profiles)
+    finally:
+        touchReports(movies=[row[:2] for row in rows])
+
+
+def addStudios(studios: List[Studio], chunk_size: int = BATCH_CHUNK_SIZE) -> List[ReturnValue]:
+    return insertBatch("Studios", ("id", "name"), 1,
+                       [(studio.getStudioID(), studio.getStudioName()) for studio in studios], chunk_size,
+                       studio_profiles)
+
+
+# inserts rows into table in one transaction, chunk_size rows per multi-row INSERT
+# the first key_len columns are the table's primary key, their entries in cache are invalidated
+# returns a ReturnValue per row: OK, ALREADY_EXISTS for an existing (or repeated) key, BAD_PARAMS for rows
+# that violate NOT NULL/CHECK, NOT_EXISTS for a missing foreign key and ERROR otherwise
+def insertBatch(table: str, columns: Tuple[str, ...], key_len: int, rows: List[tuple],
+                chunk_size: int = BATCH_CHUNK_SIZE, cache: Cache = None) -> List[ReturnValue]:
+    results = [ReturnValue.ERROR] * len(rows)
+    if len(rows) == 0:
+        return results
+    batch_query = sql.SQL("{insert} RETURNING {keys}").format(
+        insert=insertBatchQuery(table, columns, sql.SQL("%s")),
+        keys=sql.SQL(", ").join(map(sql.Identifier, columns[:key_len])))
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            conn.execute("SAVEPOINT insert_batch", commit=False)
+            try:
+                _, inserted = conn.execute_values(batch_query, chunk, page_size=len(chunk), fetch=True, commit=False)
+            except DatabaseException.ConnectionInvalid:
+                raise
+            except Exception:
+                # some row is invalid, find out which by inserting the chunk row by row
+                conn.execute("ROLLBACK TO SAVEPOINT insert_batch", commit=False)
+                for index, row in enumerate(chunk, start):
+                    results[index] = insertBatchRow(conn, table, columns, row)
+                continue
+            conn.execute("RELEASE SAVEPOINT insert_batch", commit=False)
+            # rows that were not returned hit an existing key, or repeat a key earlier in the chunk
+            inserted = {batchKey(key) for key in inserted}
+            for index, row in enumerate(chunk, start):
+                key = batchKey(row[:key_len])
+                if key in inserted:
+                    inserted.remove(key)
+                    results[index] = ReturnValue.OK
+                else:
+                    results[index] = ReturnValue.ALREADY_EXISTS
+        conn.commit()
+    except Exception as e:
+        catchException(e, conn)
+        return [ReturnValue.ERROR] * len(rows)
+    finally:
+        # the profiles of the new rows may be cached as missing
+        if cache is not None:
+            for row in rows:
+                cache.invalidate(batchKey(row[:key_len]))
+    conn.close()
+    return results
+
+
+def insertBatchQuery(table: str, columns: Tuple[str, ...], values: sql.Composable) -> sql.Composed:
+    return sql.SQL("INSERT INTO {table}({columns}) VALUES {values} ON CONFLICT DO NOTHING").format(
+        table=sql.Identifier(table.lower()), columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        values=values)
+
+
+def insertBatchRow(conn: Connector.DBConnector, table: str, columns: Tuple[str, ...], row: tuple) -> ReturnValue:
+    conn.execute("SAVEPOINT insert_batch_row", commit=False)
+    try:
+        row_effected, _ = conn.execute(insertBatchQuery(table, columns, sql.SQL("({})").format(
+            sql.SQL(", ").join(map(sql.Literal, row)))), commit=False)
+    except DatabaseException.ConnectionInvalid:
+        raise
+    except Exception as e:
+        conn.execute("ROLLBACK TO SAVEPOINT insert_batch_row", commit=False)
+        if isinstance(e, (DatabaseException.NOT_NULL_VIOLATION, DatabaseException.CHECK_VIOLATION)):
+            return ReturnValue.BAD_PARAMS
+        if isinstance(e, DatabaseException.UNIQUE_VIOLATION):
+            return ReturnValue.ALREADY_EXISTS
+        if isinstance(e, DatabaseException.FOREIGN_KEY_VIOLATION):
+            return ReturnValue.NOT_EXISTS
+        return ReturnValue.ERROR
+    conn.execute("RELEASE SAVEPOINT insert_batch_row", commit=False)
+    return ReturnValue.OK if row_effected == 1 else ReturnValue.ALREADY_EXISTS
+
+
+# keys returned by the server are typed, the ones given by the caller may not be (e.g. year="1996")
+def batchKey(key) -> tuple:
+    return tuple(str(value) for value in key)
+
+
 def catchException(e: Exception, conn: Any) -> ReturnValue:
     try:
         raise e
@@ -296,61 +919,93 @@ def deleteMovie(movie_name: str, year: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL(f"DELETE FROM Movies WHERE name={sql.Literal(movie_name)} AND year={sql.Literal(year)}"))
+        conn.execute_prepared("DELETE FROM Movies WHERE name = $1 AND year = $2", (movie_name, year))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        resetReports()
+        forgetMovieId(movie_name, year)
+        movie_profiles.invalidate(batchKey((movie_name, year)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
 
 def getMovieProfile(movie_name: str, year: int) -> Movie:
+    key = batchKey((movie_name, year))
+    profile = movie_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Movie.badMovie() if profile is None else Movie.from_row(profile)
+    generation = movie_profiles.generation()
     conn = None
     try:
         conn = Connector.DBConnector()
-        _, (genere) = conn.execute(sql.SQL(f"SELECT genere FROM Critics WHERE name={movie_name} AND year={year}"))
-        return Movie(movie_name, year, genere)
+        _, result = conn.execute_prepared("SELECT name, year, genere FROM Movies WHERE name = $1 AND year = $2",
+                                          (movie_name, year))
     except Exception as e:
         catchException(e, conn)
         return None
+    conn.close()
+    if result.isEmpty():
+        cachePut(movie_profiles, key, None, generation)
+        return Movie.badMovie()
+    # the row as the database has it, the arguments may be of other types (e.g. year="2000")
+    profile = (result[0]['name'], result[0]['year'], result[0]['genere'])
+    cachePut(movie_profiles, key, profile, generation)
+    return Movie.from_row(profile)
 
 
 def deleteStudio(studio_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL(f"DELETE FROM Movies WHERE if={sql.Literal(studio_id)}"))
+        conn.execute_prepared("DELETE FROM Studios WHERE id = $1", (studio_id,))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        resetReports()
+        studio_profiles.invalidate(batchKey((studio_id,)))
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
 
 def getStudioProfile(studio_id: int) -> Studio:
+    key = batchKey((studio_id,))
+    profile = studio_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Studio.badStudio() if profile is None else Studio.from_row(profile)
+    generation = studio_profiles.generation()
     conn = None
     try:
         conn = Connector.DBConnector()
-        _, (name) = conn.execute(sql.SQL(f"SELECT name FROM Studios WHERE id={studio_id}"))
-        return Studio(studio_id, name)
+        _, result = conn.execute_prepared("SELECT name FROM Studios WHERE id = $1", (studio_id,))
     except Exception as e:
         catchException(e, conn)
         return None
+    conn.close()
+    if result.isEmpty():
+        cachePut(studio_profiles, key, None, generation)
+        return Studio.badStudio()
+    profile = (studio_id, result[0]['name'])
+    cachePut(studio_profiles, key, profile, generation)
+    return Studio.from_row(profile)
 
 
 def criticRatedMovie(movieName: str, movieYear: int, criticID: int, rating: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO CriticsMovie(critic_id, movie_name, movie_year, rating) VALUES("
-            "{id}, {name}, {year}, {rating})").format(
-            id=sql.Literal(criticID), name=sql.Literal(movieName),
-            year=sql.Literal(movieYear), rating=sql.Literal(rating)))
+        if isCompactSchema(conn):
+            insertWithMovieId(conn, "INSERT INTO CriticsMovie(critic_id, movie_id, rating) VALUES($1, $2, $3)",
+                              movieName, movieYear, (criticID,), (rating,))
+        else:
+            conn.execute_prepared("INSERT INTO CriticsMovie(critic_id, movie_name, movie_year, rating) "
+                                  "VALUES($1, $2, $3, $4)", (criticID, movieName, movieYear, rating))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        touchReports(critics=[criticID])
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -360,11 +1015,18 @@ def criticDidntRateMovie(movieName: str, movieYear: int, criticID: int) -> Retur
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL(f"DELETE FROM CriticsMovie WHERE movie_name={sql.Literal(movieName)} AND "
-            f"movie_year={sql.Literal(movieYear)} AND critic_id={criticID}"))
+        if isCompactSchema(conn):
+            conn.execute_prepared("DELETE FROM CriticsMovie WHERE movie_id = "
+                                  "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2) AND critic_id = $3",
+                                  (movieName, movieYear, criticID))
+        else:
+            conn.execute_prepared("DELETE FROM CriticsMovie "
+                                  "WHERE movie_name = $1 AND movie_year = $2 AND critic_id = $3",
+                                  (movieName, movieYear, criticID))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        touchReports(critics=[criticID])
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -374,13 +1036,16 @@ def actorPlayedInMovie(movieName: str, movieYear: int, actorID: int, salary: int
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO CriticsMovie(actor_id, movie_name, movie_year, salary, roles) VALUES("
-            "{id}, {name}, {year}, {salary}, {roles})").format(
-            id=sql.Literal(actorID), name=sql.Literal(movieName), year=sql.Literal(movieYear),
-            rating=sql.Literal(salary), roles=sql.Literal(roles)))
+        if isCompactSchema(conn):
+            insertWithMovieId(conn, "INSERT INTO ActorsMovie(actor_id, movie_id, salary) VALUES($1, $2, $3)",
+                              movieName, movieYear, (actorID,), (salary,))
+        else:
+            conn.execute_prepared("INSERT INTO ActorsMovie(actor_id, movie_name, movie_year, salary) "
+                                  "VALUES($1, $2, $3, $4)", (actorID, movieName, movieYear, salary))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], actors=[actorID])
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -390,26 +1055,37 @@ def actorDidntPlayeInMovie(movieName: str, movieYear: int, actorID: int) -> Retu
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL(f"DELETE FROM ActoresMovie WHERE movie_name={sql.Literal(movieName)} AND "
-            f"movie_year={sql.Literal(movieYear)} AND actor_id={actorID}"))
+        if isCompactSchema(conn):
+            conn.execute_prepared("DELETE FROM ActorsMovie WHERE movie_id = "
+                                  "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2) AND actor_id = $3",
+                                  (movieName, movieYear, actorID))
+        else:
+            conn.execute_prepared("DELETE FROM ActorsMovie "
+                                  "WHERE movie_name = $1 AND movie_year = $2 AND actor_id = $3",
+                                  (movieName, movieYear, actorID))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], actors=[actorID])
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
+
 def studioProducedMovie(studioID: int, movieName: str, movieYear: int, budget: int, revenue: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        conn.execute(
-            sql.SQL("INSERT INTO StudiosMovie(studio_id, movie_name, movie_year, budget, revenue) VALUES("
-            "{id}, {name}, {year}, {budget}, {revenue})").format(
-            id=sql.Literal(studioID), name=sql.Literal(movieName), year=sql.Literal(movieYear),
-            budget=sql.Literal(budget), revenue=sql.Literal(revenue)))
+        if isCompactSchema(conn):
+            insertWithMovieId(conn, "INSERT INTO StudiosMovie(studio_id, movie_id, budget, revenue) "
+                                    "VALUES($1, $2, $3, $4)", movieName, movieYear, (studioID,), (budget, revenue))
+        else:
+            conn.execute_prepared("INSERT INTO StudiosMovie(studio_id, movie_name, movie_year, budget, revenue) "
+                                  "VALUES($1, $2, $3, $4, $5)", (studioID, movieName, movieYear, budget, revenue))
     except Exception as e:
         return catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], studios=[studioID])
     if conn is not None:
         conn.close()
     return ReturnValue.OK
@@ -419,54 +1095,219 @@ def studioDidntProduceMovie(studioID: int, movieName: str, movieYear: int) -> Re
     conn = None
     try:
         conn = Connector.DBConnector()
-        quer = "DELETE FROM StudiosMovie WHERE (movie_name='{m_name}' and movie_year={m_year} and studio_id={s_id})"\
-            .format(m_name=str(movieName), m_year=movieYear, s_id=studioID)
-        conn.execute(sql.SQL(quer))
-
+        if isCompactSchema(conn):
+            conn.execute_prepared("DELETE FROM StudiosMovie WHERE movie_id = "
+                                  "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2) AND studio_id = $3",
+                                  (movieName, movieYear, studioID))
+        else:
+            conn.execute_prepared("DELETE FROM StudiosMovie "
+                                  "WHERE movie_name = $1 AND movie_year = $2 AND studio_id = $3",
+                                  (movieName, movieYear, studioID))
     except Exception as e:
         catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], studios=[studioID])
     if conn is not None:
         conn.close()
     return ReturnValue.OK
 
 
-# ---------------------------------- BASIC API: ----------------------------------
-def averageRating(movieName: str, movieYear: int) -> float:
+# bulk loaders for the relationship tables, built on COPY FROM STDIN
+# source is an iterable of tuples (file_format="rows"), or a CSV/TSV file object or path
+# (file_format="csv"/"tsv", header=True skips the first line), with the columns in table order
+# returns (OK or ERROR, number of rows loaded, rejected rows as (row number, ReturnValue)),
+# row numbers are 1-based and exclude the header; rejected rows get BAD_PARAMS (missing or non-integer
+# value), NOT_EXISTS (missing critic/actor/studio or movie) or ALREADY_EXISTS (row already in the table
+# or repeated in the input)
+def loadCriticsMovie(source, file_format: str = "rows", header: bool = False) \
+        -> Tuple[ReturnValue, int, List[Tuple[int, ReturnValue]]]:
+    return bulkLoad("CriticsMovie", ("critic_id", "movie_name", "movie_year", "rating"), "Critics",
+                    source, file_format, header)
+
+
+def loadActorsMovie(source, file_format: str = "rows", header: bool = False) \
+        -> Tuple[ReturnValue, int, List[Tuple[int, ReturnValue]]]:
+    return bulkLoad("ActorsMovie", ("actor_id", "movie_name", "movie_year", "salary"), "Actors",
+                    source, file_format, header)
+
+
+def loadStudiosMovie(source, file_format: str = "rows", header: bool = False) \
+        -> Tuple[ReturnValue, int, List[Tuple[int, ReturnValue]]]:
+    return bulkLoad("StudiosMovie", ("studio_id", "movie_name", "movie_year", "budget", "revenue"), "Studios",
+                    source, file_format, header)
+
+
+# values the staging table accepts as INTEGER, anything else is rejected as BAD_PARAMS instead of failing the load:
+# up to 10 digits, which bulkLoad then checks are in the range of INTEGER
+INTEGER_PATTERN = r"^\s*[-+]?[0-9]{1,10}\s*$"
+
+
+# COPYs the input into a TEXT staging table, finds the rows that would violate a constraint with one
+# set-based pass, and moves the rest into table with a single INSERT ... SELECT, all in one transaction
+# columns are (entity id, movie_name, movie_year, integer values...), the entity id references parent(id)
+def bulkLoad(table: str, columns: Tuple[str, ...], parent: str, source, file_format: str, header: bool) \
+        -> Tuple[ReturnValue, int, List[Tuple[int, ReturnValue]]]:
+    if file_format not in ("rows", "csv", "tsv"):
+        raise ValueError("file_format must be rows, csv or tsv")
+    entity, name, year = columns[:3]
+    integers = [column for column in columns if column != name]
     conn = None
+    opened = None
     try:
+        if file_format == "rows":
+            source = CopyStream(source)
+        elif isinstance(source, str):
+            source = opened = open(source, newline="")
+        if header:
+            source.readline()
+
         conn = Connector.DBConnector()
-        quer = "SELECT avg(rating) FROM criticsmovie WHERE movie_name='{m_name}' AND movie_year={m_year}"\
-            .format(m_name=movieName, m_year=movieYear)
-        _, (aver) = conn.execute(sql.SQL(quer))
+        compact = isCompactSchema(conn)
+        conn.execute(sql.SQL("CREATE TEMP TABLE load_staging(line_no BIGSERIAL, {columns}) ON COMMIT DROP").format(
+            columns=sql.SQL(", ").join(sql.SQL("{} TEXT").format(sql.Identifier(column)) for column in columns)),
+            commit=False)
+        conn.copy_expert(sql.SQL("COPY load_staging({columns}) FROM STDIN WITH (FORMAT {format})").format(
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+            format=sql.SQL("csv" if file_format == "csv" else "text")), source, commit=False)
+        conn.execute("ANALYZE load_staging", commit=False)
+
+        # the integer columns are cast only in the select list of a MATERIALIZED CTE over the rows that passed the
+        # checks, so no cast of a bad value can be evaluated first (e.g. in a join to Movies) and fail the load
+        typed = sql.SQL("WITH typed AS MATERIALIZED (SELECT s.line_no, {columns} FROM load_staging s WHERE {valid}) ")
+        cast = sql.SQL(", ").join(
+            sql.SQL("s.{column}::integer AS {column}" if column in integers else "s.{column}").format(
+                column=sql.Identifier(column)) for column in columns)
+        value = {column: sql.SQL("v.{}").format(sql.Identifier(column)) for column in columns}
+        bad = sql.SQL(" OR ").join(
+            [sql.SQL("s.{} IS NULL").format(sql.Identifier(column)) for column in columns] +
+            # CASE, so only a value that matched is cast (to bigint, which holds every 10 digit number)
+            [sql.SQL("CASE WHEN s.{column} ~ {pattern} THEN s.{column}::bigint NOT BETWEEN -2147483648 AND 2147483647 "
+                     "ELSE TRUE END").format(column=sql.Identifier(column), pattern=sql.Literal(INTEGER_PATTERN))
+             for column in integers])
+        missing = sql.SQL("NOT EXISTS (SELECT 1 FROM {parent} p WHERE p.id = {entity}) OR "
+                          "NOT EXISTS (SELECT 1 FROM Movies m WHERE m.name = {name} AND m.year = {year})").format(
+            parent=sql.Identifier(parent.lower()), entity=value[entity], name=value[name], year=value[year])
+        if compact:
+            existing = sql.SQL("EXISTS (SELECT 1 FROM {table} t JOIN Movies m ON m.movie_id = t.movie_id "
+                               "WHERE t.{entity} = {entity_value} AND m.name = {name_value} AND m.year = {year_value})")
+        else:
+            existing = sql.SQL("EXISTS (SELECT 1 FROM {table} t WHERE t.{entity} = {entity_value} "
+                               "AND t.{name} = {name_value} AND t.{year} = {year_value})")
+        duplicate = sql.SQL("row_number() OVER (PARTITION BY {entity_value}, {name_value}, {year_value} "
+                            "ORDER BY v.line_no) > 1 OR {existing}").format(
+            entity_value=value[entity], name_value=value[name], year_value=value[year],
+            existing=existing.format(table=sql.Identifier(table.lower()), entity=sql.Identifier(entity),
+                                     name=sql.Identifier(name), year=sql.Identifier(year), entity_value=value[entity],
+                                     name_value=value[name], year_value=value[year]))
+        conn.execute(sql.SQL("CREATE TEMP TABLE load_rejects ON COMMIT DROP AS {typed}"
+                             "SELECT s.line_no, {bad_params} AS status FROM load_staging s WHERE {bad} "
+                             "UNION ALL "
+                             "SELECT line_no, status FROM ("
+                             "SELECT v.line_no, CASE WHEN {missing} THEN {not_exists} "
+                             "WHEN {duplicate} THEN {already_exists} END AS status "
+                             "FROM typed v) checked WHERE status IS NOT NULL").format(
+            typed=typed.format(columns=cast, valid=sql.SQL("NOT ({})").format(bad)), bad=bad, missing=missing,
+            duplicate=duplicate, bad_params=sql.Literal(ReturnValue.BAD_PARAMS.value),
+            not_exists=sql.Literal(ReturnValue.NOT_EXISTS.value),
+            already_exists=sql.Literal(ReturnValue.ALREADY_EXISTS.value)), commit=False)
+
+        if compact:
+            # the compact tables take movie_id in place of (movie_name, movie_year)
+            insert_columns = (entity, "movie_id") + columns[3:]
+            values = [value[entity], sql.SQL("m.movie_id")] + [value[column] for column in columns[3:]]
+            source_tables = sql.SQL("typed v JOIN Movies m ON m.name = {name} AND m.year = {year}").format(
+                name=value[name], year=value[year])
+        else:
+            insert_columns = columns
+            values = [value[column] for column in columns]
+            source_tables = sql.SQL("typed v")
+        loaded, _ = conn.execute(sql.SQL("{typed}INSERT INTO {table}({columns}) SELECT {values} FROM {source} "
+                                         "ON CONFLICT DO NOTHING").format(
+            typed=typed.format(columns=cast, valid=sql.SQL(
+                "NOT EXISTS (SELECT 1 FROM load_rejects r WHERE r.line_no = s.line_no)")),
+            table=sql.Identifier(table.lower()), columns=sql.SQL(", ").join(map(sql.Identifier, insert_columns)),
+            values=sql.SQL(", ").join(values), source=source_tables), commit=False)
+        _, rejects = conn.execute("SELECT line_no, status FROM load_rejects ORDER BY line_no", commit=False)
+        conn.commit()
+    except Exception as e:
+        catchException(e, conn)
+        return ReturnValue.ERROR, 0, []
+    finally:
+        resetReports()
+        if opened is not None:
+            opened.close()
+    conn.close()
+    return ReturnValue.OK, loaded, [(rejects[i]['line_no'], ReturnValue(rejects[i]['status']))
+                                    for i in range(rejects.size())]
 
-        # select avg(rating), year, name from
-        # movies inner join criticsmovie
-        # ON (year=movie_year and name=movie_name)
-        # group by year, name
 
+# ---------------------------------- BASIC API: ----------------------------------
 
-        return aver
+# the average rating of the movie, 0.0 if it has no ratings or does not exist, None on a database error
+def averageRating(movieName: str, movieYear: int) -> float:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        if isCompactSchema(conn):
+            _, result = conn.execute_prepared("SELECT rating_sum::float8 / NULLIF(rating_count, 0) AS avg "
+                                              "FROM MovieRatingStats WHERE movie_id = "
+                                              "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2)",
+                                              (movieName, movieYear))
+        else:
+            _, result = conn.execute_prepared("SELECT rating_sum::float8 / NULLIF(rating_count, 0) AS avg "
+                                              "FROM MovieRatingStats WHERE movie_name = $1 AND movie_year = $2",
+                                              (movieName, movieYear))
     except Exception as e:
         catchException(e, conn)
         return None
+    conn.close()
+    if result.isEmpty() or result[0]['avg'] is None:
+        return 0.0
+    return result[0]['avg']
 
 
+# the average of the average ratings of the rated movies the actor played in, 0.0 if there are none, None on a
+# database error
+# only the actor's rows of ActorsMovie are read (primary key range) and each movie's average is a
+# MovieRatingStats lookup, nothing is aggregated over CriticsMovie
 def averageActorRating(actorID: int) -> float:
     conn = None
     try:
         conn = Connector.DBConnector()
-        quer = "select avg(rating) from actorsmovie join criticsmovie " \
-               "ON (actorsmovie.movie_year=criticsmovie.movie_year " \
-               "and actorsmovie.movie_name=criticsmovie.movie_name) " \
-               "group by criticsmovie.movie_year, criticsmovie.movie_name, actor_id " \
-               "HAVING actor_id={a_id}" \
-            .format(a_id=actorID)
-        _, (aver) = conn.execute(sql.SQL(quer))
+        _, result = conn.execute_prepared("SELECT coalesce(avg(s.rating_sum::float8 / s.rating_count), 0) AS avg "
+                                          "FROM ActorsMovie am JOIN MovieRatingStats s ON " +
+                                          movieJoinCondition(isCompactSchema(conn), "am", "s") + " "
+                                          "WHERE am.actor_id = $1 AND s.rating_count > 0", (actorID,))
+    except Exception as e:
+        catchException(e, conn)
+        return None
+    conn.close()
+    return result[0]['avg']
+
 
-        return aver
+# averageActorRating of many actors in one query: of the given actor ids, or of every actor if actor_ids is None
+# returns actor id -> average, 0.0 for actors without rated movies (and ids of no actor), or None on a database error
+def averageActorRatings(actor_ids: List[int] = None) -> dict:
+    conn = None
+    averages = {} if actor_ids is None else {actor_id: 0.0 for actor_id in actor_ids}
+    try:
+        conn = Connector.DBConnector()
+        query = ("SELECT a.id, coalesce(avg(s.rating_sum::float8 / s.rating_count), 0) AS avg "
+                 "FROM Actors a LEFT JOIN ActorsMovie am ON am.actor_id = a.id "
+                 "LEFT JOIN MovieRatingStats s ON " + movieJoinCondition(isCompactSchema(conn), "am", "s") + " "
+                 "AND s.rating_count > 0 ")
+        if actor_ids is None:
+            rows = conn.execute_stream(query + "GROUP BY a.id")
+        else:
+            _, result = conn.execute_prepared(query + "WHERE a.id = ANY($1) GROUP BY a.id", (list(actor_ids),))
+            rows = result.itertuples()
+        for actor_id, average in rows:
+            averages[actor_id] = average
     except Exception as e:
         catchException(e, conn)
         return None
+    conn.close()
+    return averages
 
 
 def bestPerformance(actor_id: int) -> Movie:
@@ -487,81 +1328,307 @@ def overlyInvestedInMovie(movie_name: str, movie_year: int, actor_id: int) -> bo
 # ---------------------------------- ADVANCED API: ----------------------------------
 
 
-def franchiseRevenue() -> List[Tuple[str, int]]:
-    # TODO: implement
-    pass
-
-
-def studioRevenueByYear() -> List[Tuple[str, int]]:
-    # TODO: implement
-    pass
+# every ADVANCED report is one set-based query whose result is streamed from a server-side cursor
+# with incremental=True a report reuses its previous result and recomputes only the part affected by the
+# changes made through this process since then (see touchReports), so a refresh costs time proportional to
+# the change rate; the first run, a run after resetReports and a run REPORT_FULL_REFRESH seconds after the
+# last full one, which bounds how long changes made by other processes can go unseen, compute the whole report
+REPORT_FULL_REFRESH = 300.0
+REPORT_CHANGES = ("movies", "critics", "actors", "studios")
+report_lock = threading.Lock()
+# report name -> its previous result, when it was fully computed and the changes made since
+report_states = {}
+
+
+# records changes for the next incremental run of the reports: movies as (name, year), the others as ids
+def touchReports(movies=(), critics=(), actors=(), studios=()):
+    with report_lock:
+        for state in report_states.values():
+            state["movies"].update(tuple(movie) for movie in movies)
+            state["critics"].update(critics)
+            state["actors"].update(actors)
+            state["studios"].update(studios)
+
+
+# drops the previous results, the next run of every report is a full one
+# for changes whose effect on the reports is unknown: deleted movies, actors or studios, bulk loads...
+def resetReports():
+    with report_lock:
+        for state in report_states.values():
+            state["rows"] = None
+            state["generation"] += 1
+            for change in REPORT_CHANGES:
+                state[change] = set()
+
+
+# runs a report: query(conn, compact, condition) is its SQL restricted by condition, order sorts its rows
+# incrementally, affected(conn, compact, changes) returns the parameters of the incremental condition (lists
+# of the report keys touched by the changes), the previous rows that stale(row, keys) marks are recomputed
+def runReport(report: str, incremental: bool, query, condition: str, affected, stale, order, descending: bool) \
+        -> List[tuple]:
+    with report_lock:
+        state = report_states.setdefault(report, {"rows": None, "generation": 0, "computed_at": 0.0,
+                                                  **{change: set() for change in REPORT_CHANGES}})
+        changes = {change: state[change] for change in REPORT_CHANGES}
+        for change in REPORT_CHANGES:
+            state[change] = set()
+        previous, generation, computed_at = state["rows"], state["generation"], state["computed_at"]
+    full = not incremental or previous is None or time.monotonic() - computed_at > REPORT_FULL_REFRESH
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        compact = isCompactSchema(conn)
+        if full:
+            computed_at = time.monotonic()
+            rows = list(conn.execute_stream(query(conn, compact, "TRUE")))
+        else:
+            keys = affected(conn, compact, changes)
+            key_sets = tuple(set(key) for key in keys)
+            rows = [row for row in previous if not stale(row, *key_sets)]
+            if any(keys):
+                rows.extend(conn.execute_stream(query(conn, compact, condition), params=keys))
+        rows.sort(key=order, reverse=descending)
+    except Exception as e:
+        catchException(e, conn)
+        resetReports()
+        return []
+    conn.close()
+    with report_lock:
+        if state["generation"] == generation:
+            state["rows"] = rows
+            state["computed_at"] = computed_at
+    return list(rows)
+
+
+# join condition between Movies and a table that references a movie
+def movieKeyCondition(compact: bool, movies: str, table: str) -> str:
+    if compact:
+        return movies + ".movie_id = " + table + ".movie_id"
+    return "(" + movies + ".name, " + movies + ".year) = (" + table + ".movie_name, " + table + ".movie_year)"
+
+
+# the changed movies as the parameters of "(name, year) IN (SELECT * FROM unnest(%s::text[], %s::integer[]))"
+def changedMovies(changes: dict) -> Tuple[list, list]:
+    return [name for name, _ in changes["movies"]], [year for _, year in changes["movies"]]
+
+
+# (movie name, total revenue of all the movies with that name), names descending
+# read from FranchiseRevenue when createTables made the revenue summaries
+def franchiseRevenue(incremental: bool = False) -> List[Tuple[str, int]]:
+    return runReport("franchiseRevenue", incremental,
+                     lambda conn, compact, condition:
+                     "SELECT m.name, m.revenue FROM FranchiseRevenue m WHERE " + condition
+                     if revenueViews(conn) else
+                     "SELECT m.name, COALESCE(SUM(sm.revenue), 0) AS revenue "
+                     "FROM Movies m LEFT JOIN StudiosMovie sm ON " + movieKeyCondition(compact, "m", "sm") + " "
+                     "WHERE " + condition + " GROUP BY m.name",
+                     "m.name = ANY(%s)",
+                     lambda conn, compact, changes: (changedMovies(changes)[0],),
+                     lambda row, names: row[0] in names,
+                     lambda row: row[0], True)
+
+
+# (studio id, year, total revenue of the studio's movies of that year), studio and year descending
+# read from StudioRevenueByYear when createTables made the revenue summaries
+def studioRevenueByYear(incremental: bool = False) -> List[Tuple[int, int, int]]:
+    return runReport("studioRevenueByYear", incremental,
+                     lambda conn, compact, condition:
+                     "SELECT sm.studio_id, sm.year, sm.revenue FROM StudioRevenueByYear sm WHERE " + condition
+                     if revenueViews(conn) else
+                     "SELECT sm.studio_id, m.year, SUM(sm.revenue) AS revenue "
+                     "FROM StudiosMovie sm JOIN Movies m ON " + movieKeyCondition(compact, "m", "sm") + " "
+                     "WHERE " + condition + " GROUP BY sm.studio_id, m.year",
+                     "sm.studio_id = ANY(%s)",
+                     lambda conn, compact, changes: (list(changes["studios"]),),
+                     lambda row, studios: row[0] in studios,
+                     lambda row: (row[0], row[1]), True)
+
+
+# (critic id, studio id) for every critic who rated all the movies of a studio, critic and studio descending
+def getFanCritics(incremental: bool = False) -> List[Tuple[int, int]]:
+    return runReport("getFanCritics", incremental,
+                     lambda conn, compact, condition:
+                     "SELECT cm.critic_id, sm.studio_id "
+                     "FROM StudiosMovie sm JOIN CriticsMovie cm ON " + movieJoinCondition(compact, "sm", "cm") + " "
+                     # the movies of every studio counted in one pass, not once per (critic, studio) group
+                     "JOIN (SELECT studio_id, COUNT(*) AS movies FROM StudiosMovie GROUP BY studio_id) p "
+                     "ON p.studio_id = sm.studio_id "
+                     "WHERE " + condition + " GROUP BY cm.critic_id, sm.studio_id, p.movies "
+                     "HAVING COUNT(*) = p.movies",
+                     "(cm.critic_id = ANY(%s) OR sm.studio_id = ANY(%s))",
+                     lambda conn, compact, changes: (list(changes["critics"]), list(changes["studios"])),
+                     lambda row, critics, studios: row[0] in critics or row[1] in studios,
+                     lambda row: (row[0], row[1]), True)
+
+
+# (genre, average age of the actors who played in a movie of that genre), genres without actors are left out
+def averageAgeByGenre(incremental: bool = False) -> List[Tuple[str, float]]:
+    return runReport("averageAgeByGenre", incremental,
+                     lambda conn, compact, condition:
+                     "SELECT g.genere, AVG(a.age)::float AS average_age "
+                     "FROM (SELECT DISTINCT m.genere, am.actor_id FROM Movies m JOIN ActorsMovie am ON " +
+                     movieKeyCondition(compact, "m", "am") + " WHERE " + condition + ") g "
+                     "JOIN Actors a ON a.id = g.actor_id GROUP BY g.genere",
+                     "m.genere = ANY(%s)",
+                     changedGenres,
+                     lambda row, genres: row[0] in genres,
+                     lambda row: row[0], False)
+
+
+def changedGenres(conn: Connector.DBConnector, compact: bool, changes: dict) -> Tuple[list]:
+    if not changes["movies"]:
+        return ([],)
+    _, result = conn.execute("SELECT DISTINCT genere FROM Movies "
+                             "WHERE (name, year) IN (SELECT * FROM unnest(%s::text[], %s::integer[]))",
+                             commit=False, params=changedMovies(changes))
+    return [genre for genre, in result.itertuples()],
+
+
+# (actor id, studio id) for every actor whose movies were all produced by that one studio, actor descending
+def getExclusiveActors(incremental: bool = False) -> List[Tuple[int, int]]:
+    return runReport("getExclusiveActors", incremental,
+                     lambda conn, compact, condition:
+                     "SELECT am.actor_id, MIN(sm.studio_id) AS studio_id "
+                     "FROM ActorsMovie am LEFT JOIN StudiosMovie sm ON " + movieJoinCondition(compact, "am", "sm") + " "
+                     "WHERE " + condition + " GROUP BY am.actor_id "
+                     "HAVING COUNT(DISTINCT sm.studio_id) = 1 AND COUNT(*) = COUNT(sm.studio_id)",
+                     "am.actor_id = ANY(%s)",
+                     changedActors,
+                     lambda row, actors: row[0] in actors,
+                     lambda row: row[0], True)
+
+
+# the changed actors and the actors of the changed movies
+def changedActors(conn: Connector.DBConnector, compact: bool, changes: dict) -> Tuple[list]:
+    actors = set(changes["actors"])
+    if changes["movies"]:
+        _, result = conn.execute("SELECT DISTINCT am.actor_id FROM ActorsMovie am JOIN Movies m ON " +
+                                 movieKeyCondition(compact, "m", "am") + " "
+                                 "WHERE (m.name, m.year) IN (SELECT * FROM unnest(%s::text[], %s::integer[]))",
+                                 commit=False, params=changedMovies(changes))
+        actors.update(actor for actor, in result.itertuples())
+    return (list(actors),)
 
 
-def getFanCritics() -> List[Tuple[int, int]]:
-    # TODO: implement
-    pass
+def getMovies(printSchema: bool = False):
+    return printTable("Movies", printSchema)
 
 
-def averageAgeByGenre() -> List[Tuple[str, float]]:
-    # TODO: implement
-    pass
+def getActors(printSchema: bool = False):
+    return printTable("Actors", printSchema)
 
 
-def getExclusiveActors() -> List[Tuple[int, int]]:
-    # TODO: implement
-    pass
+def getStudios(printSchema: bool = False):
+    return printTable("Studios", printSchema)
 
 
-def getMovies(printSchema: bool = False):
-    conn = None
-    Connector.ResultSet()
-    try:
-        conn = Connector.DBConnector()
-        conn.execute("SELECT * FROM Movies", printSchema=printSchema)
-    except Exception as e:
-        return catchException(e, conn)
-    if conn is not None:
-        conn.close()
-    return ReturnValue.OK
+def getCritics(printSchema: bool = False):
+    return printTable("Critics", printSchema)
 
 
-def getActors(printSchema: bool = False):
+# prints the whole table in the format of ResultSet, streaming it from a server-side cursor
+# so the table is never held in memory; without printSchema only checks the table can be read
+def printTable(table: str, printSchema: bool) -> ReturnValue:
     conn = None
-    Connector.ResultSet()
     try:
         conn = Connector.DBConnector()
-        conn.execute("SELECT * FROM Actors", printSchema=printSchema)
+        if not printSchema:
+            conn.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(sql.Identifier(table.lower())))
+        else:
+            formatter = ResultSetFormatter(sys.stdout)
+            for batch in conn.execute_stream(sql.SQL("SELECT * FROM {}").format(sql.Identifier(table.lower())),
+                                             batches=True):
+                if formatter.written == 0:
+                    formatter.header(batch.cols_header)
+                formatter.rows(batch.rows)
+            if formatter.written == 0:
+                formatter.header([])
+            print()
     except Exception as e:
         return catchException(e, conn)
-    if conn is not None:
-        conn.close()
+    conn.close()
     return ReturnValue.OK
 
 
-def getStudios(printSchema: bool = False):
-    conn = None
-    Connector.ResultSet()
+# ---------------------------------- TRANSACTIONS: ----------------------------------
+
+# with transaction() as tx: the API calls made in the block by this thread run on one connection and commit
+# once at the end, or not at all, see Connector.Transaction; tx.savepoint() isolates calls that may fail
+# a transaction() inside another one is a savepoint of it
+# the calls in it do not fill the caches (see cachePut), which are cleared when anything is rolled back
+# with autosavepoint=True every call runs in a savepoint of its own, so a failed call is undone alone and the
+# calls after it carry on, as they would outside a transaction (see Tests/abstractTest.py)
+def transaction(autosavepoint: bool = False):
+    current = Connector.Transaction.current()
+    if current is not None:
+        return current.savepoint()
+    return Connector.Transaction(on_rollback=clearCaches, autosavepoint=autosavepoint)
+
+
+# ---------------------------------- CONCURRENT CALLS: ----------------------------------
+
+# threads gather runs calls on; each running call holds a pooled connection, so keep it at most the pool's maxconn
+GATHER_WORKERS = 8
+gather_executor = None
+gather_pid = None
+gather_lock = threading.Lock()
+gather_worker = threading.local()
+
+
+def configureGather(max_workers: int = GATHER_WORKERS):
+    global GATHER_WORKERS, gather_executor
+    with gather_lock:
+        GATHER_WORKERS = max_workers
+        if gather_executor is not None:
+            gather_executor.shutdown(wait=False)
+            gather_executor = None
+
+
+# runs independent calls concurrently on a bounded thread pool and returns their results in order, so the
+# latency is that of the slowest call rather than the sum; a call is a (function, arg, ...) tuple or a
+# callable taking no arguments, e.g. gather((getActorProfile, 1), (averageActorRating, 1))
+# an exception raised by a call is raised once all the calls are done, the first one in call order, or
+# with return_exceptions=True put in the call's place in the results
+# calls made from inside a gathered call run serially, so nested gathers cannot starve the pool
+# the calls run on other threads, so they are not part of a transaction() open in the calling thread
+def gather(*calls, return_exceptions: bool = False) -> list:
+    calls = [(lambda call=call: call[0](*call[1:])) if isinstance(call, tuple) else call for call in calls]
+    if getattr(gather_worker, "active", False) or len(calls) <= 1:
+        futures = [runGathered(call) for call in calls]
+    else:
+        executor = gatherExecutor()
+        futures = [executor.submit(runGathered, call) for call in calls]
+        futures = [future.result() for future in futures]
+    results = []
+    for result, error in futures:
+        if error is not None and not return_exceptions:
+            raise error
+        results.append(error if error is not None else result)
+    return results
+
+
+# (result, None) or (None, the exception raised)
+# a dispatcher: the statements of the call are charged to the API function it calls, see Utility.Instrumentation
+@dispatcher
+def runGathered(call) -> Tuple[Any, Optional[BaseException]]:
+    active = getattr(gather_worker, "active", False)
+    gather_worker.active = True
     try:
-        conn = Connector.DBConnector()
-        conn.execute("SELECT * FROM Studios", printSchema=printSchema)
+        return call(), None
     except Exception as e:
-        return catchException(e, conn)
-    if conn is not None:
-        conn.close()
-    return ReturnValue.OK
+        return None, e
+    finally:
+        gather_worker.active = active
 
 
-def getCritics(printSchema: bool = False):
-    conn = None
-    Connector.ResultSet()
-    try:
-        conn = Connector.DBConnector()
-        conn.execute("SELECT * FROM Critics", printSchema=printSchema)
-    except Exception as e:
-        return catchException(e, conn)
-    if conn is not None:
-        conn.close()
-    return ReturnValue.OK
+# the process-wide executor, a forked child gets its own
+def gatherExecutor() -> ThreadPoolExecutor:
+    global gather_executor, gather_pid
+    with gather_lock:
+        if gather_executor is None or gather_pid != os.getpid():
+            gather_executor = ThreadPoolExecutor(max_workers=GATHER_WORKERS, thread_name_prefix="gather")
+            gather_pid = os.getpid()
+        return gather_executor
 
 
 # GOOD LUCK!
@@ -0,0 +1,441 @@
+from typing import Any, List, Optional
+
+import Sol
+from Sol import batchKey, touchReports, resetReports, forgetMovieId, movieJoinCondition
+from Utility.AsyncDBConnector import AsyncDBConnector
+from Utility.Cache import Cache
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+from Business.Studio import Studio
+from Utility.Exceptions import DatabaseException
+from Utility.ReturnValue import ReturnValue
+
+
+# async def counterparts of the CRUD and BASIC API of Sol.py for asyncio code: same arguments, results and
+# queries, run on AsyncDBConnector so many calls can be in flight on one event loop; they share Sol's
+# profile caches, movie_id cache and report change tracking, so the two APIs can be mixed in one process
+
+
+async def catchException(e: Exception, conn: Any) -> ReturnValue:
+    Sol.catchException(e, None)
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def isCompactSchema(conn: AsyncDBConnector) -> bool:
+    if Sol.compact_schema is None:
+        _, result = await conn.execute("SELECT EXISTS (SELECT 1 FROM pg_attribute "
+                                       "WHERE attrelid = to_regclass('criticsmovie') AND attname = 'movie_id' "
+                                       "AND NOT attisdropped) AS compact")
+        Sol.compact_schema = result[0]['compact']
+    return Sol.compact_schema
+
+
+# see Sol.movieId
+async def movieId(conn: AsyncDBConnector, movieName: str, movieYear: int) -> Optional[int]:
+    key = batchKey((movieName, movieYear))
+    movie_id = Sol.movie_ids.lookup(key)
+    if movie_id is not Cache.MISSING:
+        return movie_id
+    generation = Sol.movie_ids.generation()
+    _, result = await conn.execute_prepared("SELECT movie_id FROM Movies WHERE name = $1 AND year = $2",
+                                            (movieName, movieYear))
+    if result.isEmpty():
+        return None
+    movie_id = result[0]['movie_id']
+    Sol.movie_ids.put(key, movie_id, generation)
+    return movie_id
+
+
+# see Sol.insertWithMovieId
+async def insertWithMovieId(conn: AsyncDBConnector, query: str, movieName: str, movieYear: int,
+                            params_before: tuple, params_after: tuple) -> int:
+    movie_id = await movieId(conn, movieName, movieYear)
+    if movie_id is None:
+        raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
+    try:
+        row_effected, _ = await conn.execute_prepared(query, params_before + (movie_id,) + params_after)
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        forgetMovieId(movieName, movieYear)
+        raise
+    return row_effected
+
+
+# ---------------------------------- CRUD API: ----------------------------------
+
+async def addCritic(critic: Critic) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("INSERT INTO Critics(id, name) VALUES($1, $2)",
+                                    (critic.getCriticID(), critic.getName()))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        Sol.critic_profiles.invalidate(batchKey((critic.getCriticID(),)))
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def deleteCritic(critic_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("DELETE FROM Critics WHERE id = $1", (critic_id,))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        Sol.critic_profiles.invalidate(batchKey((critic_id,)))
+        touchReports(critics=[critic_id])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def getCriticProfile(critic_id: int) -> Critic:
+    key = batchKey((critic_id,))
+    profile = Sol.critic_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Critic.badCritic() if profile is None else Critic.from_row(profile)
+    generation = Sol.critic_profiles.generation()
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        _, result = await conn.execute_prepared("SELECT name FROM Critics WHERE id = $1", (critic_id,))
+    except Exception as e:
+        await catchException(e, conn)
+        return None
+    await conn.close()
+    if result.isEmpty():
+        Sol.critic_profiles.put(key, None, generation)
+        return Critic.badCritic()
+    profile = (critic_id, result[0]['name'])
+    Sol.critic_profiles.put(key, profile, generation)
+    return Critic.from_row(profile)
+
+
+async def addActor(actor: Actor) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("INSERT INTO Actors(id, name, age, height) VALUES($1, $2, $3, $4)",
+                                    (actor.getActorID(), actor.getActorName(), actor.getAge(), actor.getHeight()))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        Sol.actor_profiles.invalidate(batchKey((actor.getActorID(),)))
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def deleteActor(actor_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("DELETE FROM Actors WHERE id = $1", (actor_id,))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        Sol.actor_profiles.invalidate(batchKey((actor_id,)))
+        resetReports()
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def getActorProfile(actor_id: int) -> Actor:
+    key = batchKey((actor_id,))
+    profile = Sol.actor_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Actor.badActor() if profile is None else Actor.from_row(profile)
+    generation = Sol.actor_profiles.generation()
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        _, result = await conn.execute_prepared("SELECT name, age, height FROM Actors WHERE id = $1", (actor_id,))
+    except Exception as e:
+        await catchException(e, conn)
+        return None
+    await conn.close()
+    if result.isEmpty():
+        Sol.actor_profiles.put(key, None, generation)
+        return Actor.badActor()
+    profile = (actor_id, result[0]['name'], result[0]['age'], result[0]['height'])
+    Sol.actor_profiles.put(key, profile, generation)
+    return Actor.from_row(profile)
+
+
+async def addMovie(movie: Movie) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("INSERT INTO Movies(name, year, genere) VALUES($1, $2, $3)",
+                                    (movie.getMovieName(), movie.getYear(), movie.getGenre()))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        Sol.movie_profiles.invalidate(batchKey((movie.getMovieName(), movie.getYear())))
+        touchReports(movies=[(movie.getMovieName(), movie.getYear())])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def deleteMovie(movie_name: str, year: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("DELETE FROM Movies WHERE name = $1 AND year = $2", (movie_name, year))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        forgetMovieId(movie_name, year)
+        Sol.movie_profiles.invalidate(batchKey((movie_name, year)))
+        resetReports()
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def getMovieProfile(movie_name: str, year: int) -> Movie:
+    key = batchKey((movie_name, year))
+    profile = Sol.movie_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Movie.badMovie() if profile is None else Movie.from_row(profile)
+    generation = Sol.movie_profiles.generation()
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        _, result = await conn.execute_prepared("SELECT name, year, genere FROM Movies WHERE name = $1 AND year = $2",
+                                                (movie_name, year))
+    except Exception as e:
+        await catchException(e, conn)
+        return None
+    await conn.close()
+    if result.isEmpty():
+        Sol.movie_profiles.put(key, None, generation)
+        return Movie.badMovie()
+    profile = (result[0]['name'], result[0]['year'], result[0]['genere'])
+    Sol.movie_profiles.put(key, profile, generation)
+    return Movie.from_row(profile)
+
+
+async def addStudio(studio: Studio) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("INSERT INTO Studios(id, name) VALUES($1, $2)",
+                                    (studio.getStudioID(), studio.getStudioName()))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        Sol.studio_profiles.invalidate(batchKey((studio.getStudioID(),)))
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def deleteStudio(studio_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        await conn.execute_prepared("DELETE FROM Studios WHERE id = $1", (studio_id,))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        Sol.studio_profiles.invalidate(batchKey((studio_id,)))
+        resetReports()
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def getStudioProfile(studio_id: int) -> Studio:
+    key = batchKey((studio_id,))
+    profile = Sol.studio_profiles.lookup(key)
+    if profile is not Cache.MISSING:
+        return Studio.badStudio() if profile is None else Studio.from_row(profile)
+    generation = Sol.studio_profiles.generation()
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        _, result = await conn.execute_prepared("SELECT name FROM Studios WHERE id = $1", (studio_id,))
+    except Exception as e:
+        await catchException(e, conn)
+        return None
+    await conn.close()
+    if result.isEmpty():
+        Sol.studio_profiles.put(key, None, generation)
+        return Studio.badStudio()
+    profile = (studio_id, result[0]['name'])
+    Sol.studio_profiles.put(key, profile, generation)
+    return Studio.from_row(profile)
+
+
+async def criticRatedMovie(movieName: str, movieYear: int, criticID: int, rating: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            await insertWithMovieId(conn, "INSERT INTO CriticsMovie(critic_id, movie_id, rating) VALUES($1, $2, $3)",
+                                    movieName, movieYear, (criticID,), (rating,))
+        else:
+            await conn.execute_prepared("INSERT INTO CriticsMovie(critic_id, movie_name, movie_year, rating) "
+                                        "VALUES($1, $2, $3, $4)", (criticID, movieName, movieYear, rating))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        touchReports(critics=[criticID])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def criticDidntRateMovie(movieName: str, movieYear: int, criticID: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            await conn.execute_prepared("DELETE FROM CriticsMovie WHERE movie_id = "
+                                        "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2) "
+                                        "AND critic_id = $3", (movieName, movieYear, criticID))
+        else:
+            await conn.execute_prepared("DELETE FROM CriticsMovie "
+                                        "WHERE movie_name = $1 AND movie_year = $2 AND critic_id = $3",
+                                        (movieName, movieYear, criticID))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        touchReports(critics=[criticID])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def actorPlayedInMovie(movieName: str, movieYear: int, actorID: int, salary: int,
+                             roles: List[str]) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            await insertWithMovieId(conn, "INSERT INTO ActorsMovie(actor_id, movie_id, salary) VALUES($1, $2, $3)",
+                                    movieName, movieYear, (actorID,), (salary,))
+        else:
+            await conn.execute_prepared("INSERT INTO ActorsMovie(actor_id, movie_name, movie_year, salary) "
+                                        "VALUES($1, $2, $3, $4)", (actorID, movieName, movieYear, salary))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], actors=[actorID])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def actorDidntPlayeInMovie(movieName: str, movieYear: int, actorID: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            await conn.execute_prepared("DELETE FROM ActorsMovie WHERE movie_id = "
+                                        "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2) "
+                                        "AND actor_id = $3", (movieName, movieYear, actorID))
+        else:
+            await conn.execute_prepared("DELETE FROM ActorsMovie "
+                                        "WHERE movie_name = $1 AND movie_year = $2 AND actor_id = $3",
+                                        (movieName, movieYear, actorID))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], actors=[actorID])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def studioProducedMovie(studioID: int, movieName: str, movieYear: int, budget: int,
+                              revenue: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            await insertWithMovieId(conn, "INSERT INTO StudiosMovie(studio_id, movie_id, budget, revenue) "
+                                          "VALUES($1, $2, $3, $4)", movieName, movieYear, (studioID,),
+                                    (budget, revenue))
+        else:
+            await conn.execute_prepared("INSERT INTO StudiosMovie(studio_id, movie_name, movie_year, budget, "
+                                        "revenue) VALUES($1, $2, $3, $4, $5)",
+                                        (studioID, movieName, movieYear, budget, revenue))
+    except Exception as e:
+        return await catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], studios=[studioID])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+async def studioDidntProduceMovie(studioID: int, movieName: str, movieYear: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            await conn.execute_prepared("DELETE FROM StudiosMovie WHERE movie_id = "
+                                        "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2) "
+                                        "AND studio_id = $3", (movieName, movieYear, studioID))
+        else:
+            await conn.execute_prepared("DELETE FROM StudiosMovie "
+                                        "WHERE movie_name = $1 AND movie_year = $2 AND studio_id = $3",
+                                        (movieName, movieYear, studioID))
+    except Exception as e:
+        await catchException(e, conn)
+    finally:
+        touchReports(movies=[(movieName, movieYear)], studios=[studioID])
+    if conn is not None:
+        await conn.close()
+    return ReturnValue.OK
+
+
+# ---------------------------------- BASIC API: ----------------------------------
+
+# see Sol.averageRating: 0.0 without ratings, None on a database error
+async def averageRating(movieName: str, movieYear: int) -> float:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        if await isCompactSchema(conn):
+            _, result = await conn.execute_prepared("SELECT rating_sum::float8 / NULLIF(rating_count, 0) AS avg "
+                                                    "FROM MovieRatingStats WHERE movie_id = "
+                                                    "(SELECT movie_id FROM Movies WHERE name = $1 AND year = $2)",
+                                                    (movieName, movieYear))
+        else:
+            _, result = await conn.execute_prepared("SELECT rating_sum::float8 / NULLIF(rating_count, 0) AS avg "
+                                                    "FROM MovieRatingStats WHERE movie_name = $1 AND movie_year = $2",
+                                                    (movieName, movieYear))
+    except Exception as e:
+        await catchException(e, conn)
+        return None
+    await conn.close()
+    if result.isEmpty() or result[0]['avg'] is None:
+        return 0.0
+    return result[0]['avg']
+
+
+# see Sol.averageActorRating: 0.0 without rated movies, None on a database error
+async def averageActorRating(actorID: int) -> float:
+    conn = None
+    try:
+        conn = await AsyncDBConnector.open()
+        _, result = await conn.execute_prepared("SELECT coalesce(avg(s.rating_sum::float8 / s.rating_count), 0) AS avg "
+                                                "FROM ActorsMovie am JOIN MovieRatingStats s ON " +
+                                                movieJoinCondition(await isCompactSchema(conn), "am", "s") + " "
+                                                "WHERE am.actor_id = $1 AND s.rating_count > 0", (actorID,))
+    except Exception as e:
+        await catchException(e, conn)
+        return None
+    await conn.close()
+    return result[0]['avg']
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import unittest
+import Solution
+import SolAsync
+import Utility.AsyncDBConnector as AsyncConnector
+import Utility.DBConnector as Connector
+from Utility.AsyncDBConnector import AsyncConnectionPool, AsyncDBConnector
+from Utility.DBConnector import DBConnector
+from Utility.Exceptions import DatabaseException
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+
+
+class Test(AbstractTest):
+    # the async connections do not join the test's transaction, what they commit would outlive it
+    fixture = "recreate" if AbstractTest.fixture == "recreate" else "truncate"
+
+    # runs a coroutine on a loop of its own and closes the loop's pool after it
+    @staticmethod
+    def runAsync(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await AsyncConnector.closeAsyncPool()
+        return asyncio.run(main())
+
+    # the ids of the critics, read on a connection of its own
+    @staticmethod
+    async def critics() -> list:
+        async with AsyncDBConnector() as conn:
+            _, result = await conn.execute("SELECT id FROM Critics ORDER BY id")
+        return [critic_id for critic_id, in result.itertuples()]
+
+    def testPoolCheckout(self) -> None:
+        async def main():
+            pool = AsyncConnectionPool(DBConnector.connectionParams(), minconn=0, maxconn=1, checkout_timeout=0.1)
+            try:
+                conn = await pool.getconn()
+                self.assertEqual((0, 1), pool.size())
+                with self.assertRaises(DatabaseException.ConnectionInvalid, msg="the only connection is in use"):
+                    await pool.getconn()
+                waiting = asyncio.ensure_future(pool.getconn())
+                await asyncio.sleep(0.01)
+                await pool.putconn(conn)
+                self.assertIs(conn, await waiting, "a returned connection goes to the waiting checkout")
+                await pool.putconn(conn)
+                self.assertEqual((1, 0), pool.size())
+            finally:
+                await pool.closeall()
+            self.assertEqual((0, 0), pool.size())
+            with self.assertRaises(DatabaseException.ConnectionInvalid):
+                await pool.getconn()
+        self.runAsync(main())
+
+    def testCommitFalse(self) -> None:
+        async def main():
+            async with AsyncDBConnector() as conn:
+                await conn.execute("INSERT INTO Critics(id, name) VALUES (1, 'John')", commit=False)
+                self.assertEqual([], await Test.critics(), "commit=False opens a transaction")
+                await conn.rollback()
+                await conn.execute("INSERT INTO Critics(id, name) VALUES (2, 'Bob')", commit=False)
+                await conn.execute("INSERT INTO Critics(id, name) VALUES (3, 'Ann')", commit=False)
+                await conn.commit()
+                await conn.execute("INSERT INTO Critics(id, name) VALUES (4, 'Eve')", commit=False)
+            self.assertEqual([2, 3], await Test.critics(), "what is not committed is rolled back on close")
+        self.runAsync(main())
+
+    def testErrors(self) -> None:
+        async def main():
+            async with AsyncDBConnector() as conn:
+                await conn.execute("INSERT INTO Critics(id, name) VALUES (1, 'John')")
+                with self.assertRaises(DatabaseException.UNIQUE_VIOLATION):
+                    await conn.execute("INSERT INTO Critics(id, name) VALUES (1, 'Bob')")
+                with self.assertRaises(DatabaseException.NOT_NULL_VIOLATION):
+                    await conn.execute_prepared("INSERT INTO Critics(id, name) VALUES ($1, $2)", (2, None))
+                with self.assertRaises(DatabaseException.CHECK_VIOLATION):
+                    await conn.execute("INSERT INTO Movies(name, year, genere) VALUES ('Old', 1800, 'Drama')")
+                await conn.execute("INSERT INTO Critics(id, name) VALUES (3, 'Ann')", commit=False)
+                with self.assertRaises(DatabaseException.FOREIGN_KEY_VIOLATION):
+                    await conn.execute("INSERT INTO CriticsMovie(critic_id, movie_name, movie_year, rating) "
+                                       "VALUES (3, 'Gone', 2020, 3)", commit=False)
+            self.assertEqual([1], await Test.critics(), "a failed statement rolls its transaction back")
+        self.runAsync(main())
+
+    # a query whose task is cancelled leaves its connection busy, the pool closes it instead of reusing it
+    def testCancelledQuery(self) -> None:
+        async def main():
+            async def sleep():
+                async with AsyncDBConnector() as conn:
+                    await conn.execute("SELECT pg_sleep(5)")
+            task = asyncio.ensure_future(sleep())
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual((0, 0), AsyncConnector.getAsyncPool(DBConnector.connectionParams).size())
+            async with AsyncDBConnector() as conn:
+                _, result = await conn.execute("SELECT 1 AS one")
+            self.assertEqual(1, result[0]['one'])
+        self.runAsync(main())
+
+    def testRoundTrip(self) -> None:
+        async def main():
+            self.assertEqual(ReturnValue.OK, await SolAsync.addCritic(Critic(1, "John")))
+            self.assertEqual(ReturnValue.OK, await SolAsync.addActor(Actor(1, "Ann", 30, 170)))
+            self.assertEqual(ReturnValue.OK, await SolAsync.addMovie(Movie("Heat", 1995, "Action")))
+            self.assertEqual(ReturnValue.OK, await SolAsync.addMovie(Movie("Up", 2009, "Comedy")))
+            self.assertEqual(ReturnValue.OK, await SolAsync.criticRatedMovie("Heat", 1995, 1, 4))
+            self.assertEqual(ReturnValue.OK, await SolAsync.actorPlayedInMovie("Heat", 1995, 1, 100, ["Cop"]))
+            self.assertEqual(ReturnValue.OK, await SolAsync.actorPlayedInMovie("Up", 2009, 1, 100, ["Voice"]))
+            profiles = await asyncio.gather(SolAsync.getCriticProfile(1), SolAsync.getActorProfile(1),
+                                            SolAsync.getMovieProfile("Heat", 1995), SolAsync.getCriticProfile(2))
+            self.assertEqual([Critic(1, "John"), Actor(1, "Ann", 30, 170), Movie("Heat", 1995, "Action"),
+                              Critic.badCritic()], profiles)
+            self.assertEqual([4.0, 0.0, 4.0], await asyncio.gather(
+                SolAsync.averageRating("Heat", 1995), SolAsync.averageRating("Up", 2009),
+                SolAsync.averageActorRating(1)))
+            self.assertEqual(ReturnValue.OK, await SolAsync.deleteCritic(1))
+            self.assertEqual(Critic.badCritic(), await SolAsync.getCriticProfile(1))
+            self.assertEqual(0.0, await SolAsync.averageRating("Heat", 1995))
+        self.runAsync(main())
+        self.assertEqual(Movie("Heat", 1995, "Action"), Solution.getMovieProfile("Heat", 1995),
+                         "the sync API sees what the async one wrote")
+
+    # the schema of the search_path exists even if the first connection of the process is an async one
+    def testSchemaCreated(self) -> None:
+        name = "test_async_%d" % os.getpid()
+        previous = Connector.schema
+        Connector.setSchema(name)
+        try:
+            async def main():
+                async with AsyncDBConnector() as conn:
+                    _, result = await conn.execute("SELECT current_schema() AS name")
+                return result[0]['name']
+            self.assertEqual(name, self.runAsync(main()))
+        finally:
+            Connector.setSchema(previous)
+            Connector.dropSchema(name)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
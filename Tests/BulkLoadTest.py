@@ -0,0 +1,56 @@
+import unittest
+import Solution
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Critic import Critic
+from Business.Movie import Movie
+from Business.Studio import Studio
+
+
+class Test(AbstractTest):
+
+    def loadRatings(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addCritic(Critic(1, "John")))
+        self.assertEqual(ReturnValue.OK, Solution.addMovie(Movie("M1", 2000, "Drama")))
+        rows = [(1, "M1", "abc", 3), (1, "M1", 2000, 4), (1, "M1", "2000", 5), (2, "M1", 2000, 1),
+                (1, "M2", 2000, 2), (1, "M1", 2000, "x")]
+        status, loaded, rejected = Solution.loadCriticsMovie(rows)
+        self.assertEqual(ReturnValue.OK, status, "a bad row does not fail the load")
+        self.assertEqual(1, loaded)
+        self.assertEqual([(1, ReturnValue.BAD_PARAMS), (3, ReturnValue.ALREADY_EXISTS), (4, ReturnValue.NOT_EXISTS),
+                          (5, ReturnValue.NOT_EXISTS), (6, ReturnValue.BAD_PARAMS)], rejected)
+        self.assertEqual(4, Solution.averageRating("M1", 2000))
+
+    def testBadRows(self) -> None:
+        self.loadRatings()
+
+    def testBadRowsCompact(self) -> None:
+        self.recreateTables(compact=True)
+        self.loadRatings()
+
+    # any INTEGER is loaded, a value out of its range is a bad row
+    def testIntegerRange(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addStudio(Studio(2, "Studio")))
+        Solution.addMovies([Movie("A", 2000, "Drama"), Movie("B", 2000, "Drama"), Movie("C", 2000, "Drama")])
+        status, loaded, rejected = Solution.loadStudiosMovie([(2, "A", 2000, 200000000, 1500000000),
+                                                              (2, "B", 2000, 1, 2147483647),
+                                                              (2, "C", 2000, 1, 2147483648),
+                                                              (2, "C", 2000, 1, 99999999999)])
+        self.assertEqual((ReturnValue.OK, 2, [(3, ReturnValue.BAD_PARAMS), (4, ReturnValue.BAD_PARAMS)]),
+                         (status, loaded, rejected))
+
+    # big enough for the insert to hash join the loaded rows to Movies, which must not cast a rejected year
+    def testBadYearInLargeLoad(self) -> None:
+        self.recreateTables(compact=True)
+        Solution.addCritics([Critic(i, "Critic %d" % i) for i in range(1, 21)])
+        Solution.addMovies([Movie("Movie %d" % i, 2000, "Drama") for i in range(1, 1001)])
+        rows = [(critic, "Movie %d" % movie, 2000, 3) for critic in range(1, 21) for movie in range(1, 201)]
+        status, loaded, rejected = Solution.loadCriticsMovie(rows + [(1, "Movie 1", "abc", 3)])
+        self.assertEqual((ReturnValue.OK, len(rows), [(len(rows) + 1, ReturnValue.BAD_PARAMS)]),
+                         (status, loaded, rejected))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
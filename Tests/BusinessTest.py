@@ -0,0 +1,42 @@
+import pickle
+import unittest
+
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+from Business.Studio import Studio
+from Utility.DBConnector import ResultSet
+
+
+class Test(unittest.TestCase):
+    def testGetters(self) -> None:
+        actor = Actor(actor_id=1, actor_name="Leonardo DiCaprio", age=48, height=183)
+        self.assertEqual((1, "Leonardo DiCaprio", 48, 183),
+                         (actor.getActorID(), actor.getActorName(), actor.getAge(), actor.getHeight()))
+        movie = Movie("Inception", 2010, "Action")
+        self.assertEqual(("Inception", 2010, "Action"), (movie.getMovieName(), movie.getYear(), movie.getGenre()))
+        self.assertEqual("CriticName=John, CriticID=1", str(Critic(1, "John")))
+        self.assertEqual("StudioName=A24, StudioID=2", str(Studio(2, "A24")))
+
+    def testValueSemantics(self) -> None:
+        self.assertEqual(Critic(1, "John"), Critic(1, "John"))
+        self.assertNotEqual(Critic(1, "John"), Studio(1, "John"))
+        self.assertEqual(2, len({Movie("A", 2000, "Drama"), Movie("A", 2000, "Drama"), Movie("A", 2001, "Drama")}))
+        self.assertTrue(Actor.badActor().is_bad())
+        self.assertFalse(Critic(1, "John").is_bad())
+        with self.assertRaises(AttributeError):
+            Critic(1, "John").name = "Bob"
+        self.assertFalse(hasattr(Critic(1, "John"), "__dict__"))
+        self.assertEqual(Movie("A", 2000, "Drama"), pickle.loads(pickle.dumps(Movie("A", 2000, "Drama"))))
+
+    def testFromRow(self) -> None:
+        row = (7, "Pixar")
+        self.assertIs(row, Studio.from_row(row).astuple(), "the row tuple is not copied")
+        Column = type("Column", (), {"__init__": lambda self, name: setattr(self, "name", name)})
+        result = ResultSet([Column("id"), Column("name"), Column("age"), Column("height")], [(1, "Tom", 60, 170)])
+        self.assertEqual(Actor(1, "Tom", 60, 170), Actor.from_row(result[0]))
+        self.assertEqual(Critic(1, "Tom"), Critic.from_row([1, "Tom", "extra"]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
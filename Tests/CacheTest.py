@@ -0,0 +1,65 @@
+import time
+import unittest
+
+from Utility.Cache import Cache
+
+
+class Test(unittest.TestCase):
+    def testLookup(self) -> None:
+        cache = Cache(maxsize=2)
+        self.assertIs(Cache.MISSING, cache.lookup(1))
+        cache.put(1, None)
+        self.assertIsNone(cache.lookup(1), "None is a cacheable value")
+        cache.invalidate(1)
+        self.assertIs(Cache.MISSING, cache.lookup(1))
+        self.assertEqual({"hits": 1, "misses": 2, "evictions": 0, "expirations": 0, "size": 0}, cache.stats())
+
+    def testEviction(self) -> None:
+        cache = Cache(maxsize=2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.lookup(1)
+        cache.put(3, "c")
+        self.assertIs(Cache.MISSING, cache.lookup(2), "least recently used entry is evicted")
+        self.assertEqual("a", cache.lookup(1))
+        self.assertEqual(1, cache.stats()["evictions"])
+
+    def testTtl(self) -> None:
+        cache = Cache(ttl=0.01)
+        cache.put(1, "a")
+        time.sleep(0.02)
+        self.assertIs(Cache.MISSING, cache.lookup(1))
+        self.assertEqual(1, cache.stats()["expirations"])
+
+    def testDisabled(self) -> None:
+        cache = Cache(enabled=False)
+        cache.put(1, "a")
+        self.assertIs(Cache.MISSING, cache.lookup(1))
+
+    # a value read before an invalidation of its key is not stored after it
+    def testGeneration(self) -> None:
+        cache = Cache(maxsize=2)
+        generation = cache.generation()
+        cache.invalidate(1)
+        cache.put(1, "stale", generation)
+        self.assertIs(Cache.MISSING, cache.lookup(1))
+        cache.put(2, "b", generation)
+        self.assertEqual("b", cache.lookup(2), "other keys are not affected")
+        generation = cache.generation()
+        cache.put(1, "a", generation)
+        self.assertEqual("a", cache.lookup(1))
+        cache.clear()
+        cache.put(1, "stale", generation)
+        self.assertIs(Cache.MISSING, cache.lookup(1))
+
+    def testForgottenGeneration(self) -> None:
+        cache = Cache(maxsize=2)
+        generation = cache.generation()
+        for key in (1, 2, 3):
+            cache.invalidate(key)
+        cache.put(4, "stale", generation)
+        self.assertIs(Cache.MISSING, cache.lookup(4), "invalidations past maxsize are not told apart")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
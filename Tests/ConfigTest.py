@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from Utility.DBConnector import DBConnector
+from Utility.Exceptions import DatabaseException
+
+ENVIRONMENT = ("DATABASE_URL", "PGHOST", "PGPORT", "PGDATABASE", "PGUSER", "PGPASSWORD", "DB_SCHEMA")
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        # an environment without the variables DBConnector reads, restored after the test
+        patcher = mock.patch.dict(os.environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for var in ENVIRONMENT:
+            os.environ.pop(var, None)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "database.ini")
+
+    def writeConfig(self, host: str, mtime: int) -> None:
+        with open(self.filename, "w") as file:
+            file.write("[postgresql]\nhost=%s\ndatabase=db\nuser=me\npassword=secret\nport=5432\n" % host)
+        os.utime(self.filename, ns=(mtime, mtime))
+
+    def config(self) -> dict:
+        return DBConnector._DBConnector__config(self.filename)
+
+    def testFile(self) -> None:
+        self.writeConfig("one", 10 ** 18)
+        self.assertEqual({"host": "one", "database": "db", "user": "me", "password": "secret", "port": "5432"},
+                         self.config())
+
+    # the file is parsed again only when its mtime changes
+    def testMtimeCache(self) -> None:
+        self.writeConfig("one", 10 ** 18)
+        self.assertEqual("one", self.config()["host"])
+        self.writeConfig("two", 10 ** 18)
+        self.assertEqual("one", self.config()["host"], "same mtime, the cached section is used")
+        self.writeConfig("two", 10 ** 18 + 1)
+        self.assertEqual("two", self.config()["host"])
+        self.config()["host"] = "changed"
+        self.assertEqual("two", self.config()["host"], "callers get a copy of the cached section")
+
+    def testEnvironmentOverrides(self) -> None:
+        self.writeConfig("one", 10 ** 18)
+        os.environ.update(PGHOST="elsewhere", PGPORT="6543")
+        self.assertEqual({"host": "elsewhere", "database": "db", "user": "me", "password": "secret", "port": "6543"},
+                         self.config())
+        os.environ["DB_SCHEMA"] = "worker_1"
+        self.assertEqual("-c search_path=worker_1", self.config()["options"])
+
+    def testWithoutFile(self) -> None:
+        with self.assertRaises(DatabaseException.database_ini_ERROR):
+            self.config()
+        os.environ["DATABASE_URL"] = "postgresql://me@db.example/db"
+        self.assertEqual({"dsn": "postgresql://me@db.example/db"}, self.config(), "the file is not needed")
+        del os.environ["DATABASE_URL"]
+        os.environ.update(PGHOST="h", PGPORT="1", PGDATABASE="d", PGUSER="u", PGPASSWORD="p")
+        self.assertEqual({"host": "h", "port": "1", "database": "d", "user": "u", "password": "p"}, self.config())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,93 @@
+import threading
+import unittest
+from unittest import mock
+
+from psycopg2 import extensions
+
+from Utility.ConnectionPool import ConnectionPool
+from Utility.Exceptions import DatabaseException
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.rollbacks = 0
+        self.info = mock.Mock(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch('Utility.ConnectionPool.psycopg2.connect', side_effect=lambda **_: FakeConnection())
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testReuse(self) -> None:
+        pool = ConnectionPool({}, minconn=1, maxconn=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(conn, pool.getconn(), "returned connection is reused")
+        self.assertEqual(1, self.connect.call_count)
+        self.assertFalse(conn.autocommit)
+
+    def testRollbackOnReturn(self) -> None:
+        pool = ConnectionPool({})
+        conn = pool.getconn()
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        self.assertEqual(1, conn.rollbacks, "open transaction is rolled back")
+
+    def testMaxSize(self) -> None:
+        pool = ConnectionPool({}, minconn=0, maxconn=1, checkout_timeout=0.05)
+        conn = pool.getconn()
+        self.assertRaises(DatabaseException.ConnectionInvalid, pool.getconn)
+        threading.Timer(0.01, pool.putconn, (conn,)).start()
+        pool.checkout_timeout = 1.0
+        self.assertIs(conn, pool.getconn(), "waits for a connection to be returned")
+
+    def testIdleTimeout(self) -> None:
+        pool = ConnectionPool({}, minconn=1, maxconn=3, idle_timeout=0.0)
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+        self.assertEqual((1, 0), pool.size(), "idle connections above minconn are closed")
+        self.assertTrue(first.closed)
+
+    def testClosedConnectionDiscarded(self) -> None:
+        pool = ConnectionPool({})
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = 2
+        self.assertIsNot(conn, pool.getconn(), "broken connection is not handed out")
+
+    def testPingOutsideLock(self) -> None:
+        pool = ConnectionPool({}, minconn=0, maxconn=2, health_check_interval=0.0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        pinging, release = threading.Event(), threading.Event()
+
+        def execute(query):
+            pinging.set()
+            release.wait(1.0)
+        conn.cursor = lambda: mock.Mock(execute=execute)
+        checkout = threading.Thread(target=pool.getconn)
+        checkout.start()
+        self.assertTrue(pinging.wait(1.0))
+        sizes = []
+        other = threading.Thread(target=lambda: sizes.append(pool.size()))
+        other.start()
+        other.join(0.5)
+        self.assertEqual([(0, 1)], sizes, "the pool is not locked while a connection is pinged")
+        release.set()
+        checkout.join()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,27 @@
+import unittest
+
+from Utility.CopyStream import CopyStream
+
+
+class Test(unittest.TestCase):
+    def testEscaping(self) -> None:
+        stream = CopyStream([(1, "tab\there", None), (2, "back\\slash\nnewline", 3)])
+        self.assertEqual("1\ttab\\there\t\\N\n2\tback\\\\slash\\nnewline\t3\n", stream.read())
+        self.assertEqual("", stream.read(), "stream is exhausted")
+
+    def testChunkedReads(self) -> None:
+        rows = [(i, "movie %d" % i) for i in range(100)]
+        stream = CopyStream(iter(rows), rows_per_read=7)
+        data = ""
+        while True:
+            chunk = stream.read(13)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 13)
+            data += chunk
+        self.assertEqual("".join("%d\tmovie %d\n" % (i, i) for i in range(100)), data)
+        self.assertEqual(100, stream.rows)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,53 @@
+import decimal
+import unittest
+import Utility.DBConnector as Connector
+from Utility import Instrumentation
+from Utility.Exceptions import DatabaseException
+from Tests.abstractTest import AbstractTest
+
+
+class Test(AbstractTest):
+
+    def testExecuteMany(self) -> None:
+        self.addCleanup(Instrumentation.configureInstrumentation, enabled=Instrumentation.instrumentation.enabled)
+        Instrumentation.configureInstrumentation(enabled=True)
+        Instrumentation.resetStats()
+        conn = Connector.DBConnector()
+        try:
+            results = conn.execute_many(["INSERT INTO Critics VALUES (1, 'John')",
+                                         ("INSERT INTO Critics VALUES (%s, %s)", (1, "Bob")),
+                                         "SELECT id, name, 0.5::float AS score FROM Critics -- with a comment",
+                                         "DELETE FROM Critics WHERE id = 2"])
+        finally:
+            conn.close()
+        self.assertEqual(1, results[0][0])
+        self.assertIsInstance(results[1], DatabaseException.UNIQUE_VIOLATION)
+        self.assertEqual(1, results[2][0])
+        self.assertEqual([(1, "John", decimal.Decimal("0.5"))], list(results[2][1].itertuples()),
+                         "values come back through JSON: the float is a Decimal")
+        self.assertEqual(0, results[3][0])
+        statements = Instrumentation.statsSnapshot()["statements"]
+        self.assertEqual(1, statements[("execute_many", None)]["count"])
+        self.assertEqual((2, 1, 1), tuple(statements[("execute", "INSERT INTO Critics VALUES (?)")][stat]
+                                          for stat in ("count", "rows", "errors")), "each statement is recorded")
+
+    # whether a statement returns rows is decided on its text, not on the values bound to it or its comments
+    def testReturnsRows(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            results = conn.execute_many([("INSERT INTO Critics(id, name) VALUES (%s, %s)", (1, "Returning Critic")),
+                                         "WITH v AS (VALUES (2, 'Bob')) INSERT INTO Critics SELECT * FROM v",
+                                         "-- ids\nSELECT id FROM Critics ORDER BY id",
+                                         "DELETE FROM Critics WHERE id = 2 RETURNING name"])
+        finally:
+            conn.close()
+        self.assertEqual(1, results[0][0])
+        self.assertTrue(results[0][1].isEmpty())
+        self.assertEqual(1, results[1][0])
+        self.assertEqual((2, [(1,), (2,)]), (results[2][0], list(results[2][1].itertuples())))
+        self.assertEqual((1, [("Bob",)]), (results[3][0], list(results[3][1].itertuples())))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+import Solution
+from Utility import Instrumentation
+from Tests.abstractTest import AbstractTest
+
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+from Business.Studio import Studio
+
+
+class Test(AbstractTest):
+    # the gathered calls run on other threads, outside the test's transaction
+    fixture = "recreate" if AbstractTest.fixture == "recreate" else "truncate"
+
+    def testOrder(self) -> None:
+        results = Solution.gather((time.sleep, 0.05), (max, 3, 7), lambda: "last")
+        self.assertEqual([None, 7, "last"], results)
+
+    def testConcurrent(self) -> None:
+        start = time.monotonic()
+        Solution.gather(*[(time.sleep, 0.1)] * 4)
+        self.assertLess(time.monotonic() - start, 0.3, "calls run at the same time")
+
+    def testErrors(self) -> None:
+        calls = [(int, "1"), (int, "x"), (int, "y")]
+        with self.assertRaises(ValueError) as raised:
+            Solution.gather(*calls)
+        self.assertIn("'x'", str(raised.exception), "the first error in call order is raised")
+        results = Solution.gather(*calls, return_exceptions=True)
+        self.assertEqual(1, results[0])
+        self.assertIsInstance(results[2], ValueError)
+
+    def testNested(self) -> None:
+        Solution.configureGather(max_workers=1)
+        try:
+            inner = lambda: Solution.gather(threading.current_thread, threading.current_thread)
+            first, second = Solution.gather(inner, inner)
+            self.assertEqual(first[0], first[1], "a nested gather runs on the calling worker")
+        finally:
+            Solution.configureGather()
+
+    def testInstrumentedCallers(self) -> None:
+        Solution.addCritic(Critic(1, "John"))
+        Solution.addActor(Actor(1, "Ann", 30, 170))
+        Solution.addStudio(Studio(1, "Studio"))
+        Solution.addMovie(Movie("Heat", 1995, "Action"))
+        Solution.criticRatedMovie("Heat", 1995, 1, 4)
+        Solution.actorPlayedInMovie("Heat", 1995, 1, 100, ["Cop"])
+        Solution.clearCaches()
+        self.addCleanup(Instrumentation.configureInstrumentation, enabled=Instrumentation.instrumentation.enabled)
+        Instrumentation.configureInstrumentation(enabled=True)
+        Instrumentation.resetStats()
+        self.assertEqual([Actor(1, "Ann", 30, 170), 4.0, Critic(1, "John")],
+                         Solution.gather((Solution.getActorProfile, 1), (Solution.averageActorRating, 1),
+                                         (Solution.getCriticProfile, 1)))
+        self.assertEqual([Studio(1, "Studio")], Solution.gather((Solution.getStudioProfile, 1)))
+        callers = Instrumentation.statsSnapshot()["callers"]
+        for function in ("getActorProfile", "averageActorRating", "getCriticProfile", "getStudioProfile"):
+            self.assertIn(Solution.__name__ + "." + function, callers,
+                          "a gathered call is charged to the function it calls")
+        self.assertNotIn(Solution.__name__ + ".runGathered", callers)
+        self.assertNotIn(Solution.__name__ + ".gather", callers)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,43 @@
+import unittest
+import Solution
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+
+OK, ALREADY_EXISTS, BAD_PARAMS = ReturnValue.OK, ReturnValue.ALREADY_EXISTS, ReturnValue.BAD_PARAMS
+
+
+class Test(AbstractTest):
+
+    # a chunk of valid rows is inserted at once, the rows it did not return hit an existing or repeated key
+    def testExistingKeys(self) -> None:
+        self.assertEqual(OK, Solution.addCritic(Critic(5, "Old")))
+        self.assertEqual([OK, ALREADY_EXISTS, ALREADY_EXISTS, OK],
+                         Solution.addCritics([Critic(1, "A"), Critic(5, "B"), Critic(1, "C"), Critic(2, "D")]))
+        self.assertEqual([Critic(1, "A"), Critic(2, "D"), Critic(5, "Old")],
+                         [Solution.getCriticProfile(critic_id) for critic_id in (1, 2, 5)])
+
+    # a chunk with an invalid row is inserted again row by row, each in a savepoint of its own
+    def testInvalidRows(self) -> None:
+        actors = [Actor(1, "A", 30, 170), Actor(2, "B", -1, 170), Actor(3, None, 30, 170), Actor(1, "C", 40, 180),
+                  Actor(4, "D", 50, 190), Actor(5, "E", 60, 0)]
+        self.assertEqual([OK, BAD_PARAMS, BAD_PARAMS, ALREADY_EXISTS, OK, BAD_PARAMS],
+                         Solution.addActors(actors, chunk_size=4))
+        self.assertEqual([True, False, False, True, False],
+                         [not Solution.getActorProfile(actor_id).is_bad() for actor_id in (1, 2, 3, 4, 5)])
+        self.assertEqual("A", Solution.getActorProfile(1).getActorName(), "the first row of a repeated key wins")
+
+    def testMovies(self) -> None:
+        self.assertEqual([OK, BAD_PARAMS, BAD_PARAMS, ALREADY_EXISTS, OK],
+                         Solution.addMovies([Movie("Heat", 1995, "Action"), Movie("Heat", 1800, "Action"),
+                                             Movie("Up", 2009, "Musical"), Movie("Heat", 1995, "Drama"),
+                                             Movie("Up", 2009, "Comedy")], chunk_size=2))
+        self.assertEqual([], Solution.addMovies([]))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
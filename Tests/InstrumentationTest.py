@@ -0,0 +1,55 @@
+import io
+import unittest
+
+from Utility.Instrumentation import Histogram, Instrumentation, OTHER_STATEMENTS, fingerprint
+
+
+class Test(unittest.TestCase):
+    def testFingerprint(self) -> None:
+        self.assertEqual("SELECT name FROM Critics WHERE id = ?",
+                         fingerprint("select name  from Critics\n where id = 42;"))
+        self.assertEqual(fingerprint("INSERT INTO Movies VALUES('It''s', 2001, 'Drama')"),
+                         fingerprint("INSERT INTO Movies VALUES(%s, %s, %s)"))
+        self.assertEqual("DELETE FROM Actors WHERE id IN (?)", fingerprint("DELETE FROM Actors WHERE id IN ($1, $2)"))
+
+    def testHistogram(self) -> None:
+        histogram = Histogram()
+        for seconds in [0.001] * 98 + [0.5, 2.0]:
+            histogram.add(seconds)
+        snapshot = histogram.snapshot()
+        self.assertEqual(100, snapshot["count"])
+        self.assertLess(snapshot["p50"], 0.002)
+        self.assertEqual(2.0, snapshot["max"])
+        self.assertGreaterEqual(snapshot["p99"], 0.5)
+
+    def testRecord(self) -> None:
+        events = []
+        stream = io.StringIO()
+        instrumentation = Instrumentation(slow_query_threshold=0.1, stream=stream)
+        instrumentation.addHook(events.append)
+        instrumentation.record("execute", 0.01, "SELECT 1", 1)
+        instrumentation.record("execute", 0.02, "SELECT 2", 1)
+        instrumentation.record("execute", 0.03, "SELECT 3", error=ValueError("failed"))
+        self.assertTrue(instrumentation.isSlow(0.2))
+        instrumentation.logSlow("SELECT 4", 0.2, "Result")
+        snapshot = instrumentation.snapshot()
+        statement = snapshot["statements"][("execute", "SELECT ?")]
+        self.assertEqual((3, 2, 1), (statement["count"], statement["rows"], statement["errors"]))
+        self.assertEqual(3, snapshot["callers"][__name__ + ".testRecord"]["count"])
+        self.assertEqual(["SELECT 4"], [entry["statement"] for entry in snapshot["slow"]])
+        self.assertIn("Result", stream.getvalue())
+        self.assertEqual(3, len(events))
+        instrumentation.reset()
+        self.assertEqual({}, instrumentation.snapshot()["statements"])
+
+    def testMaxStatements(self) -> None:
+        instrumentation = Instrumentation(max_statements=2)
+        for table in ("Critics", "Actors", "Studios", "Movies"):
+            instrumentation.record("execute", 0.01, "SELECT * FROM " + table)
+        statements = instrumentation.snapshot()["statements"]
+        self.assertEqual(3, len(statements), "statements past max_statements share one entry")
+        self.assertEqual(2, statements[("execute", OTHER_STATEMENTS)]["count"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,50 @@
+import unittest
+import Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Critic import Critic
+from Business.Movie import Movie
+
+
+class Test(AbstractTest):
+
+    # CriticsMovie as an older createTables made it, without a primary key, holding a NULL id and a repeated key
+    def oldCriticsMovie(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addCritic(Critic(1, "John")))
+        self.assertEqual(ReturnValue.OK, Solution.addMovie(Movie("Heat", 1995, "Action")))
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("ALTER TABLE CriticsMovie DROP CONSTRAINT criticsmovie_pkey, "
+                         "ALTER COLUMN critic_id DROP NOT NULL")
+            conn.execute("INSERT INTO CriticsMovie VALUES (1, 'Heat', 1995, 4), (1, 'Heat', 1995, 2), "
+                         "(NULL, 'Heat', 1995, 5)")
+        finally:
+            conn.close()
+
+    def count(self, query: str) -> int:
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute(query)
+            return result[0]['n']
+        finally:
+            conn.close()
+
+    def ratings(self) -> int:
+        return self.count("SELECT count(*) AS n FROM CriticsMovie")
+
+    def testConflictingRowsAbort(self) -> None:
+        self.oldCriticsMovie()
+        self.assertEqual(ReturnValue.ERROR, Solution.migrateSchema(), "rows that break the key stop the migration")
+        self.assertEqual(3, self.ratings(), "nothing is deleted")
+        self.assertEqual(ReturnValue.OK, Solution.migrateSchema(deduplicate=True))
+        self.assertEqual(1, self.ratings(), "the NULL id and one of the repeated ratings are deleted")
+        self.assertEqual(1, self.count("SELECT count(*) AS n FROM pg_constraint "
+                                       "WHERE conrelid = 'criticsmovie'::regclass AND contype = 'p'"),
+                         "the key is back")
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,56 @@
+import unittest
+import Utility.DBConnector as Connector
+from Utility import Instrumentation
+from Utility.DBConnector import DBConnector
+from Tests.abstractTest import AbstractTest
+
+
+class Test(AbstractTest):
+
+    # the names of the statements prepared on the connection's session
+    @staticmethod
+    def prepared(conn: DBConnector) -> set:
+        _, result = conn.execute("SELECT name FROM pg_prepared_statements", commit=False)
+        return {name for name, in result.itertuples()}
+
+    def testCacheHit(self) -> None:
+        events = []
+        self.addCleanup(Instrumentation.configureInstrumentation, enabled=Instrumentation.instrumentation.enabled)
+        Instrumentation.configureInstrumentation(enabled=True)
+        hook = events.append
+        Instrumentation.instrumentation.addHook(hook)
+        self.addCleanup(Instrumentation.instrumentation.removeHook, hook)
+        query = "SELECT $1::int * 2 AS n -- testCacheHit"
+        conn = Connector.DBConnector()
+        try:
+            results = [conn.execute_prepared(query, (n,))[1][0]['n'] for n in (1, 2, 3)]
+            self.assertIn(conn.connection.prepared[query], self.prepared(conn))
+        finally:
+            conn.close()
+        self.assertEqual([2, 4, 6], results)
+        self.assertEqual(1, [event.kind for event in events].count("prepare"), "prepared once, executed three times")
+
+    def testEviction(self) -> None:
+        self.addCleanup(setattr, DBConnector, "PREPARED_CACHE_SIZE", DBConnector.PREPARED_CACHE_SIZE)
+        DBConnector.PREPARED_CACHE_SIZE = 2
+        queries = ["SELECT $1::int + %d AS n -- testEviction" % i for i in range(3)]
+        conn = Connector.DBConnector()
+        try:
+            prepared = conn.connection.prepared
+            conn.execute_prepared(queries[0], (1,))
+            conn.execute_prepared(queries[1], (1,))
+            evicted = prepared[queries[1]]
+            conn.execute_prepared(queries[0], (1,))
+            conn.execute_prepared(queries[2], (1,))
+            self.assertEqual([queries[0], queries[2]], list(prepared), "the least recently used one is evicted")
+            self.assertEqual(set(prepared.values()), self.prepared(conn), "and DEALLOCATEd")
+            self.assertNotIn(evicted, self.prepared(conn))
+            _, result = conn.execute_prepared(queries[1], (1,))
+            self.assertEqual(2, result[0]['n'], "an evicted statement is prepared again")
+        finally:
+            conn.close()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
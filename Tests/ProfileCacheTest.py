@@ -0,0 +1,25 @@
+import unittest
+import Solution
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Movie import Movie
+
+
+class Test(AbstractTest):
+    # the transaction fixture would keep the profiles out of the caches
+    fixture = "recreate" if AbstractTest.fixture == "recreate" else "truncate"
+
+    def testMovieProfileFromRow(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addMovie(Movie("Q", 2000, "Drama")))
+        self.assertEqual(2000, Solution.getMovieProfile("Q", "2000").getYear())
+        hits = Solution.profileCacheStats()["movie"]["hits"]
+        cached = Solution.getMovieProfile("Q", 2000)
+        self.assertEqual(hits + 1, Solution.profileCacheStats()["movie"]["hits"])
+        self.assertEqual((2000, int), (cached.getYear(), type(cached.getYear())),
+                         "the cached profile is the row, not the arguments of the first call")
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,107 @@
+import unittest
+import Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+
+
+class Test(AbstractTest):
+
+    def assertAverage(self, expected: float, movie_name: str, year: int) -> None:
+        average = Solution.averageRating(movie_name, year)
+        self.assertEqual((expected, float), (average, type(average)), "%s %d" % (movie_name, year))
+
+    def testAverageRating(self) -> None:
+        Solution.addCritics([Critic(1, "John"), Critic(2, "Bob")])
+        Solution.addMovies([Movie("Heat", 1995, "Action"), Movie("Up", 2009, "Comedy")])
+        self.assertEqual(ReturnValue.OK, Solution.criticRatedMovie("Heat", 1995, 1, 4))
+        self.assertEqual(ReturnValue.OK, Solution.criticRatedMovie("Heat", 1995, 2, 5))
+        self.assertAverage(4.5, "Heat", 1995)
+        self.assertAverage(0.0, "Up", 2009)
+        self.assertAverage(0.0, "Gone", 2020)
+        Solution.criticDidntRateMovie("Heat", 1995, 1)
+        Solution.criticDidntRateMovie("Heat", 1995, 2)
+        self.assertAverage(0.0, "Heat", 1995)
+
+    # an actor's average is the average of the averages of their rated movies, not of all their ratings
+    def testAverageActorRating(self) -> None:
+        Solution.addCritics([Critic(1, "John"), Critic(2, "Bob")])
+        Solution.addActors([Actor(1, "Ann", 30, 170), Actor(2, "Dan", 40, 180), Actor(3, "Eve", 50, 160)])
+        Solution.addMovies([Movie("Heat", 1995, "Action"), Movie("Up", 2009, "Comedy"), Movie("It", 2017, "Horror")])
+        Solution.criticRatedMovie("Heat", 1995, 1, 5)
+        Solution.criticRatedMovie("Heat", 1995, 2, 3)
+        Solution.criticRatedMovie("Up", 2009, 1, 1)
+        Solution.actorPlayedInMovie("Heat", 1995, 1, 100, ["Cop"])
+        Solution.actorPlayedInMovie("Up", 2009, 1, 100, ["Voice"])
+        Solution.actorPlayedInMovie("It", 2017, 2, 100, ["Clown"])
+        averages = [Solution.averageActorRating(actor_id) for actor_id in (1, 2, 3, 99)]
+        self.assertEqual([(2.5, float), (0.0, float), (0.0, float), (0.0, float)],
+                         [(average, type(average)) for average in averages],
+                         "(4 + 1) / 2, an unrated movie, no movies, no actor")
+        self.assertEqual({1: 2.5, 2: 0.0, 3: 0.0}, Solution.averageActorRatings())
+        self.assertEqual({1: 2.5, 99: 0.0}, Solution.averageActorRatings([1, 99]))
+        self.assertEqual({}, Solution.averageActorRatings([]))
+        self.assertEqual({float}, set(map(type, Solution.averageActorRatings().values())))
+
+    # the rated movies' (name, year, rating sum, rating count), ordered; a movie whose ratings were all removed
+    # keeps a row with a count of 0, which a rebuild does not have
+    def stats(self, compact: bool) -> list:
+        conn = Connector.DBConnector()
+        try:
+            if compact:
+                _, result = conn.execute("SELECT m.name, m.year, s.rating_sum, s.rating_count FROM MovieRatingStats s "
+                                         "JOIN Movies m ON m.movie_id = s.movie_id WHERE s.rating_count > 0 "
+                                         "ORDER BY m.name, m.year")
+            else:
+                _, result = conn.execute("SELECT movie_name, movie_year, rating_sum, rating_count "
+                                         "FROM MovieRatingStats WHERE rating_count > 0 "
+                                         "ORDER BY movie_name, movie_year")
+            return list(result.itertuples())
+        finally:
+            conn.close()
+
+    # the stats the triggers maintained are the ones rebuildMovieRatingStats computes from scratch
+    def assertStats(self, compact: bool, change: str) -> list:
+        maintained = self.stats(compact)
+        self.assertEqual(ReturnValue.OK, Solution.rebuildMovieRatingStats())
+        self.assertEqual(self.stats(compact), maintained, "after " + change)
+        return maintained
+
+    def applyChanges(self, compact: bool) -> None:
+        Solution.addCritics([Critic(critic_id, "Critic %d" % critic_id) for critic_id in (1, 2, 3)])
+        Solution.addMovies([Movie("Heat", 1995, "Action"), Movie("Up", 2009, "Comedy"), Movie("It", 2017, "Horror")])
+        for movie_name, year, critic_id, rating in (("Heat", 1995, 1, 5), ("Heat", 1995, 2, 3), ("Up", 2009, 1, 4),
+                                                    ("Up", 2009, 3, 2), ("It", 2017, 2, 1)):
+            Solution.criticRatedMovie(movie_name, year, critic_id, rating)
+        self.assertStats(compact, "criticRatedMovie")
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE CriticsMovie SET rating = rating + 1 WHERE critic_id = 1")
+        finally:
+            conn.close()
+        self.assertStats(compact, "an update")
+        self.assertEqual(ReturnValue.OK, Solution.deleteCritic(2))
+        self.assertStats(compact, "deleteCritic")
+        self.assertEqual(ReturnValue.OK, Solution.deleteMovie("Up", 2009))
+        self.assertStats(compact, "deleteMovie")
+        status, loaded, _ = Solution.loadCriticsMovie([(3, "Heat", 1995, 2), (3, "It", 2017, 5), (1, "It", 2017, 3),
+                                                       (1, "Heat", 1995, 1)])
+        self.assertEqual((ReturnValue.OK, 3), (status, loaded))
+        self.assertEqual([("Heat", 1995, 8, 2), ("It", 2017, 8, 2)], self.assertStats(compact, "loadCriticsMovie"))
+        self.assertAverage(4.0, "Heat", 1995)
+
+    def testStats(self) -> None:
+        self.applyChanges(False)
+
+    def testStatsCompact(self) -> None:
+        self.recreateTables(compact=True)
+        self.applyChanges(True)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,79 @@
+import unittest
+import Solution
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Actor import Actor
+from Business.Critic import Critic
+from Business.Movie import Movie
+from Business.Studio import Studio
+
+REPORTS = (Solution.franchiseRevenue, Solution.studioRevenueByYear, Solution.getFanCritics,
+           Solution.averageAgeByGenre, Solution.getExclusiveActors)
+
+
+class Test(AbstractTest):
+
+    # every report, run incrementally after the changes so far, has the rows of a full run
+    def assertIncremental(self, change: str) -> None:
+        for report in REPORTS:
+            incremental = report(incremental=True)
+            self.assertEqual(report(), incremental, "%s after %s" % (report.__name__, change))
+
+    def applyChanges(self) -> None:
+        for critic_id in (1, 2, 3):
+            self.assertEqual(ReturnValue.OK, Solution.addCritic(Critic(critic_id, "Critic %d" % critic_id)))
+        for actor_id, age in ((1, 30), (2, 45), (3, 60), (4, 25)):
+            self.assertEqual(ReturnValue.OK, Solution.addActor(Actor(actor_id, "Actor %d" % actor_id, age, 180)))
+        for studio_id in (1, 2):
+            self.assertEqual(ReturnValue.OK, Solution.addStudio(Studio(studio_id, "Studio %d" % studio_id)))
+        for movie in (Movie("Heat", 1995, "Action"), Movie("Heat", 2005, "Drama"), Movie("Up", 2009, "Comedy"),
+                      Movie("It", 2017, "Horror")):
+            self.assertEqual(ReturnValue.OK, Solution.addMovie(movie))
+        Solution.studioProducedMovie(1, "Heat", 1995, 100, 500)
+        Solution.studioProducedMovie(1, "Up", 2009, 10, 300)
+        Solution.studioProducedMovie(2, "It", 2017, 20, 700)
+        Solution.criticRatedMovie("Heat", 1995, 1, 5)
+        Solution.criticRatedMovie("Up", 2009, 1, 4)
+        Solution.criticRatedMovie("It", 2017, 2, 3)
+        Solution.actorPlayedInMovie("Heat", 1995, 1, 100, ["Cop"])
+        Solution.actorPlayedInMovie("Up", 2009, 1, 100, ["Voice"])
+        Solution.actorPlayedInMovie("It", 2017, 2, 100, ["Clown"])
+        Solution.actorPlayedInMovie("Heat", 2005, 3, 100, ["Thief"])
+        self.assertIncremental("the first run")
+
+        self.assertEqual(ReturnValue.OK, Solution.addMovie(Movie("Heat", 2010, "Action")))
+        self.assertIncremental("addMovie")
+        Solution.studioProducedMovie(2, "Heat", 2010, 50, 900)
+        self.assertIncremental("studioProducedMovie")
+        Solution.criticRatedMovie("Heat", 2010, 2, 4)
+        self.assertIncremental("criticRatedMovie")
+        self.assertEqual([(2, 2), (1, 1)], Solution.getFanCritics(incremental=True))
+        Solution.actorPlayedInMovie("It", 2017, 3, 100, ["Victim"])
+        self.assertIncremental("actorPlayedInMovie")
+        Solution.actorPlayedInMovie("Heat", 2010, 4, 100, ["Driver"])
+        self.assertIncremental("actorPlayedInMovie")
+        Solution.studioDidntProduceMovie(1, "Up", 2009)
+        self.assertIncremental("studioDidntProduceMovie")
+        Solution.studioProducedMovie(1, "Heat", 2005, 30, 200)
+        self.assertIncremental("studioProducedMovie")
+        Solution.criticDidntRateMovie("It", 2017, 2)
+        self.assertIncremental("criticDidntRateMovie")
+
+        self.assertEqual([("Up", 0), ("It", 700), ("Heat", 1600)], Solution.franchiseRevenue(incremental=True))
+        self.assertEqual([(2, 2017, 700), (2, 2010, 900), (1, 2005, 200), (1, 1995, 500)],
+                         Solution.studioRevenueByYear(incremental=True))
+        self.assertEqual([], Solution.getFanCritics(incremental=True))
+        self.assertEqual([(4, 2), (2, 2)], Solution.getExclusiveActors(incremental=True))
+
+    def testIncremental(self) -> None:
+        self.applyChanges()
+
+    def testIncrementalCompact(self) -> None:
+        self.recreateTables(compact=True)
+        self.applyChanges()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
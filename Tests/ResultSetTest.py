@@ -0,0 +1,57 @@
+import io
+import unittest
+from collections import namedtuple
+
+from Utility.DBConnector import ResultSet
+
+Column = namedtuple('Column', 'name')
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.result = ResultSet([Column('id'), Column('name'), Column('rating')],
+                                [(1, 'Heat', 4.5), (2, 'Alien', 3), (3, 'Up', None)])
+
+    def testRows(self) -> None:
+        self.assertEqual(3, self.result.size())
+        self.assertEqual('Alien', self.result[1]['NAME'], "column names are case insensitive")
+        self.assertIsNone(self.result[1][0], "non-str keys return None")
+        self.assertEqual({'id': 3, 'name': 'Up', 'rating': None}, dict(self.result[2]))
+
+    def testIteration(self) -> None:
+        self.assertEqual(3, len(self.result))
+        self.assertEqual([1, 2, 3], [row['id'] for row in self.result])
+        self.assertEqual(['Heat', 'Alien', 'Up'], [row.name for row in self.result], "attribute access")
+        self.assertEqual(('id', 'name', 'rating'), self.result[0]._fields)
+        self.assertIs(self.result.rows[0], next(self.result.itertuples()), "rows are not copied")
+        self.assertEqual(4.5, next(self.result.itertuples(named=True)).rating)
+        self.assertRaises(IndexError, lambda: self.result[3])
+
+    def testSlice(self) -> None:
+        tail = self.result[1:]
+        self.assertEqual(2, tail.size())
+        self.assertEqual('Alien', tail[0]['name'])
+        self.assertEqual('Up', self.result[-1]['name'])
+
+    def testWrite(self) -> None:
+        self.assertEqual("id   name   rating   \n1   Heat   4.5   \n2   Alien   3   \n3   Up   None   \n",
+                         str(self.result))
+        output = io.StringIO()
+        self.result.write(output, mode="csv", limit=2)
+        self.assertEqual("id,name,rating\n1,Heat,4.5\n2,Alien,3\n", output.getvalue())
+        output = io.StringIO()
+        self.result.write(output, mode="jsonl", limit=1)
+        self.assertEqual('{"id": 1, "name": "Heat", "rating": 4.5}\n', output.getvalue())
+
+    def testColumn(self) -> None:
+        ids = self.result.column('id')
+        self.assertIsInstance(ids, memoryview)
+        self.assertEqual([1, 2, 3], ids.tolist())
+        self.assertTrue(ids.readonly)
+        self.assertEqual(('Heat', 'Alien', 'Up'), self.result.column('name'))
+        self.assertEqual((4.5, 3, None), self.result.column('rating'), "columns with NULLs are not packed")
+        self.assertIs(self.result.column('name'), self.result.column('Name'), "columns are cached")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
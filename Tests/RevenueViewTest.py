@@ -0,0 +1,68 @@
+import unittest
+import Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Movie import Movie
+from Business.Studio import Studio
+
+
+class Test(AbstractTest):
+
+    # the rows of the revenue summaries, ordered
+    def summaries(self) -> tuple:
+        conn = Connector.DBConnector()
+        try:
+            _, franchises = conn.execute("SELECT name, movies, revenue FROM FranchiseRevenue ORDER BY name")
+            _, years = conn.execute("SELECT studio_id, year, movies, revenue FROM StudioRevenueByYear "
+                                    "ORDER BY studio_id, year")
+            return list(franchises.itertuples()), list(years.itertuples())
+        finally:
+            conn.close()
+
+    # the summaries the triggers maintained are the ones refreshRevenueViews computes from scratch
+    def assertSummaries(self, change: str) -> tuple:
+        maintained = self.summaries()
+        self.assertEqual(ReturnValue.OK, Solution.refreshRevenueViews())
+        self.assertEqual(self.summaries(), maintained, "after " + change)
+        return maintained
+
+    def applyChanges(self) -> None:
+        for studio_id in (1, 2, 3):
+            self.assertEqual(ReturnValue.OK, Solution.addStudio(Studio(studio_id, "Studio %d" % studio_id)))
+        Solution.addMovies([Movie("Heat", 1995, "Action"), Movie("Heat", 2005, "Drama"), Movie("Up", 2009, "Comedy"),
+                            Movie("It", 2017, "Horror"), Movie("Jaws", 1975, "Horror")])
+        self.assertSummaries("addMovies")
+
+        Solution.studioProducedMovie(1, "Heat", 1995, 100, 500)
+        Solution.studioProducedMovie(1, "Up", 2009, 10, 300)
+        Solution.studioProducedMovie(2, "Heat", 2005, 30, 200)
+        Solution.studioProducedMovie(2, "It", 2017, 20, 700)
+        Solution.studioProducedMovie(3, "Jaws", 1975, 5, 900)
+        self.assertSummaries("studioProducedMovie")
+        Solution.studioDidntProduceMovie(1, "Up", 2009)
+        self.assertSummaries("studioDidntProduceMovie")
+        self.assertEqual(ReturnValue.OK, Solution.deleteMovie("Heat", 1995))
+        self.assertSummaries("deleteMovie")
+        self.assertEqual(ReturnValue.OK, Solution.deleteStudio(2))
+        self.assertSummaries("deleteStudio")
+        status, loaded, rejected = Solution.loadStudiosMovie([(1, "Up", 2009, 10, 300), (1, "Heat", 2005, 30, 250),
+                                                              (3, "It", 2017, 20, 50), (3, "Gone", 2020, 1, 1)])
+        self.assertEqual((ReturnValue.OK, 3, [(4, ReturnValue.NOT_EXISTS)]), (status, loaded, rejected))
+        franchises, years = self.assertSummaries("loadStudiosMovie")
+        self.assertEqual([("Heat", 1, 250), ("It", 1, 50), ("Jaws", 1, 900), ("Up", 1, 300)], franchises)
+        self.assertEqual([(1, 2005, 1, 250), (1, 2009, 1, 300), (3, 1975, 1, 900), (3, 2017, 1, 50)], years)
+
+    def testDelta(self) -> None:
+        self.recreateTables(revenue_views="delta")
+        self.applyChanges()
+
+    def testDeltaCompact(self) -> None:
+        self.recreateTables(compact=True, revenue_views="delta")
+        self.applyChanges()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,55 @@
+import unittest
+import psycopg2
+import Utility.DBConnector as Connector
+from Tests.abstractTest import AbstractTest
+
+
+class Test(AbstractTest):
+
+    def testRows(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            rows = list(conn.execute_stream("SELECT n, n * 2 FROM generate_series(1, %s) n", batch_size=1000,
+                                            params=(2500,)))
+        finally:
+            conn.close()
+        self.assertEqual([(n, n * 2) for n in range(1, 2501)], rows)
+
+    def testBatches(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            batches = list(conn.execute_stream("SELECT n FROM generate_series(1, 2500) n", batch_size=1000,
+                                               batches=True))
+        finally:
+            conn.close()
+        self.assertEqual([1000, 1000, 500], [batch.size() for batch in batches])
+        self.assertEqual((2500,), list(batches[-1].itertuples())[-1])
+
+    # rows are fetched as they are consumed, from a cursor open on the server until the stream ends
+    def testLazy(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            stream = conn.execute_stream("SELECT n FROM generate_series(1, 10) n", batch_size=3)
+            self.assertEqual((1,), next(stream))
+            _, cursors = conn.execute("SELECT count(*) AS n FROM pg_cursors WHERE name LIKE 'stream\\_%'",
+                                      commit=False)
+            self.assertEqual(1, cursors[0]['n'])
+            self.assertEqual(list(range(2, 11)), [n for n, in stream])
+            _, cursors = conn.execute("SELECT count(*) AS n FROM pg_cursors WHERE name LIKE 'stream\\_%'",
+                                      commit=False)
+            self.assertEqual(0, cursors[0]['n'], "the cursor is closed once the stream is exhausted")
+        finally:
+            conn.close()
+
+    def testError(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            with self.assertRaises(psycopg2.Error, msg="raised when the stream is consumed"):
+                list(conn.execute_stream("SELECT * FROM no_such_table"))
+        finally:
+            conn.close()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
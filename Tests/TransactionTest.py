@@ -0,0 +1,108 @@
+import threading
+import unittest
+import Solution
+import Utility.DBConnector as Connector
+from Utility.Exceptions import DatabaseException
+from Utility.ReturnValue import ReturnValue
+from Tests.abstractTest import AbstractTest
+
+from Business.Critic import Critic
+
+
+class Test(AbstractTest):
+    # these tests open transactions of their own, the transaction fixture would turn them into savepoints
+    fixture = "recreate" if AbstractTest.fixture == "recreate" else "truncate"
+
+    # the ids of the critics committed so far, read in another thread so outside any open transaction
+    def committedCritics(self) -> list:
+        ids = []
+
+        def read():
+            conn = Connector.DBConnector()
+            try:
+                _, result = conn.execute("SELECT id FROM Critics ORDER BY id")
+                ids.extend(critic_id for critic_id, in result.itertuples())
+            finally:
+                conn.close()
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        return ids
+
+    def testCommitOnce(self) -> None:
+        with Solution.transaction() as tx:
+            self.assertEqual(ReturnValue.OK, Solution.addCritic(Critic(1, "John")))
+            self.assertEqual(ReturnValue.OK, Solution.addCritic(Critic(2, "Bob")))
+            self.assertEqual([], self.committedCritics(), "nothing is committed before the block ends")
+        self.assertTrue(tx.committed)
+        self.assertEqual([1, 2], self.committedCritics())
+
+    def testRollback(self) -> None:
+        with self.assertRaises(ValueError):
+            with Solution.transaction() as tx:
+                Solution.addCritic(Critic(1, "John"))
+                raise ValueError("failed")
+        self.assertFalse(tx.committed)
+        with Solution.transaction() as tx:
+            Solution.addCritic(Critic(2, "Bob"))
+            tx.rollback()
+        self.assertFalse(tx.committed)
+        self.assertEqual([], self.committedCritics(), "the block raised or rollback() was called")
+
+    def testAbortedTransaction(self) -> None:
+        with self.assertRaises(DatabaseException.UNIQUE_VIOLATION, msg="the error that aborted it is raised"):
+            with Solution.transaction():
+                Solution.addCritic(Critic(1, "John"))
+                Solution.addCritic(Critic(1, "Bob"))
+                Solution.addCritic(Critic(2, "Bob"))
+        self.assertEqual([], self.committedCritics())
+
+    def testSavepoint(self) -> None:
+        with Solution.transaction() as tx:
+            Solution.addCritic(Critic(1, "John"))
+            with tx.savepoint() as savepoint:
+                Solution.addCritic(Critic(1, "Bob"))
+            self.assertTrue(savepoint.failed)
+            Solution.addCritic(Critic(2, "Bob"))
+        self.assertEqual([1, 2], self.committedCritics(), "only the savepoint is rolled back")
+
+    def testNestedTransaction(self) -> None:
+        with Solution.transaction():
+            Solution.addCritic(Critic(1, "John"))
+            with self.assertRaises(ValueError):
+                with Solution.transaction() as nested:
+                    self.assertIsInstance(nested, Connector.Savepoint)
+                    Solution.addCritic(Critic(2, "Bob"))
+                    raise ValueError("failed")
+            self.assertTrue(nested.failed)
+            Solution.addCritic(Critic(3, "Ann"))
+        self.assertEqual([1, 3], self.committedCritics(), "the nested transaction is a savepoint")
+
+    def testAutosavepoint(self) -> None:
+        with Solution.transaction(autosavepoint=True) as tx:
+            Solution.addCritic(Critic(1, "John"))
+            Solution.addCritic(Critic(1, "Bob"))
+            Solution.addCritic(Critic(2, "Bob"))
+        self.assertTrue(tx.committed)
+        self.assertEqual([1, 2], self.committedCritics(), "a failed call is undone alone")
+
+    # what a transaction reads is not cached, another thread would get it before the commit
+    def testUncommittedNotCached(self) -> None:
+        profiles = []
+
+        def read():
+            profiles.append(Solution.getCriticProfile(2))
+        with Solution.transaction() as tx:
+            Solution.addCritic(Critic(2, "uncommitted"))
+            self.assertEqual("uncommitted", Solution.getCriticProfile(2).getName())
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join()
+            tx.rollback()
+        self.assertEqual([Critic.badCritic()], profiles)
+        self.assertEqual(Critic.badCritic(), Solution.getCriticProfile(2))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
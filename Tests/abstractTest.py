@@ -1,12 +1,71 @@
+import atexit
+import os
 import unittest
 import Solution
 
+# under pytest-xdist every worker gets a schema of its own, see Tests/parallelRunner.py
+if os.environ.get("PYTEST_XDIST_WORKER") and not os.environ.get("DB_SCHEMA"):
+    os.environ["DB_SCHEMA"] = "test_" + os.environ["PYTEST_XDIST_WORKER"]
+
 
 class AbstractTest(unittest.TestCase):
+    # how the tests are isolated from each other, the TEST_FIXTURE environment variable overrides it:
+    # "transaction" - the tables are created once per session and every test runs in a transaction that is
+    #                 rolled back after it, each API call in a savepoint of its own (see Solution.transaction);
+    #                 only the test's own thread sees its rows, use "truncate" for tests that run calls in other
+    #                 threads (e.g. Solution.gather)
+    # "truncate"    - the tables are created once per session and emptied by clearTables after every test
+    # "recreate"    - createTables before and dropTables after every test
+    fixture = os.environ.get("TEST_FIXTURE", "transaction")
+
+    # are the session's tables created?
+    schema_ready = False
+
     # before each test, setUp is executed
     def setUp(self) -> None:
-        Solution.createTables()
+        if self.fixture == "recreate":
+            if AbstractTest.schema_ready:
+                Solution.dropTables()
+                AbstractTest.schema_ready = False
+            Solution.createTables()
+            return
+        if not AbstractTest.schema_ready:
+            Solution.dropTables()
+            Solution.createTables()
+            AbstractTest.schema_ready = True
+            atexit.register(AbstractTest.dropSchema)
+        if self.fixture == "transaction":
+            self.transaction = Solution.transaction(autosavepoint=True)
+            self.transaction.__enter__()
 
     # after each test, tearDown is executed
     def tearDown(self) -> None:
+        if self.fixture == "recreate":
+            Solution.dropTables()
+        elif self.fixture == "transaction":
+            self.transaction.rollback()
+            self.transaction.__exit__(None, None, None)
+        else:
+            Solution.clearTables()
+
+    # replaces the tables by createTables(compact, revenue_views) ones for the rest of the test, the next test
+    # gets the default tables again
+    def recreateTables(self, compact: bool = False, revenue_views: str = None) -> None:
         Solution.dropTables()
+        Solution.createTables(compact, revenue_views)
+        self.addCleanup(self.restoreTables)
+
+    # runs after tearDown: the transaction fixture rolled the tables back already, only the API's cached view of
+    # them is stale; the truncate fixture needs the default tables back, the recreate fixture dropped them
+    def restoreTables(self) -> None:
+        if self.fixture == "truncate":
+            Solution.dropTables()
+            Solution.createTables()
+        Solution.setCompactSchema(None)
+        Solution.setRevenueViews(None)
+
+    @staticmethod
+    def dropSchema() -> None:
+        if AbstractTest.schema_ready:
+            Solution.dropTables()
+            AbstractTest.schema_ready = False
@@ -0,0 +1,102 @@
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import unittest
+
+# runs the test suite in N worker processes, each on its own PostgreSQL schema:
+#     python -m Tests.parallelRunner -j 4                  every Tests/*Test.py
+#     python -m Tests.parallelRunner -j 4 Tests.SimpleTest the given modules/classes
+# the test classes are spread over the workers, worker i runs its classes on the tables of schema
+# <prefix>_<i> (DB_SCHEMA, the search_path of all its connections, see Utility.DBConnector.setSchema) and drops
+# the schema when it is done; each worker creates its tables once (AbstractTest's session fixture), so the
+# wall-clock time goes down with the number of workers up to the number of cores the server has
+
+
+# the test classes of the suite, as dotted names
+def testClasses(suite) -> list:
+    classes = []
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for name in testClasses(test):
+                if name not in classes:
+                    classes.append(name)
+        elif isinstance(test, unittest.loader._FailedTest):
+            # a module that failed to import, the worker gets the error again when it loads it
+            name = test._testMethodName
+            if name not in classes:
+                classes.append(name)
+        else:
+            name = type(test).__module__ + "." + type(test).__qualname__
+            if name not in classes:
+                classes.append(name)
+    return classes
+
+
+def runWorker(index: int, schema: str, names: list, verbosity: int, results):
+    os.environ["DB_SCHEMA"] = schema
+    stream = io.StringIO()
+    summary = (0, 0, 1, 0)
+    try:
+        suite = unittest.TestLoader().loadTestsFromNames(names)
+        result = unittest.TextTestRunner(stream=stream, verbosity=verbosity).run(suite)
+        summary = (result.testsRun, len(result.failures), len(result.errors), len(result.skipped))
+        abstract_test = sys.modules.get("Tests.abstractTest")
+        if abstract_test is not None:
+            abstract_test.AbstractTest.dropSchema()
+        from Utility import DBConnector
+        DBConnector.dropSchema(schema)
+    except Exception:
+        stream.write(traceback.format_exc())
+    results.put((index, summary, stream.getvalue()))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the tests in parallel, one database schema per worker")
+    parser.add_argument("tests", nargs="*", help="test modules/classes to run, every Tests/*Test.py by default")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--schema-prefix", default="test_worker", help="the workers' schemas are <prefix>_<i>")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    loader = unittest.TestLoader()
+    if args.tests:
+        suite = loader.loadTestsFromNames(args.tests)
+    else:
+        # Tests is not a package, its modules are imported by their own names as pytest does
+        tests = os.path.dirname(os.path.abspath(__file__))
+        suite = loader.discover(tests, pattern="[A-Z]*Test.py", top_level_dir=tests)
+    classes = testClasses(suite)
+    jobs = max(1, min(args.jobs, len(classes)))
+
+    # fresh interpreters: no worker inherits the parent's connections or module state
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    started = time.perf_counter()
+    workers = [context.Process(target=runWorker, args=(i, "%s_%d" % (args.schema_prefix, i), classes[i::jobs],
+                                                       2 if args.verbose else 1, results))
+               for i in range(jobs)]
+    for worker in workers:
+        worker.start()
+    outputs = sorted(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    run = failures = errors = skipped = 0
+    for index, (worker_run, worker_failures, worker_errors, worker_skipped), output in outputs:
+        run += worker_run
+        failures += worker_failures
+        errors += worker_errors
+        skipped += worker_skipped
+        if args.verbose or worker_failures or worker_errors:
+            sys.stderr.write("---------- worker %d ----------\n%s" % (index, output))
+    sys.stderr.write("Ran %d tests in %.3fs on %d workers: %d failures, %d errors, %d skipped\n" % (
+        run, time.perf_counter() - started, jobs, failures, errors, skipped))
+    return 1 if failures or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
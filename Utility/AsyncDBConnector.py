@@ -0,0 +1,373 @@
+import asyncio
+import sys
+import time
+from typing import Union
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+import Utility.DBConnector as Connector
+from Utility.ConnectionPool import PooledConnection
+from Utility.DBConnector import DBConnector, ResultSet, translateErrors
+from Utility.Exceptions import DatabaseException
+from Utility.Instrumentation import instrumentation
+
+
+# waits, without blocking the event loop, until the pending operation (connect or query) of an asynchronous
+# psycopg2 connection is done; errors of the operation are raised from here
+async def wait(conn):
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        ready = loop.create_future()
+        fileno = conn.fileno()
+        if state == extensions.POLL_READ:
+            loop.add_reader(fileno, wake, ready)
+            try:
+                await ready
+            finally:
+                loop.remove_reader(fileno)
+        elif state == extensions.POLL_WRITE:
+            loop.add_writer(fileno, wake, ready)
+            try:
+                await ready
+            finally:
+                loop.remove_writer(fileno)
+        else:
+            raise psycopg2.OperationalError("poll() returned %s" % state)
+
+
+def wake(ready):
+    if not ready.done():
+        ready.set_result(None)
+
+
+# runs one statement on the cursor of an asynchronous connection
+async def run(cursor, query, params=None):
+    cursor.execute(query, params)
+    await wait(cursor.connection)
+
+
+# creates the current schema the first time a connection of this process is handed out, like
+# Connector.ensureSchema; a schema created at the same time by another connection is no error
+async def ensureSchema(connection):
+    name = Connector.currentSchema()
+    if name is None or name == Connector.schema_created:
+        return
+    cursor = connection.cursor()
+    try:
+        await run(cursor, sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(name)))
+    except psycopg2.IntegrityError:
+        pass
+    finally:
+        cursor.close()
+    Connector.schema_created = name
+
+
+class AsyncConnectionPool:
+    # asyncio counterpart of ConnectionPool for the event loop that created it: connections are opened in
+    # psycopg2's asynchronous mode, and checking them out and in never blocks the loop
+    # every query in flight needs a connection of its own, size maxconn for the concurrency you want
+    def __init__(self, params: dict, minconn=1, maxconn=10, idle_timeout=300.0, health_check_interval=30.0,
+                 checkout_timeout=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: minconn=%s maxconn=%s" % (minconn, maxconn))
+        self.params = dict(params)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.loop = asyncio.get_running_loop()
+        self.__idle = []  # (connection, time it was returned), most recently returned last
+        self.__used = 0
+        self.__closed = False
+        self.__cond = asyncio.Condition()
+
+    # how many connections are idle / checked out right now
+    def size(self) -> (int, int):
+        return len(self.__idle), self.__used
+
+    # take a connection out of the pool, opening a new one if the pool is not full
+    # waits up to checkout_timeout seconds when all maxconn connections are in use
+    async def getconn(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            async with self.__cond:
+                while True:
+                    if self.__closed:
+                        raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+                    self.__reapIdle()
+                    if self.__idle or self.__used < self.maxconn:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DatabaseException.ConnectionInvalid("Timed out waiting for a pooled connection")
+                    try:
+                        await asyncio.wait_for(self.__cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                # reserve the slot, connect or ping outside the lock
+                self.__used += 1
+                conn, returned_at = self.__idle.pop() if self.__idle else (None, None)
+            if conn is None:
+                try:
+                    return await self.__connect()
+                except BaseException:
+                    await self.__release()
+                    raise
+            if await self.__isHealthy(conn, returned_at):
+                return conn
+            AsyncConnectionPool.__discard(conn)
+            await self.__release()
+
+    # give a connection back to the pool, an unfinished transaction is rolled back first
+    # a connection still running a query (its task was cancelled) is closed
+    async def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                if conn.isexecuting():
+                    discard = True
+                elif conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    cursor = conn.cursor()
+                    await run(cursor, "ROLLBACK")
+                    cursor.close()
+            except Exception:
+                discard = True
+        async with self.__cond:
+            self.__used -= 1
+            if discard or conn.closed or self.__closed:
+                AsyncConnectionPool.__discard(conn)
+            else:
+                self.__idle.append((conn, time.monotonic()))
+                self.__reapIdle()
+            self.__cond.notify()
+
+    # close every idle connection, connections that are checked out are closed when they are returned
+    async def closeall(self):
+        async with self.__cond:
+            self.__closed = True
+            while self.__idle:
+                conn, _ = self.__idle.pop()
+                AsyncConnectionPool.__discard(conn)
+            self.__cond.notify_all()
+
+    async def __release(self):
+        async with self.__cond:
+            self.__used -= 1
+            self.__cond.notify()
+
+    async def __connect(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, async_=True, **self.params)
+        try:
+            await wait(conn)
+        except BaseException:
+            AsyncConnectionPool.__discard(conn)
+            raise
+        return conn
+
+    async def __isHealthy(self, conn, returned_at) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            await run(cursor, "SELECT 1")
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    # close idle connections that were not used for idle_timeout seconds, keeping minconn open
+    # the oldest connections are at the front of the idle list
+    def __reapIdle(self):
+        now = time.monotonic()
+        while self.__idle and len(self.__idle) + self.__used > self.minconn \
+                and now - self.__idle[0][1] > self.idle_timeout:
+            conn, _ = self.__idle.pop(0)
+            AsyncConnectionPool.__discard(conn)
+
+    @staticmethod
+    def __discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# the pool of the running event loop, created lazily on first use; a pool made by another (e.g. finished)
+# loop is dropped, its connections are closed when they are garbage collected
+_pool = None
+_pool_settings = {}
+
+
+# change pool sizes/timeouts, like ConnectionPool.configurePool
+async def configureAsyncPool(**settings):
+    global _pool_settings
+    _pool_settings = dict(settings)
+    await closeAsyncPool()
+
+
+def getAsyncPool(params_factory) -> AsyncConnectionPool:
+    global _pool
+    if _pool is None or _pool.loop is not asyncio.get_running_loop():
+        _pool = AsyncConnectionPool(params_factory(), **_pool_settings)
+    return _pool
+
+
+async def closeAsyncPool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None and pool.loop is asyncio.get_running_loop():
+        await pool.closeall()
+
+
+class AsyncDBConnector:
+    # asyncio counterpart of DBConnector, with the same results and DatabaseException mapping:
+    #     async with AsyncDBConnector() as conn:
+    #         row_effected, result = await conn.execute(...)
+    # or conn = await AsyncDBConnector.open() ... await conn.close()
+    # asynchronous psycopg2 connections run every statement in its own transaction, so a statement run with
+    # commit=False opens one (BEGIN), which lasts until commit()/rollback() or the next statement run with
+    # commit=True
+    def __init__(self):
+        self.connection = None
+        self.cursor = None
+        self.__pool = None
+        self.__in_transaction = False
+
+    # checks a connection out of the event loop's pool
+    @staticmethod
+    async def open() -> 'AsyncDBConnector':
+        return await AsyncDBConnector().__aenter__()
+
+    async def __aenter__(self):
+        if self.connection is not None:
+            return self
+        try:
+            # the configuration parameters are read only when the pool is created
+            self.__pool = getAsyncPool(DBConnector.connectionParams)
+            self.connection = await self.__pool.getconn()
+            await ensureSchema(self.connection)
+            self.cursor = self.connection.cursor()
+        except Exception as e:
+            print(e)
+            await self.close()
+            raise DatabaseException.ConnectionInvalid("Could not connect to database")
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+    # return the connection to the pool, uncommitted changes are rolled back
+    # safe to call more than once
+    async def close(self):
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            self.__in_transaction = False
+            await self.__pool.putconn(connection)
+
+    # commit connection's changes
+    async def commit(self):
+        if self.connection is not None and self.__in_transaction:
+            try:
+                await run(self.cursor, "COMMIT")
+            except Exception:
+                raise DatabaseException.ConnectionInvalid("Could not commit changes")
+            finally:
+                self.__in_transaction = False
+
+    # rollback connection's changes
+    async def rollback(self):
+        if self.connection is not None and self.__in_transaction:
+            try:
+                await run(self.cursor, "ROLLBACK")
+            except Exception:
+                raise DatabaseException.ConnectionInvalid("Could not rollback changes")
+            finally:
+                self.__in_transaction = False
+
+    # executes the query, like DBConnector.execute
+    # returns the number of rows effected and a ResultSet (for SELECT)
+    async def execute(self, query: Union[str, sql.Composed], printSchema=False, commit=True, params=None) \
+            -> (int, ResultSet):
+        return await self.__execute(query, printSchema, commit, params)
+
+    # execute, recording the statement in Utility.Instrumentation as label (the query itself if None); slow
+    # statements are logged without a plan
+    async def __execute(self, query, printSchema=False, commit=True, params=None, label=None) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        with translateErrors():
+            if not commit and not self.__in_transaction:
+                await run(self.cursor, "BEGIN")
+                self.__in_transaction = True
+            start = time.perf_counter()
+            try:
+                await run(self.cursor, query, params)
+            except psycopg2.Error as e:
+                self.__record(time.perf_counter() - start, label or query, 0, e)
+                # like a failed statement of DBConnector, the open transaction is aborted
+                if self.__in_transaction:
+                    await self.rollback()
+                raise
+            row_effected = max(self.cursor.rowcount, 0)
+            self.__record(time.perf_counter() - start, label or query, row_effected)
+            description = self.cursor.description
+            rows = self.cursor.fetchall() if description is not None else None
+            if commit:
+                await self.commit()
+
+        entries = ResultSet(description, rows) if description is not None else ResultSet()
+        if printSchema:
+            entries.write(sys.stdout)
+            print()
+        return row_effected, entries
+
+    # executes query, written with $1, $2, ... placeholders, as a server-side prepared statement,
+    # like DBConnector.execute_prepared (and sharing its per-connection statement cache and size)
+    async def execute_prepared(self, query: str, params=(), printSchema=False, commit=True) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        name = await self.__prepare(query)
+        if len(params) == 0:
+            return await self.__execute("EXECUTE " + name, printSchema, commit, label=query)
+        return await self.__execute("EXECUTE " + name + "(" + ", ".join(["%s"] * len(params)) + ")", printSchema,
+                                    commit, tuple(params), query)
+
+    def __record(self, seconds, statement, rows, error=None):
+        if not instrumentation.enabled:
+            return
+        if not isinstance(statement, str):
+            statement = statement.as_string(self.connection)
+        instrumentation.record("execute", seconds, statement, rows, error)
+        if error is None and instrumentation.isSlow(seconds):
+            executed = self.cursor.query.decode(extensions.encodings[self.connection.encoding])
+            instrumentation.logSlow(executed, seconds, None, statement)
+
+    async def __prepare(self, query: str) -> str:
+        prepared = self.connection.prepared
+        name = prepared.get(query)
+        if name is not None:
+            prepared.move_to_end(query)
+            return name
+        name = "dbc_stmt_%d" % next(self.connection.prepared_ids)
+        with translateErrors():
+            await run(self.cursor, sql.SQL("PREPARE {} AS ").format(sql.Identifier(name)) + sql.SQL(query))
+        prepared[query] = name
+        while len(prepared) > DBConnector.PREPARED_CACHE_SIZE:
+            _, evicted = prepared.popitem(last=False)
+            await run(self.cursor, sql.SQL("DEALLOCATE {}").format(sql.Identifier(evicted)))
+        return name
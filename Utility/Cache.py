@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Cache:
+    # thread-safe LRU cache: at most maxsize entries, each one dropped ttl seconds after it was stored
+    # (never if ttl is None); a disabled cache stores nothing and misses every lookup
+    # a reader takes generation() before reading the value and passes it to put, which drops the value if the key
+    # was invalidated (or the cache cleared) in between: the value may have been read before the change
+    MISSING = object()  # returned by lookup when the key is not cached
+
+    def __init__(self, maxsize=1024, ttl=None, enabled=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.__entries = OrderedDict()  # key -> (value, expiry time), least recently used first
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+        self.__generation = 0
+        self.__invalidated = OrderedDict()  # key -> generation of its last invalidation, oldest first
+        self.__forgotten = 0  # a put of a generation before this one is dropped, whatever its key
+
+    # the cached value of key, or Cache.MISSING
+    def lookup(self, key):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return Cache.MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.__entries[key]
+                self.__expirations += 1
+                self.__misses += 1
+                return Cache.MISSING
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return value
+
+    def generation(self) -> int:
+        with self.__lock:
+            return self.__generation
+
+    def put(self, key, value, generation=None):
+        if not self.enabled:
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.__lock:
+            if generation is not None and (generation < self.__forgotten or
+                                           self.__invalidated.get(key, -1) > generation):
+                return
+            self.__entries[key] = (value, expires_at)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__generation += 1
+            self.__invalidated[key] = self.__generation
+            self.__invalidated.move_to_end(key)
+            # as many invalidations as entries are remembered, a put older than the forgotten ones is dropped
+            while len(self.__invalidated) > self.maxsize:
+                _, self.__forgotten = self.__invalidated.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__generation += 1
+            self.__invalidated.clear()
+            self.__forgotten = self.__generation
+
+    # hit/miss/eviction counters and the current size
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions,
+                    "expirations": self.__expirations, "size": len(self.__entries)}
+
+    def resetStats(self):
+        with self.__lock:
+            self.__hits = self.__misses = self.__evictions = self.__expirations = 0
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
@@ -0,0 +1,196 @@
+import itertools
+import os
+import threading
+from collections import OrderedDict
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from Utility.Exceptions import DatabaseException
+
+
+class PooledConnection(extensions.connection):
+    # psycopg2 connection that carries per-connection state across checkouts,
+    # e.g. the statements DBConnector has PREPAREd on it (statement text -> name, least recently used first)
+    # and whether its session has the function behind DBConnector.execute_many
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = OrderedDict()
+        self.prepared_ids = itertools.count()
+        self.execute_many_ready = False
+
+
+class ConnectionPool:
+    # thread-safe pool of psycopg2 connections
+    # minconn connections are kept open, at most maxconn exist at once (idle + checked out)
+    # idle connections above minconn are closed after idle_timeout seconds
+    # a connection that sat idle longer than health_check_interval seconds is pinged before it is handed out
+    def __init__(self, params: dict, minconn=1, maxconn=10, idle_timeout=300.0, health_check_interval=30.0,
+                 checkout_timeout=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: minconn=%s maxconn=%s" % (minconn, maxconn))
+        self.params = dict(params)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.pid = os.getpid()
+        self.__idle = []  # (connection, time it was returned), most recently returned last
+        self.__used = 0
+        self.__closed = False
+        self.__cond = threading.Condition()
+
+    # how many connections are idle / checked out right now
+    def size(self) -> (int, int):
+        with self.__cond:
+            return len(self.__idle), self.__used
+
+    # take a connection out of the pool, opening a new one if the pool is not full
+    # blocks up to checkout_timeout seconds when all maxconn connections are in use
+    def getconn(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self.__cond:
+                while True:
+                    if self.__closed:
+                        raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+                    self.__reapIdle()
+                    if self.__idle or self.__used < self.maxconn:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DatabaseException.ConnectionInvalid("Timed out waiting for a pooled connection")
+                    self.__cond.wait(remaining)
+                # reserve the slot, connect or ping outside the lock
+                self.__used += 1
+                conn, returned_at = self.__idle.pop() if self.__idle else (None, None)
+            if conn is None:
+                try:
+                    return self.__connect()
+                except Exception:
+                    self.__release()
+                    raise
+            if self.__isHealthy(conn, returned_at):
+                return conn
+            self.__discard(conn)
+            self.__release()
+
+    # give a connection back to the pool, an unfinished transaction is rolled back first
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        with self.__cond:
+            self.__used -= 1
+            if discard or conn.closed or self.__closed:
+                self.__discard(conn)
+            else:
+                self.__idle.append((conn, time.monotonic()))
+                self.__reapIdle()
+            self.__cond.notify()
+
+    # context manager API: with pool.connection() as conn: ...
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except Exception:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    # close every idle connection, connections that are checked out are closed when they are returned
+    def closeall(self):
+        with self.__cond:
+            self.__closed = True
+            while self.__idle:
+                conn, _ = self.__idle.pop()
+                self.__discard(conn)
+            self.__cond.notify_all()
+
+    def __release(self):
+        with self.__cond:
+            self.__used -= 1
+            self.__cond.notify()
+
+    def __connect(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.params)
+        conn.autocommit = False
+        return conn
+
+    def __isHealthy(self, conn, returned_at) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # close idle connections that were not used for idle_timeout seconds, keeping minconn open
+    # the oldest connections are at the front of the idle list
+    def __reapIdle(self):
+        now = time.monotonic()
+        while self.__idle and len(self.__idle) + self.__used > self.minconn \
+                and now - self.__idle[0][1] > self.idle_timeout:
+            conn, _ = self.__idle.pop(0)
+            self.__discard(conn)
+
+    @staticmethod
+    def __discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# the process-wide pool, created lazily on first use
+_pool = None
+_pool_lock = threading.Lock()
+_pool_settings = {}
+
+
+# change pool sizes/timeouts (minconn, maxconn, idle_timeout, health_check_interval, checkout_timeout)
+# the current pool is closed and a new one is created on the next checkout
+def configurePool(**settings):
+    global _pool, _pool_settings
+    with _pool_lock:
+        _pool_settings = dict(settings)
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+# returns the process-wide pool, params_factory is called only when the pool has to be created
+# a forked child never reuses the parent's sockets, it gets a pool of its own
+def getPool(params_factory) -> ConnectionPool:
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(params_factory(), **_pool_settings)
+        return _pool
+
+
+# close the process-wide pool, e.g. at shutdown or after changing database.ini
+def closePool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
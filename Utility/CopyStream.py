@@ -0,0 +1,53 @@
+import io
+
+
+class CopyStream(io.TextIOBase):
+    # file-like object that turns an iterable of tuples into PostgreSQL COPY text format (tab separated)
+    # rows are pulled from the iterable only as COPY reads, so the input is never materialized
+    __escapes = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+    def __init__(self, rows, rows_per_read=1000):
+        self.__rows = iter(rows)
+        self.__rows_per_read = rows_per_read
+        self.__buffer = ""
+        self.__done = False
+        self.rows = 0  # number of rows handed to COPY so far
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while not self.__done and (size is None or size < 0 or len(self.__buffer) < size):
+            self.__fill()
+        if size is None or size < 0 or size >= len(self.__buffer):
+            data, self.__buffer = self.__buffer, ""
+        else:
+            data, self.__buffer = self.__buffer[:size], self.__buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        while not self.__done and '\n' not in self.__buffer:
+            self.__fill()
+        end = self.__buffer.find('\n') + 1 or len(self.__buffer)
+        if size is not None and 0 <= size < end:
+            end = size
+        data, self.__buffer = self.__buffer[:end], self.__buffer[end:]
+        return data
+
+    def __fill(self):
+        lines = []
+        for row in self.__rows:
+            lines.append('\t'.join(CopyStream.__field(value) for value in row))
+            if len(lines) == self.__rows_per_read:
+                break
+        if len(lines) < self.__rows_per_read:
+            self.__done = True
+        if lines:
+            self.rows += len(lines)
+            self.__buffer += '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def __field(value) -> str:
+        if value is None:
+            return '\\N'
+        return str(value).translate(CopyStream.__escapes)
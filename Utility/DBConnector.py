@@ -1,11 +1,102 @@
 import psycopg2
-from psycopg2 import errors, sql
+from psycopg2 import extensions, extras, sql
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping
 from configparser import ConfigParser
+from contextlib import contextmanager
 from Utility.Exceptions import DatabaseException
+from Utility import ConnectionPool
+from Utility.Instrumentation import instrumentation
+from Utility.ResultSetFormatter import ResultSetFormatter
+import decimal
+import io
+import itertools
+import json
 import os
+import re
+import sys
+import threading
+import time
 from typing import Union
 
 
+# SQLSTATE of the integrity errors of the server -> the DatabaseException they are reported as
+INTEGRITY_ERRORS = {
+    "23502": DatabaseException.NOT_NULL_VIOLATION,
+    "23503": DatabaseException.FOREIGN_KEY_VIOLATION,
+    "23505": DatabaseException.UNIQUE_VIOLATION,
+    "23514": DatabaseException.CHECK_VIOLATION,
+}
+
+
+# the DatabaseException for an error of the server, UNKNOWN_ERROR for the ones that are not integrity errors
+def databaseError(code: str, message: str) -> Exception:
+    exception = INTEGRITY_ERRORS.get(code)
+    if exception is None:
+        return DatabaseException.UNKNOWN_ERROR(message)
+    return exception(exception.__name__)
+
+
+# maps the integrity errors of the server to DatabaseException
+@contextmanager
+def translateErrors():
+    try:
+        yield
+    except psycopg2.Error as e:
+        if e.pgcode not in INTEGRITY_ERRORS:
+            raise
+        raise databaseError(e.pgcode, str(e))
+
+
+# the schema the tables are in, it is the whole search_path of every connection (so nothing resolves to a table
+# of another schema); None for the server's default search_path; the DB_SCHEMA environment variable sets it too
+schema = None
+schema_created = None  # the schema ensureSchema has created in this process
+schema_lock = threading.Lock()
+SCHEMA_NAME = re.compile(r"^[a-z_][a-z0-9_]{0,62}$")
+
+
+# switch the tables of this process to schema name (None: back to DB_SCHEMA or the default search_path), e.g. to
+# give every worker of a parallel test run its own tables; the pool is closed so new connections get the new
+# search_path
+def setSchema(name):
+    global schema
+    if name is not None and SCHEMA_NAME.match(name) is None:
+        raise ValueError("schema must be a lowercase identifier: %r" % name)
+    with schema_lock:
+        schema = name
+        ConnectionPool.closePool()
+
+
+def currentSchema():
+    return schema or os.environ.get("DB_SCHEMA") or None
+
+
+# creates the current schema the first time a connection of this process is handed out
+def ensureSchema(connection):
+    global schema_created
+    name = currentSchema()
+    if name is None or name == schema_created:
+        return
+    with schema_lock:
+        if name != schema_created:
+            with connection.cursor() as cursor:
+                cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(name)))
+            connection.commit()
+            schema_created = name
+
+
+# drops a schema with all of its tables, e.g. once a parallel test worker is done
+def dropSchema(name):
+    global schema_created
+    with DBConnector() as conn:
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(name)))
+    with schema_lock:
+        if schema_created == name:
+            schema_created = None
+
+
 class ResultSetDict(dict):
     def __getitem__(self, item):
         if type(item) is not str:
@@ -13,28 +104,99 @@ class ResultSetDict(dict):
         return super().__getitem__(item.lower())
 
 
+class ResultSetRow(Mapping):
+    # read-only view of one row of a ResultSet, behaves like ResultSetDict (case insensitive column
+    # names, None for non-str keys) but reads straight from the row tuple through the column index
+    # map shared by all the rows of the ResultSet
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, values: tuple, index: dict):
+        self._values = values
+        self._index = index
+
+    def __getitem__(self, item):
+        if type(item) is not str:
+            return None
+        return self._values[self._index[item.lower()]]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    # namedtuple-like access: row.name, row._fields, row._asdict()
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name.lower()]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def _fields(self) -> tuple:
+        return tuple(self._index)
+
+    def _asdict(self) -> dict:
+        return dict(zip(self._index, self._values))
+
+    def __repr__(self):
+        return 'ResultSetRow(' + ', '.join(col + '=' + repr(val) for col, val in zip(self._index, self._values)) + ')'
+
+
+# stands for a cursor description entry where a ResultSet is built from rows that did not come from a cursor
+ResultSetColumn = namedtuple('ResultSetColumn', 'name')
+
+
 class ResultSet:
+    __slots__ = ('rows', 'cols_header', 'cols', '__index', '__columns')
+
     # constructor
     def __init__(self, description=None, results=None):
         self.rows = []
         self.cols_header = []
         self.cols = ResultSetDict()
+        self.__index = {}
+        self.__columns = {}
         self.__fromQuery(description, results)
 
+    # result[i] is a ResultSetRow, result[i:j] is a ResultSet sharing the rows of this one
     def __getitem__(self, row):
+        if isinstance(row, slice):
+            return self.__slice(row)
         return self.__getRow(row)
 
+    # so you can use: for row in result: ...
+    def __iter__(self):
+        index = self.__index
+        for values in self.rows:
+            yield ResultSetRow(values, index)
+
+    def __len__(self):
+        return len(self.rows)
+
+    # iterates over the row tuples themselves, with named=True over namedtuples of the columns
+    def itertuples(self, named=False):
+        if not named:
+            return iter(self.rows)
+        row_type = namedtuple('Row', self.__index, rename=True)
+        return map(row_type._make, self.rows)
+
     # so you can use print(ResultSet)
     def __str__(self):
-        string = ""
-        for col in self.cols_header:
-            string += str(col) + "   "
-        string += '\n'
-        for row in self.rows:
-            for val in row:
-                string += str(val) + "   "
-            string += '\n'
-        return string
+        output = io.StringIO()
+        self.write(output)
+        return output.getvalue()
+
+    # writes the ResultSet to a text stream row by row, see ResultSetFormatter for the modes
+    # limit prints only the first rows, align pads the columns of the plain mode to equal width
+    def write(self, stream=None, mode="plain", limit=None, align=False):
+        rows = self.rows if limit is None else itertools.islice(self.rows, limit)
+        widths = ResultSetFormatter.columnWidths(self.cols_header, rows) if align and mode == "plain" else None
+        formatter = ResultSetFormatter(sys.stdout if stream is None else stream, mode, limit, widths)
+        formatter.header(self.cols_header)
+        formatter.rows(self.rows)
 
     # what is the size of the ResultSet?
     def size(self):
@@ -44,115 +206,634 @@ class ResultSet:
     def isEmpty(self):
         return self.size() == 0
 
+    # all the values of one column, converted once and cached
+    # integer and float columns are packed into an array and returned as a read-only memoryview over it,
+    # other columns are returned as a tuple; with numpy=True returns a numpy array sharing the same buffer
+    def column(self, name: str, numpy=False):
+        index = self.__index[name.lower()]
+        values = self.__columns.get(index)
+        if values is None:
+            values = ResultSet.__pack([row[index] for row in self.rows])
+            self.__columns[index] = values
+        if numpy:
+            import numpy as np
+            if isinstance(values, array):
+                return np.frombuffer(values, dtype=np.int64 if values.typecode == 'q' else np.float64)
+            return np.array(values, dtype=object)
+        if isinstance(values, array):
+            return memoryview(values).toreadonly()
+        return values
+
+    # packs numeric columns (without NULLs) into int64/float64 arrays
+    @staticmethod
+    def __pack(values: list):
+        types = set(map(type, values))
+        try:
+            if types == {int}:
+                return array('q', values)
+            if types and types <= {int, float}:
+                return array('d', values)
+        except OverflowError:
+            pass
+        return tuple(values)
+
     def __getRow(self, row: int):
-        if len(self.rows) <= row:
-            print('Invalid row ' + str(row))
-            return ResultSetDict()
-        row_to_return = ResultSetDict()
-        for val, col in zip(self.rows[row], self.cols_header):
-            row_to_return[col] = val
-        return row_to_return
+        try:
+            return ResultSetRow(self.rows[row], self.__index)
+        except IndexError:
+            raise IndexError('Invalid row ' + str(row)) from None
+
+    def __slice(self, rows: slice):
+        result = ResultSet()
+        result.rows = self.rows[rows]
+        result.cols_header = self.cols_header
+        result.cols = self.cols
+        result.__index = self.__index
+        return result
 
     def __fromQuery(self, description, results: list):
         if results is None or len(results) == 0:  # no results
             self.cols = ResultSetDict()
         else:
-            self.rows = results.copy()
+            # fetchall returns a fresh list, no need to copy it
+            self.rows = results
             self.cols_header = [d.name for d in description]
             self.cols = ResultSetDict()
             for col, index in zip(self.cols_header, range(len(results[0]))):
                 self.cols[col] = index
+            self.__index = {col.lower(): index for col, index in self.cols.items()}
 
 
 class DBConnector:
-    # constructor
+    # constructor, checks a connection out of the process-wide pool, or joins the Transaction open in this thread
+    # (in a savepoint of its own if the transaction is autosavepoint)
     def __init__(self):
+        self.connection = None
+        self.cursor = None
+        self.__savepoint = None
+        self.__transaction = Transaction.current()
+        if self.__transaction is not None:
+            self.connection = self.__transaction.connection
+            self.cursor = self.connection.cursor()
+            if self.__transaction.autosavepoint:
+                self.__savepoint = self.__transaction.savepoint().__enter__()
+            return
         try:
-            # Obtain the configuration parameters
-            params = DBConnector.__config()
-            self.connection = psycopg2.connect(**params)
-            self.connection.autocommit = False
+            # the configuration parameters are read only when the pool is created
+            self.__pool = ConnectionPool.getPool(DBConnector.__config)
+            with self.__timed("connect"):
+                self.connection = self.__pool.getconn()
+            ensureSchema(self.connection)
             self.cursor = self.connection.cursor()
         except Exception as e:
             print(e)
-            self.connection = None
-            self.cursor = None
+            self.close()
             raise DatabaseException.ConnectionInvalid("Could not connect to database")
 
-    # close connection
+    # so you can use: with DBConnector() as conn: ...
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    # return the connection to the pool, uncommitted changes are rolled back
+    # in a Transaction the connection stays with the transaction, the savepoint of an autosavepoint transaction
+    # is released, or rolled back to if a statement failed or rollback() was called
+    # safe to call more than once
     def close(self):
         if self.cursor is not None:
-            self.cursor.close()
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
+        if self.__savepoint is not None:
+            savepoint, self.__savepoint = self.__savepoint, None
+            savepoint.__exit__(None, None, None)
         if self.connection is not None:
-            self.connection.close()
+            if self.__transaction is None:
+                self.__pool.putconn(self.connection)
+            self.connection = None
 
-    # commit connection's changes
+    # commit connection's changes, in a Transaction they are committed when it ends
     def commit(self):
-        if self.connection is not None:
+        if self.connection is not None and self.__transaction is None:
             try:
-                self.connection.commit()
+                with self.__timed("commit"):
+                    self.connection.commit()
             except Exception:
                 raise DatabaseException.ConnectionInvalid("Could not commit changes")
 
-    # rollback connection's changes
+    # rollback connection's changes, in a Transaction the whole transaction is rolled back when it ends (in an
+    # autosavepoint one, the changes since this DBConnector joined it are rolled back when it closes)
     def rollback(self):
-        if self.connection is not None:
+        if self.__savepoint is not None:
+            self.__savepoint.rollback_only = True
+        elif self.__transaction is not None:
+            self.__transaction.rollback_only = True
+        elif self.connection is not None:
             try:
                 self.connection.rollback()
             except Exception:
                 raise DatabaseException.ConnectionInvalid("Could not rollback changes")
 
     # executes the query, if it is SELECT you may ask to print the results with printSchema
+    # commit=False leaves the transaction open so several statements can be committed together
     # returns the number of rows effected and a ResultSet (for SELECT)
-    def execute(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
+    # params, if given, are bound to the %s placeholders of the query
+    def execute(self, query: Union[str, sql.Composed], printSchema=False, commit=True, params=None) \
+            -> (int, ResultSet):
+        return self.__execute(query, printSchema, commit, params)
+
+    # execute, recording the statement in the instrumentation as label (the query itself if None)
+    def __execute(self, query, printSchema=False, commit=True, params=None, label=None) -> (int, ResultSet):
         if self.connection is None:
             raise DatabaseException.ConnectionInvalid("Connection Invalid")
 
         # try execute the query
-        try:
-            self.cursor.execute(query)
-            row_effected = max(self.cursor.rowcount, 0)
-            self.commit()
-        except errors.lookup("23502"):
-            raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
-        except errors.lookup("23503"):
-            raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
-        except errors.lookup("23505"):
-            raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
-        except errors.lookup("23514"):
-            raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
+        with self.__errors():
+            with self.__timed("execute", label or query, explain=True) as timing:
+                self.cursor.execute(query, params)
+                row_effected = timing.rows = max(self.cursor.rowcount, 0)
+            if commit:
+                self.commit()
 
         # get entries in case of SELECT
         if self.cursor.description is not None:
-            entries = ResultSet(self.cursor.description, self.cursor.fetchall())
+            with self.__timed("fetch", label or query) as timing:
+                rows = self.cursor.fetchall()
+                timing.rows = len(rows)
+            entries = ResultSet(self.cursor.description, rows)
         else:
             entries = ResultSet()
 
         # print SELECT entries
         if printSchema:
-            print(entries)
+            entries.write(sys.stdout)
+            print()
 
         return row_effected, entries
 
+    # how many prepared statements are kept per connection
+    PREPARED_CACHE_SIZE = 128
+
+    # executes query, written with $1, $2, ... placeholders, as a server-side prepared statement:
+    # it is PREPAREd the first time this connection sees its text and then only EXECUTEd with params,
+    # so the server parses and plans it once; the least recently used statements are DEALLOCATEd
+    # returns the number of rows effected and a ResultSet (for SELECT), like execute
+    def execute_prepared(self, query: str, params=(), printSchema=False, commit=True) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        name = self.__prepare(query)
+        if len(params) == 0:
+            return self.__execute("EXECUTE " + name, printSchema, commit, label=query)
+        return self.__execute("EXECUTE " + name + "(" + ", ".join(["%s"] * len(params)) + ")", printSchema, commit,
+                              tuple(params), query)
+
+    # returns the name of the statement prepared for query on this connection, preparing it if needed
+    def __prepare(self, query: str) -> str:
+        prepared = self.connection.prepared
+        name = prepared.get(query)
+        if name is not None:
+            prepared.move_to_end(query)
+            return name
+        name = "dbc_stmt_%d" % next(self.connection.prepared_ids)
+        with self.__errors(), self.__timed("prepare", query):
+            self.cursor.execute(sql.SQL("PREPARE {} AS ").format(sql.Identifier(name)) + sql.SQL(query))
+        prepared[query] = name
+        while len(prepared) > DBConnector.PREPARED_CACHE_SIZE:
+            _, evicted = prepared.popitem(last=False)
+            self.cursor.execute(sql.SQL("DEALLOCATE {}").format(sql.Identifier(evicted)))
+        return name
+
+    # executes a query with a single VALUES %s placeholder for all of rows, page_size rows per statement
+    # (psycopg2.extras.execute_values), with fetch=True the rows produced by RETURNING are returned
+    # returns the number of rows effected and the returned rows
+    def execute_values(self, query: Union[str, sql.Composed], rows, template=None, page_size=100, fetch=False,
+                       commit=True) -> (int, list):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        row_effected = 0
+        returned = []
+        with self.__errors():
+            # execute_values only reports the rowcount of the last page, so send one page at a time
+            rows = list(rows)
+            for start in range(0, len(rows), page_size):
+                with self.__timed("execute", query) as timing:
+                    page = extras.execute_values(self.cursor, query, rows[start:start + page_size],
+                                                 template=template, page_size=page_size, fetch=fetch)
+                    timing.rows = max(self.cursor.rowcount, 0)
+                row_effected += timing.rows
+                if fetch:
+                    returned.extend(page)
+            if commit:
+                self.commit()
+        return row_effected, returned
+
+    # runs a batch of statements (queries, or (query, params) pairs) in one round trip: they are sent together
+    # to a temporary server-side function that executes them one by one, each in a subtransaction
+    # returns, in order, (number of rows effected, ResultSet) per statement, or the DatabaseException of a
+    # statement that failed (its changes are undone, the others' are kept); with stop_on_error the statements
+    # after a failure are not run and get None
+    # a statement is expected to return rows if it is a SELECT/VALUES/TABLE, a WITH whose main statement is one,
+    # or has RETURNING (see __returnsRows)
+    # unlike execute, the values of those rows come back through JSON, not converted by the column types:
+    # integers are int, every other number (float columns too) is Decimal, text, booleans and NULL keep their
+    # type, arrays and json columns are lists/dicts, and every other value (timestamps, dates, intervals...) is
+    # the string JSON renders it as, e.g. '2024-01-31T12:00:00+00:00'; use execute for typed values
+    def execute_many(self, statements, stop_on_error=False, commit=True) -> list:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        texts, returns_rows = [], []
+        for statement in statements:
+            query, params = statement if isinstance(statement, tuple) else (statement, None)
+            text = self.cursor.mogrify(query, params).decode(extensions.encodings[self.connection.encoding])
+            texts.append(text.strip().rstrip(";"))
+            returns_rows.append(DBConnector.__returnsRows(query if isinstance(query, str)
+                                                          else query.as_string(self.connection)))
+        if len(texts) == 0:
+            return []
+        ready = self.connection.execute_many_ready
+        with self.__errors():
+            # the round trip is recorded as a whole, each statement with the time the server took to run it
+            with self.__timed("execute_many") as timing:
+                self.cursor.execute(("" if ready else DBConnector.__execute_many_function) +
+                                    "SELECT * FROM pg_temp.dbc_execute_many(%s::text[], %s::boolean[], %s)",
+                                    (texts, returns_rows, stop_on_error))
+                outcomes = self.cursor.fetchall()
+                timing.rows = sum(outcome[0] for outcome in outcomes)
+            if commit:
+                self.commit()
+        # the function lasts as long as the session once it is committed
+        self.connection.execute_many_ready = ready or (commit and self.__transaction is None)
+
+        results = [None] * len(texts)
+        for index, (row_effected, error_code, error_message, rows, seconds) in enumerate(outcomes):
+            if error_code is not None:
+                results[index] = databaseError(error_code, error_message)
+            elif rows is None:
+                results[index] = (row_effected, ResultSet())
+            else:
+                rows = json.loads(rows, parse_float=decimal.Decimal)
+                columns = [ResultSetColumn(name) for name in rows[0]]
+                results[index] = (row_effected, ResultSet(columns, [tuple(row.values()) for row in rows]))
+            if instrumentation.enabled:
+                instrumentation.record("execute", seconds, texts[index], row_effected,
+                                       results[index] if error_code is not None else None)
+        return results
+
+    # whether query returns rows, decided on the query before its params are bound (a value is not a keyword):
+    # by its first keyword, or the one of the main statement after a WITH's queries, and by a RETURNING of
+    # its own; literals, quoted identifiers, comments and what is in parentheses are skipped
+    @staticmethod
+    def __returnsRows(query: str) -> bool:
+        depth, top = 0, None
+        words = []
+        for match in DBConnector.__tokens.finditer(query):
+            parenthesis, word = match.group(2), match.group(3)
+            if parenthesis is not None:
+                depth += 1 if parenthesis == "(" else -1
+            elif word is not None:
+                # the statement is at the depth of its first word, e.g. (SELECT ...) UNION (SELECT ...)
+                top = depth if top is None else top
+                if depth == top:
+                    words.append(word.upper())
+        if len(words) == 0:
+            return False
+        if "RETURNING" in words:
+            return True
+        main = words[0]
+        if main == "WITH":
+            main = next((word for word in words if word in DBConnector.__statements), None)
+        return main in ("SELECT", "VALUES", "TABLE")
+
+    __statements = {"SELECT", "VALUES", "TABLE", "INSERT", "UPDATE", "DELETE", "MERGE"}
+    __tokens = re.compile(r"--[^\n]*|/\*.*?\*/|[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\""
+                          r"|(\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$).*?\1|([()])|([A-Za-z_][A-Za-z_0-9$]*)", re.DOTALL)
+
+    # created in pg_temp, so it belongs to the session and needs no privileges on the database's schemas
+    __execute_many_function = (
+        "CREATE OR REPLACE FUNCTION pg_temp.dbc_execute_many(statements TEXT[], returns_rows BOOLEAN[], "
+        "stop_on_error BOOLEAN) "
+        "RETURNS TABLE(row_effected BIGINT, error_code TEXT, error_message TEXT, result_rows TEXT, "
+        "seconds DOUBLE PRECISION) "
+        "LANGUAGE plpgsql AS $dbc$ "
+        "DECLARE started TIMESTAMPTZ; "
+        "BEGIN "
+        "FOR i IN 1 .. coalesce(array_length(statements, 1), 0) LOOP "
+        "row_effected := 0; error_code := NULL; error_message := NULL; result_rows := NULL; "
+        "started := clock_timestamp(); "
+        "BEGIN "
+        "IF returns_rows[i] THEN "
+        # the newline ends a -- comment at the end of the statement
+        "EXECUTE 'WITH dbc_rows AS (' || statements[i] || E'\\n) "
+        "SELECT count(*), json_agg(dbc_rows)::text FROM dbc_rows' INTO row_effected, result_rows; "
+        "ELSE "
+        "EXECUTE statements[i]; "
+        "GET DIAGNOSTICS row_effected = ROW_COUNT; "
+        "END IF; "
+        "EXCEPTION WHEN OTHERS THEN "
+        "error_code := SQLSTATE; error_message := SQLERRM; "
+        "END; "
+        "seconds := extract(epoch FROM clock_timestamp() - started); "
+        "RETURN NEXT; "
+        "EXIT WHEN error_code IS NOT NULL AND stop_on_error; "
+        "END LOOP; "
+        "END $dbc$; ")
+
+    # executes a SELECT on a server-side (named) cursor and yields the rows lazily, batch_size rows per
+    # round trip, so memory stays bounded regardless of the result size
+    # with batches=True yields a ResultSet per batch instead of single row tuples
+    # the transaction is committed once the stream is exhausted unless commit=False
+    def execute_stream(self, query: Union[str, sql.Composed], batch_size=1000, batches=False, commit=True,
+                       params=None):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        cursor = self.connection.cursor(name="stream_%d" % next(DBConnector.__stream_ids))
+        cursor.itersize = batch_size
+        try:
+            with self.__errors(), self.__timed("execute", query):
+                cursor.execute(query, params)
+            while True:
+                with self.__errors(), self.__timed("fetch", query) as timing:
+                    rows = cursor.fetchmany(batch_size)
+                    timing.rows = len(rows)
+                if len(rows) == 0:
+                    break
+                if batches:
+                    yield ResultSet(cursor.description, rows)
+                else:
+                    yield from rows
+        finally:
+            cursor.close()
+        if commit:
+            self.commit()
+
+    # names for server-side cursors, unique per process
+    __stream_ids = itertools.count()
+
+    # runs a COPY ... FROM STDIN / TO STDOUT statement with file as the data source/target
+    # returns the number of rows copied
+    def copy_expert(self, query: Union[str, sql.Composed], file, size=8192, commit=True) -> int:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        with self.__errors():
+            with self.__timed("execute", query) as timing:
+                self.cursor.copy_expert(query, file, size)
+                row_effected = timing.rows = max(self.cursor.rowcount, 0)
+            if commit:
+                self.commit()
+        return row_effected
+
+    # translateErrors, remembering in the Transaction the error that aborted it so it can report it
+    @contextmanager
+    def __errors(self):
+        aborted = self.__transaction is not None and \
+            self.connection.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR
+        try:
+            with translateErrors():
+                yield
+        except Exception as e:
+            if self.__transaction is not None and not aborted:
+                self.__transaction.error = e
+            raise
+
+    # times what runs in the with block and records it in Utility.Instrumentation as kind, for statement
+    # (the query, only turned into text when instrumentation is on); the block sets timing.rows
+    # with explain=True a statement slower than the slow query threshold is logged with its plan
+    @contextmanager
+    def __timed(self, kind: str, statement=None, explain=False):
+        timing = Timing()
+        if not instrumentation.enabled:
+            yield timing
+            return
+        start = time.perf_counter()
+        try:
+            yield timing
+        except Exception as e:
+            instrumentation.record(kind, time.perf_counter() - start, self.__text(statement), error=e)
+            raise
+        seconds = time.perf_counter() - start
+        statement = self.__text(statement)
+        instrumentation.record(kind, seconds, statement, timing.rows)
+        if explain and instrumentation.isSlow(seconds):
+            executed = self.__text(self.cursor.query)
+            plan = self.__explain(executed) if instrumentation.explain else None
+            instrumentation.logSlow(executed, seconds, plan, statement)
+
+    def __text(self, statement) -> Union[str, None]:
+        if statement is None or isinstance(statement, str):
+            return statement
+        if isinstance(statement, bytes):
+            return statement.decode(extensions.encodings[self.connection.encoding])
+        return statement.as_string(self.connection)
+
+    # statements EXPLAIN accepts
+    __explainable = re.compile(r"^\s*\(*\s*(SELECT|WITH|VALUES|TABLE|INSERT|UPDATE|DELETE|EXECUTE)\b", re.IGNORECASE)
+
+    # EXPLAIN (ANALYZE, BUFFERS) of statement, which is run again for it inside a savepoint that is then rolled
+    # back; if running it again fails (e.g. an INSERT conflicting with the rows it just inserted) only the plan
+    # without ANALYZE; None if the statement cannot be explained
+    def __explain(self, statement: str) -> Union[str, None]:
+        status = self.connection.info.transaction_status
+        if DBConnector.__explainable.match(statement) is None or status == extensions.TRANSACTION_STATUS_INERROR:
+            return None
+        plan = None
+        with self.connection.cursor() as cursor:
+            cursor.execute("SAVEPOINT dbc_explain")
+            for options in ("ANALYZE, BUFFERS", "COSTS"):
+                try:
+                    cursor.execute("EXPLAIN (" + options + ") " + statement)
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                    break
+                except psycopg2.Error:
+                    cursor.execute("ROLLBACK TO SAVEPOINT dbc_explain")
+            cursor.execute("ROLLBACK TO SAVEPOINT dbc_explain")
+            cursor.execute("RELEASE SAVEPOINT dbc_explain")
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            self.connection.rollback()
+        return plan
+
+    # the connection parameters from database.ini and the environment, see __config
+    @staticmethod
+    def connectionParams() -> dict:
+        return DBConnector.__config()
+
+    # parsed database.ini sections, keyed by (resolved path, mtime, section)
+    __config_cache = {}
+
+    # environment variables that override database.ini, same names libpq uses
+    __config_env = {"PGHOST": "host", "PGPORT": "port", "PGDATABASE": "database", "PGUSER": "user",
+                    "PGPASSWORD": "password"}
+
     # grant credentials
+    # DATABASE_URL (a libpq DSN or URI) and the PG* variables override database.ini,
+    # when they are set the file is not needed at all
+    # the current schema, if any, becomes the search_path of the connections
     @staticmethod
-    def __config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
-                 section='postgresql'):
-        # create a parser
-        parser = ConfigParser()
-        # read config file
-        parser.read(filename)
-
-        # get section
+    def __config(filename=None, section='postgresql'):
         db = {}
-        if parser.has_section(section):
-            params = parser.items(section)
-            for param in params:
-                db[param[0]] = param[1]
-        else:
-            # file not found
-            db = DBConnector.__config(
-                filename=os.path.join(os.path.join(os.path.dirname(os.getcwd()), 'Utility'), 'database.ini'))
-            if db is None:
-                raise DatabaseException.database_ini_ERROR("Please modify database.ini file under Utility")
+        dsn = os.environ.get("DATABASE_URL")
+        if dsn:
+            db["dsn"] = dsn
+        overrides = {key: os.environ[var] for var, key in DBConnector.__config_env.items() if os.environ.get(var)}
+
+        if not dsn and len(overrides) < len(DBConnector.__config_env):
+            if filename is not None:
+                candidates = [filename]
+            else:
+                candidates = [os.path.join(os.getcwd(), "Utility", "database.ini"),
+                              os.path.join(os.path.dirname(os.getcwd()), "Utility", "database.ini"),
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "database.ini")]
+            for candidate in candidates:
+                params = DBConnector.__readConfig(candidate, section)
+                if params is not None:
+                    db.update(params)
+                    break
+            else:
+                if not overrides:
+                    raise DatabaseException.database_ini_ERROR("Please modify database.ini file under Utility")
+
+        db.update(overrides)
+        name = currentSchema()
+        if name is not None:
+            if SCHEMA_NAME.match(name) is None:
+                raise ValueError("DB_SCHEMA must be a lowercase identifier: %r" % name)
+            db["options"] = (db.get("options", "") + " -c search_path=" + name).strip()
         return db
+
+    # returns the section of the file as a dict, or None if the file or the section is missing
+    # the file is parsed again only if its mtime changed
+    @staticmethod
+    def __readConfig(filename, section):
+        path = os.path.realpath(filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        key = (path, mtime, section)
+        if key not in DBConnector.__config_cache:
+            # create a parser
+            parser = ConfigParser()
+            # read config file
+            parser.read(path)
+            if parser.has_section(section):
+                DBConnector.__config_cache[key] = dict(parser.items(section))
+            else:
+                DBConnector.__config_cache[key] = None
+        params = DBConnector.__config_cache[key]
+        return None if params is None else dict(params)
+
+
+class Timing:
+    # what a block timed by DBConnector reports back
+    __slots__ = ('rows',)
+
+    def __init__(self):
+        self.rows = 0
+
+
+class Transaction:
+    # unit of work: while it is open, every DBConnector created in the same thread runs on its connection with its
+    # commits deferred, so all their statements commit, or roll back, together when the with block ends:
+    #     with Transaction() as tx:
+    #         ...
+    #         with tx.savepoint() as sp:
+    #             ...
+    #         if sp.failed: ...
+    # it rolls back if the block raised, rollback() was called or a statement failed outside a savepoint (the
+    # transaction is aborted then, PostgreSQL rejects the statements after it); for a failed statement the
+    # DatabaseException of the failure is raised once the block is done
+    # on_rollback is called after rolling back the transaction or a savepoint, e.g. to drop cached reads
+    # with autosavepoint=True each DBConnector that joins it runs in a savepoint of its own, so a failed statement
+    # only undoes the work of its DBConnector and the transaction goes on
+    __active = threading.local()
+
+    def __init__(self, on_rollback=None, autosavepoint=False):
+        self.connection = None
+        self.error = None  # the last error of a statement, set by DBConnector
+        self.rollback_only = False
+        self.committed = False
+        self.on_rollback = on_rollback
+        self.autosavepoint = autosavepoint
+        self.__pool = None
+        self.__savepoint_ids = itertools.count()
+
+    # the Transaction open in this thread, or None
+    @staticmethod
+    def current():
+        return getattr(Transaction.__active, "transaction", None)
+
+    def __enter__(self):
+        if Transaction.current() is not None:
+            raise DatabaseException.ConnectionInvalid("A transaction is already open, use savepoint()")
+        try:
+            self.__pool = ConnectionPool.getPool(DBConnector.connectionParams)
+            self.connection = self.__pool.getconn()
+            ensureSchema(self.connection)
+        except Exception as e:
+            print(e)
+            raise DatabaseException.ConnectionInvalid("Could not connect to database")
+        Transaction.__active.transaction = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Transaction.__active.transaction = None
+        failed = self.connection.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR
+        try:
+            if exc_type is None and not failed and not self.rollback_only:
+                with translateErrors():
+                    self.connection.commit()
+                self.committed = True
+            else:
+                self.connection.rollback()
+        finally:
+            self.__pool.putconn(self.connection)
+            self.connection = None
+            if not self.committed and self.on_rollback is not None:
+                self.on_rollback()
+        if exc_type is None and failed:
+            raise self.error or DatabaseException.UNKNOWN_ERROR("Transaction aborted")
+        return False
+
+    def rollback(self):
+        self.rollback_only = True
+
+    # a savepoint to use as a context manager: what runs in it is rolled back to the savepoint, leaving the rest
+    # of the transaction intact, if it raised or a statement in it failed; savepoint.failed tells afterwards
+    def savepoint(self) -> 'Savepoint':
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Transaction is not open")
+        return Savepoint(self, "tx_savepoint_%d" % next(self.__savepoint_ids))
+
+
+class Savepoint:
+    def __init__(self, transaction: Transaction, name: str):
+        self.transaction = transaction
+        self.name = name
+        self.failed = False
+        self.rollback_only = False
+
+    def __enter__(self):
+        with self.transaction.connection.cursor() as cursor:
+            cursor.execute(sql.SQL("SAVEPOINT {}").format(sql.Identifier(self.name)))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        connection = self.transaction.connection
+        self.failed = exc_type is not None or self.rollback_only or \
+            connection.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR
+        with connection.cursor() as cursor:
+            if self.failed:
+                cursor.execute(sql.SQL("ROLLBACK TO SAVEPOINT {}").format(sql.Identifier(self.name)))
+            cursor.execute(sql.SQL("RELEASE SAVEPOINT {}").format(sql.Identifier(self.name)))
+        if self.failed and self.transaction.on_rollback is not None:
+            self.transaction.on_rollback()
+        return False
@@ -0,0 +1,225 @@
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
+
+# one timed operation of DBConnector, handed to every hook:
+# kind is "connect", "prepare", "execute", "execute_many" (the round trip of a batch, whose statements are
+# recorded one by one as "execute"), "fetch" or "commit"; statement is the query text (None for connect/commit) and
+# fingerprint its normalized form; caller is the function outside Utility that ran it, e.g. "Sol.addMovie";
+# error is the exception the operation raised, or None
+Event = namedtuple('Event', 'kind statement fingerprint caller seconds rows error')
+
+# what the statements past max_statements distinct fingerprints are recorded as
+OTHER_STATEMENTS = "(other statements)"
+
+# upper bounds, in seconds, of the latency histogram buckets: 50us doubling up to ~55s, the last bucket is open
+BUCKETS = tuple(0.00005 * 2 ** i for i in range(21))
+
+
+class Histogram:
+    # latency histogram with fixed power-of-two buckets, not thread-safe (Instrumentation locks around it)
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    # the upper bound of the bucket holding the q-quantile (0 < q <= 1), capped by the largest value seen
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "total": self.total, "min": self.min, "max": self.max,
+                "mean": self.total / self.count if self.count else None,
+                "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99),
+                "buckets": {bound: count for bound, count in zip(BUCKETS + (None,), self.counts) if count}}
+
+
+# literals and parameter placeholders are replaced by ?, lists of them collapse to one, whitespace is squeezed
+# and keywords are upper-cased, so the same statement with different values has the same fingerprint
+__literals = re.compile(r"'(?:[^']|'')*'|\$\d+|%s|%\(\w+\)s|\b\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+__lists = re.compile(r"\?(?:\s*,\s*\?)+")
+__spaces = re.compile(r"\s+")
+__words = re.compile(r"\b[A-Za-z_]+\b")
+__keywords = frozenset("""select from where and or not in is null insert into values update set delete returning
+    join left right full inner outer cross on using group by order having limit offset as distinct union all
+    intersect except case when then else end exists between like ilike with create drop table view index
+    cascade if execute prepare explain analyze copy asc desc count sum avg min max coalesce any""".split())
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    text = __literals.sub("?", statement)
+    text = __lists.sub("?", text)
+    text = __spaces.sub(" ", text).strip().rstrip(";").strip()
+    return __words.sub(lambda word: word.group().upper() if word.group().lower() in __keywords else word.group(),
+                       text)
+
+
+class Instrumentation:
+    # collects the Events of DBConnector: per-(kind, fingerprint) and per-caller latency histograms, row and
+    # error counts, plus a log of slow statements; hooks see every Event as it happens
+    # slow_query_threshold (seconds, None turns it off) marks slow executes, with explain=True they are logged
+    # with their EXPLAIN (ANALYZE, BUFFERS) plan, obtained by running them once more inside a savepoint that is
+    # rolled back (effects outside the transaction, e.g. sequence values, are not undone)
+    # at most max_statements distinct (kind, fingerprint) pairs get an entry of their own, the statements after
+    # that share one per kind with the fingerprint OTHER_STATEMENTS, so memory stays bounded
+    def __init__(self, enabled=True, slow_query_threshold=None, explain=True, stream=None, slow_log_size=100,
+                 max_statements=1000):
+        self.enabled = enabled
+        self.slow_query_threshold = slow_query_threshold
+        self.explain = explain
+        self.stream = stream  # where slow statements are written, sys.stderr if None
+        self.slow_log_size = slow_log_size
+        self.max_statements = max_statements
+        self.__hooks = []
+        self.__lock = threading.Lock()
+        self.__statements = {}  # (kind, fingerprint) -> [Histogram, rows, errors]
+        self.__callers = {}  # caller -> [Histogram, rows, errors]
+        self.__slow = []  # the latest slow statements, oldest first
+
+    # hook(event) is called after every connect/execute/fetch/commit, in the thread that ran it
+    def addHook(self, hook):
+        with self.__lock:
+            self.__hooks = self.__hooks + [hook]
+
+    def removeHook(self, hook):
+        with self.__lock:
+            self.__hooks = [h for h in self.__hooks if h is not hook]
+
+    # is the statement that took seconds slow enough to be explained and logged?
+    def isSlow(self, seconds: float) -> bool:
+        return self.enabled and self.slow_query_threshold is not None and seconds >= self.slow_query_threshold
+
+    def record(self, kind: str, seconds: float, statement: str = None, rows: int = 0, error: Exception = None):
+        if not self.enabled:
+            return
+        event = Event(kind, statement, None if statement is None else fingerprint(statement), caller(), seconds,
+                      rows, error)
+        with self.__lock:
+            statement_key = (kind, event.fingerprint)
+            if statement_key not in self.__statements and len(self.__statements) >= self.max_statements:
+                statement_key = (kind, OTHER_STATEMENTS)
+            for stats, key in ((self.__statements, statement_key), (self.__callers, event.caller)):
+                entry = stats.get(key)
+                if entry is None:
+                    entry = stats[key] = [Histogram(), 0, 0]
+                entry[0].add(seconds)
+                entry[1] += rows
+                entry[2] += error is not None
+            hooks = self.__hooks
+        for hook in hooks:
+            hook(event)
+
+    # logs a slow statement with its plan (None if it could not be explained)
+    # label is what the statement is recorded as if not its own text, e.g. the query of a prepared statement
+    def logSlow(self, statement: str, seconds: float, plan: str = None, label: str = None):
+        entry = {"statement": statement, "fingerprint": fingerprint(label or statement), "caller": caller(),
+                 "seconds": seconds, "plan": plan, "time": time.time()}
+        with self.__lock:
+            self.__slow.append(entry)
+            del self.__slow[:-self.slow_log_size]
+        stream = sys.stderr if self.stream is None else self.stream
+        stream.write("slow query (%.3fs, %s): %s\n" % (seconds, entry["caller"], statement))
+        if plan is not None:
+            stream.write(plan + "\n")
+
+    # the statistics so far:
+    # {"statements": {(kind, fingerprint): {"count", "total", ..., "p99", "buckets", "rows", "errors"}},
+    #  "callers": {caller: {...}}, "slow": [{"statement", "fingerprint", "caller", "seconds", "plan", "time"}]}
+    # statements and callers are sorted by total time, the most expensive first
+    def snapshot(self) -> dict:
+        with self.__lock:
+            return {"statements": Instrumentation.__entries(self.__statements),
+                    "callers": Instrumentation.__entries(self.__callers),
+                    "slow": [dict(entry) for entry in self.__slow]}
+
+    def reset(self):
+        with self.__lock:
+            self.__statements.clear()
+            self.__callers.clear()
+            self.__slow.clear()
+
+    @staticmethod
+    def __entries(stats: dict) -> dict:
+        entries = {}
+        for key, (histogram, rows, errors) in sorted(stats.items(), key=lambda item: -item[1][0].total):
+            entries[key] = histogram.snapshot()
+            entries[key].update(rows=rows, errors=errors)
+        return entries
+
+
+# the function outside this package (and contextlib) that led to the call, as "module.function": of the
+# frames of the first such module on the stack, the outermost one, so a helper like Sol.runReport is
+# reported as the API function that called it; the climb stops below a dispatcher, so a call run by Sol.gather
+# is reported as itself, and lambdas are passed over
+def caller() -> str:
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        if not module.startswith("Utility.") and module != "contextlib":
+            name = frame.f_code.co_name
+            while frame.f_back is not None and frame.f_back.f_globals.get("__name__") == module \
+                    and frame.f_back.f_code not in dispatchers:
+                frame = frame.f_back
+                if frame.f_code.co_name != "<lambda>":
+                    name = frame.f_code.co_name
+            return module + "." + name
+        frame = frame.f_back
+    return "?"
+
+
+# code of the functions that run calls on behalf of others, see dispatcher
+dispatchers = set()
+
+
+# decorator for a function that runs the calls it is given (e.g. Sol.runGathered): the statements of those calls
+# are charged to the called functions, not to the function that handed them over
+def dispatcher(function):
+    dispatchers.add(function.__code__)
+    return function
+
+
+# the process-wide instrumentation used by DBConnector; off unless the DB_INSTRUMENTATION environment variable is set
+# (to anything but 0) or configureInstrumentation(enabled=True) turns it on, as recording adds to every statement
+instrumentation = Instrumentation(enabled=os.environ.get("DB_INSTRUMENTATION", "0") not in ("", "0"))
+
+
+# change the settings of the process-wide instrumentation (enabled, slow_query_threshold, explain, stream,
+# slow_log_size, max_statements), the statistics collected so far are kept
+def configureInstrumentation(**settings):
+    for name, value in settings.items():
+        if not hasattr(instrumentation, name) or name.startswith("_"):
+            raise ValueError("unknown instrumentation setting: %s" % name)
+        setattr(instrumentation, name, value)
+
+
+def statsSnapshot() -> dict:
+    return instrumentation.snapshot()
+
+
+def resetStats():
+    instrumentation.reset()
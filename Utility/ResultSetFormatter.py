@@ -0,0 +1,59 @@
+import csv
+import json
+
+
+class ResultSetFormatter:
+    # writes a header and rows to a text stream (sys.stdout, io.StringIO, an open file...) one row at a time,
+    # so output takes linear time and no memory beyond the current row
+    # modes: "plain" (the classic ResultSet print format), "csv", "tsv" and "jsonl" (one JSON object per row)
+    # limit stops after that many rows, widths (plain mode only) pads every column to the given width
+    MODES = ("plain", "csv", "tsv", "jsonl")
+
+    def __init__(self, stream, mode="plain", limit=None, widths=None):
+        if mode not in ResultSetFormatter.MODES:
+            raise ValueError("mode must be one of " + ", ".join(ResultSetFormatter.MODES))
+        self.stream = stream
+        self.mode = mode
+        self.limit = limit
+        self.widths = widths
+        self.written = 0  # rows written so far
+        self.__header = []
+        if mode == "csv":
+            self.__writer = csv.writer(stream, lineterminator="\n")
+        elif mode == "tsv":
+            self.__writer = csv.writer(stream, dialect="excel-tab", lineterminator="\n")
+
+    def header(self, cols_header):
+        self.__header = list(cols_header)
+        if self.mode == "plain":
+            self.stream.write(self.__line(self.__header))
+        elif self.mode != "jsonl":
+            self.__writer.writerow(self.__header)
+
+    # writes rows until the limit is reached, returns False once it is
+    def rows(self, rows) -> bool:
+        for row in rows:
+            if self.limit is not None and self.written >= self.limit:
+                return False
+            if self.mode == "plain":
+                self.stream.write(self.__line(row))
+            elif self.mode == "jsonl":
+                self.stream.write(json.dumps(dict(zip(self.__header, row)), default=str) + "\n")
+            else:
+                self.__writer.writerow(row)
+            self.written += 1
+        return self.limit is None or self.written < self.limit
+
+    def __line(self, values) -> str:
+        if self.widths is None:
+            return "".join([str(val) + "   " for val in values]) + "\n"
+        return "".join([str(val).ljust(width) + "   " for val, width in zip(values, self.widths)]) + "\n"
+
+    # column widths for aligned plain output, one pass over the rows
+    @staticmethod
+    def columnWidths(cols_header, rows) -> list:
+        widths = [len(str(col)) for col in cols_header]
+        for row in rows:
+            for index, val in enumerate(row):
+                widths[index] = max(widths[index], len(str(val)))
+        return widths